@@ -0,0 +1,238 @@
+"""Append-only activity store backed by SQLite.
+
+Replaces the read-modify-write cycle on ``activity_log.json``: each recorded
+activity is a single ``INSERT`` (plus an upsert of the affected rule), which
+is O(1) regardless of history size and safe across gunicorn workers thanks
+to SQLite's locking.  Per-day counters are maintained alongside the log so
+dashboard statistics never have to scan it.  The legacy JSON log is imported
+the first time a store is opened next to it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from config import Config
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["ActivityStore", "get_activity_store", "parse_timestamp"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activity (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    action TEXT NOT NULL,
+    user TEXT,
+    rule_id TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_activity_timestamp ON activity (timestamp);
+CREATE TABLE IF NOT EXISTS rules (
+    rule_id TEXT PRIMARY KEY,
+    status TEXT,
+    last_modified TEXT,
+    modified_by TEXT
+);
+CREATE TABLE IF NOT EXISTS activity_daily (
+    day TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_ENTRY_FIELDS = ("timestamp", "action", "user", "rule_id", "details")
+
+
+def parse_timestamp(value: str) -> datetime | None:
+    """Parse an activity timestamp as a naive UTC ``datetime``."""
+    try:
+        ts = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+class ActivityStore:
+    """Activity entries and per-rule status stored in ``db_path``."""
+
+    def __init__(self, db_path: str | Path, legacy_json: str | Path | None = None) -> None:
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        self._migrate(legacy_json)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _migrate(self, legacy_json: str | Path | None) -> None:
+        """Import ``legacy_json`` once, or seed the log when there is none.
+
+        Stores created before the daily counters existed get them backfilled
+        from the log the first time they are opened.
+        """
+        with self._connect() as conn:
+            # Take the write lock first so concurrent workers migrate only once.
+            conn.execute("BEGIN IMMEDIATE")
+            done = {r[0] for r in conn.execute("SELECT key FROM meta")}
+            if "initialized" not in done:
+                if legacy_json is not None and Path(legacy_json).exists():
+                    imported = self._import_json(conn, legacy_json)
+                    LOGGER.info("Imported %d activity entries from %s", imported, legacy_json)
+                else:
+                    self._insert(
+                        conn,
+                        {
+                            "timestamp": datetime.utcnow().isoformat(),
+                            "action": "system",
+                            "user": "init",
+                            "details": "Activity log initialized",
+                        },
+                    )
+                conn.execute("INSERT INTO meta (key, value) VALUES ('initialized', ?)",
+                             (datetime.utcnow().isoformat(),))
+            if "daily_rollup" not in done:
+                self._rebuild_rollup(conn)
+                conn.execute("INSERT INTO meta (key, value) VALUES ('daily_rollup', ?)",
+                             (datetime.utcnow().isoformat(),))
+
+    @staticmethod
+    def _rebuild_rollup(conn: sqlite3.Connection) -> None:
+        counts: Dict[str, int] = {}
+        for (stamp,) in conn.execute("SELECT timestamp FROM activity"):
+            ts = parse_timestamp(stamp)
+            if ts is not None:
+                day = ts.date().isoformat()
+                counts[day] = counts.get(day, 0) + 1
+        conn.execute("DELETE FROM activity_daily")
+        conn.executemany("INSERT INTO activity_daily (day, count) VALUES (?, ?)", counts.items())
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, entry: Dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT INTO activity (timestamp, action, user, rule_id, details) "
+            "VALUES (?, ?, ?, ?, ?)",
+            tuple(entry.get(field) for field in _ENTRY_FIELDS),
+        )
+
+    @staticmethod
+    def _upsert_rule(conn: sqlite3.Connection, rule_id: str, state: Dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO rules (rule_id, status, last_modified, modified_by) "
+            "VALUES (?, ?, ?, ?)",
+            (rule_id, state.get("status"), state.get("last_modified"), state.get("modified_by")),
+        )
+
+    def _import_json(self, conn: sqlite3.Connection, path: str | Path) -> int:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        imported = 0
+        for entry in data.get("activity_log", []):
+            if isinstance(entry, dict) and entry.get("timestamp"):
+                self._insert(conn, {"action": "unknown", **entry})
+                imported += 1
+        for rule_id, state in data.get("rules", {}).items():
+            self._upsert_rule(conn, rule_id, state if isinstance(state, dict) else {})
+        return imported
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, entry: Dict[str, Any], rule_id: str | None = None) -> None:
+        """Record ``entry`` and, when given, mark ``rule_id`` as modified."""
+        with self._connect() as conn:
+            self._insert(conn, {**entry, "rule_id": rule_id or entry.get("rule_id")})
+            ts = parse_timestamp(entry["timestamp"])
+            if ts is not None:
+                conn.execute(
+                    "INSERT INTO activity_daily (day, count) VALUES (?, 1) "
+                    "ON CONFLICT (day) DO UPDATE SET count = count + 1",
+                    (ts.date().isoformat(),),
+                )
+            if rule_id:
+                self._upsert_rule(
+                    conn,
+                    rule_id,
+                    {
+                        "status": "active",
+                        "last_modified": entry["timestamp"],
+                        "modified_by": entry.get("user"),
+                    },
+                )
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def entries(self, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Return activity entries oldest first, or the newest ``limit``."""
+        sql = "SELECT timestamp, action, user, rule_id, details FROM activity"
+        with self._connect() as conn:
+            if limit is None:
+                rows = conn.execute(sql + " ORDER BY id").fetchall()
+            else:
+                rows = conn.execute(sql + " ORDER BY id DESC LIMIT ?", (limit,)).fetchall()[::-1]
+        return [
+            {k: v for k, v in zip(_ENTRY_FIELDS, row) if v is not None}
+            for row in rows
+        ]
+
+    def daily_counts(self, since: str = "") -> Dict[str, int]:
+        """Return ``{day: count}`` for UTC days on or after ``since``."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT day, count FROM activity_daily WHERE day >= ?", (since,)
+            ).fetchall()
+        return dict(rows)
+
+    def rules(self) -> Dict[str, Dict[str, Any]]:
+        """Return the per-rule status mapping kept by the legacy JSON log."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rule_id, status, last_modified, modified_by FROM rules"
+            ).fetchall()
+        return {
+            rule_id: {"status": status, "last_modified": modified, "modified_by": by}
+            for rule_id, status, modified, by in rows
+        }
+
+    def rule_count(self) -> int:
+        """Return the number of distinct rules with recorded activity."""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+
+
+_STORES: Dict[str, ActivityStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_activity_store() -> ActivityStore:
+    """Return the store that lives next to ``Config.ACTIVITY_LOG``."""
+    legacy = Path(Config.ACTIVITY_LOG)
+    db_path = str(legacy.with_suffix(".sqlite3"))
+    with _STORES_LOCK:
+        store = _STORES.get(db_path)
+        if store is None:
+            store = _STORES[db_path] = ActivityStore(db_path, legacy_json=legacy)
+    return store
@@ -6,6 +6,7 @@ Organized by functional areas with consistent error handling
 import os
 import json
 import logging
+from functools import partial
 from flask import (
     Blueprint,
     request,
@@ -19,16 +20,21 @@ from flask import (
 )
 from werkzeug.utils import secure_filename
 from utils import (
-    generate_files,
     allowed_file,
     ensure_directory_exists,
-    load_and_sanitize_json,
-    log_activity,
-    diagram_type_from_filename,
-    get_snippet,
     get_current_user,
     get_help_topics,
 )
+from catalog_index import get_catalog_index
+from config import get_config_service
+from diagram_registry import list_diagrams
+from hierarchy_index import load_hierarchy_index
+from http_cache import REVALIDATE_CACHE, not_modified, send_artifact
+from response_cache import get_hierarchy_cache
+from jobs import get_job_queue, run_uploads
+from log_pipeline import LazyRepr
+from log_reader import LogReader, parse_level
+from search_index import SORT_KEYS, get_search_index, parse_sort
 from urllib.parse import urlencode
 
 LOGGER = logging.getLogger(__name__)
@@ -96,6 +102,9 @@ def safe_startswith(value, prefix):
 def get_diagram_catalogs():
     """
     Get a structured catalog of all available diagrams.
+
+    The catalog's ETag is the index version, so clients revalidate cheaply
+    and only download it again after an upload changed it.
     """
     try:
         diagrams_dir = current_app.config.get("DIAGRAMS_FOLDER")
@@ -105,60 +114,16 @@ def get_diagram_catalogs():
             current_app.logger.error("Diagrams directory not found: %s", diagrams_dir)
             return jsonify({"error": "Diagrams directory not found"}), 404
 
-        catalogs = []
-        # Iterate through each container directory in DIAGRAMS_FOLDER
-        for root_name in os.listdir(diagrams_dir):
-            root_path = os.path.join(diagrams_dir, root_name)
-            if not os.path.isdir(root_path):
-                current_app.logger.debug("Skipping non-directory: %s", root_path)
-                continue
-
-            try:
-                current_files = os.listdir(root_path)
-                current_app.logger.debug(
-                    "Directory '%s' files: %s", root_name, current_files
-                )
-            except Exception as list_error:
-                current_app.logger.error(
-                    "Error listing directory %s: %s", root_path, list_error
-                )
-                continue
-
-            entries = []
-            # Check each file in the directory for a matching pair: .mmd and .json
-            for filename in current_files:
-                if filename.endswith(".mmd"):
-                    json_file = filename.replace(".mmd", ".json")
-                    json_file_path = os.path.join(root_path, json_file)
-                    if os.path.exists(json_file_path):
-                        entries.append(
-                            {
-                                "root": root_name,
-                                "diagram": filename,
-                                "hierarchy": json_file,
-                                "type": diagram_type_from_filename(filename),
-                            }
-                        )
-                    else:
-                        current_app.logger.debug(
-                            "JSON file %s not found in directory %s",
-                            json_file,
-                            root_name,
-                        )
-
-            if entries:
-                parts = root_name.split("_")
-                category = parts[0] if len(parts) > 1 else "General"
-                subgroup = "_".join(parts[1:]) if len(parts) > 1 else "General"
-                catalogs.append(
-                    {"category": f"{category}_{subgroup}", "entries": entries}
-                )
-
-        current_app.logger.debug("Generated catalog: %s", catalogs)
+        index = get_catalog_index()
+        etag = f"catalog-{index.version()}"
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        catalogs = index.catalogs()
+        current_app.logger.debug("Generated catalog: %s", LazyRepr(catalogs))
         response = make_response(jsonify(catalogs))
-        response.headers["Cache-Control"] = (
-            "no-store, no-cache, must-revalidate, max-age=0"
-        )
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = REVALIDATE_CACHE
         return response
 
     except Exception as e:
@@ -176,14 +141,7 @@ def get_catalog_names():
         if not os.path.exists(diagrams_dir):
             return jsonify({"error": "Diagrams directory not found"}), 404
 
-        catalog_names = set()
-        for root_name in os.listdir(diagrams_dir):
-            root_path = os.path.join(diagrams_dir, root_name)
-            if os.path.isdir(root_path):
-                base_name = root_name.split("_")[0]
-                catalog_names.add(base_name)
-
-        return jsonify(sorted(list(catalog_names)))
+        return jsonify(get_catalog_index().catalog_names())
 
     except Exception as e:
         current_app.logger.error(f"Catalog names error: {str(e)}", exc_info=True)
@@ -192,84 +150,103 @@ def get_catalog_names():
 
 @routes_bp.route("/api/search_diagrams", methods=["GET"])
 def search_diagrams():
-    """Search diagrams with improved filtering and pagination"""
+    """Search diagrams with filtering, sorting and pagination.
+
+    ``sort`` is one of ``relevance`` (BM25, the default), ``name``,
+    ``last_modified`` and ``size``, prefixed with ``-`` for descending
+    order.  Pages are chosen with ``page``/``per_page``, or, when ``page``
+    is absent, with ``limit`` and the ``next`` cursor returned by the
+    previous page.
+    """
     try:
         # Get and validate parameters
         query = request.args.get("q", "").lower().strip()
         catalog = request.args.get("catalog", "").strip()
         diagram_type = request.args.get("type", "").strip()
-        page = max(1, int(request.args.get("page", 1)))
-        per_page = min(50, max(1, int(request.args.get("per_page", 9))))
+        sort = request.args.get("sort", "relevance").strip() or "relevance"
+        cursor = request.args.get("cursor") or None
+        try:
+            parse_sort(sort)
+            page = max(1, int(request.args.get("page", 1)))
+            per_page = int(request.args.get("limit") or request.args.get("per_page", 9))
+            per_page = min(50, max(1, per_page))
+        except ValueError:
+            return jsonify(
+                {
+                    "error": f"sort must be one of {', '.join(SORT_KEYS)} (prefix - for "
+                    "descending); page, per_page and limit must be integers"
+                }
+            ), 400
 
         diagrams_dir = current_app.config["DIAGRAMS_FOLDER"]
         if not os.path.exists(diagrams_dir):
             return jsonify({"error": "Diagrams directory not found"}), 404
 
-        results = []
-        # Search through catalogs
-        for root_name in os.listdir(diagrams_dir):
-            root_path = os.path.join(diagrams_dir, root_name)
-            if not os.path.isdir(root_path):
-                continue
-
-            base_catalog = root_name.split("_")[0]
-            if catalog and base_catalog.lower() != catalog.lower():
-                continue
-
-            for filename in os.listdir(root_path):
-                if not filename.endswith(".mmd"):
-                    continue
-
-                file_type = diagram_type_from_filename(filename)
-                file_path = os.path.join(root_path, filename)
-                if (
-                    diagram_type
-                    and file_type
-                    and file_type.lower() != diagram_type.lower()
-                ):
-                    continue
-
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read().lower()
-
-                matches_query = (
-                    not query or query in filename.lower() or query in content
-                )
-                if matches_query:
-                    results.append(
-                        {
-                            "filename": filename,
-                            "catalog": root_name,
-                            "type": file_type,
-                            "size": os.path.getsize(file_path),
-                            "last_modified": os.path.getmtime(file_path),
-                            "match_snippet": (
-                                get_snippet(content, query) if query else ""
-                            ),
-                        }
-                    )
-
-        total_count = len(results)
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_results = results[start_index:end_index]
+        if "page" in request.args and cursor is None:
+            total_count, paginated_results = get_search_index().search(
+                query, catalog, diagram_type, page, per_page, sort
+            )
+            return jsonify(
+                {
+                    "total": total_count,
+                    "page": page,
+                    "per_page": per_page,
+                    "sort": sort,
+                    "results": paginated_results,
+                }
+            )
 
-        return jsonify(
-            {
-                "total": total_count,
-                "page": page,
-                "per_page": per_page,
-                "results": paginated_results,
-            }
-        )
+        try:
+            result = get_search_index().search_page(
+                query, catalog, diagram_type, sort, per_page, cursor
+            )
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        result["per_page"] = per_page
+        return jsonify(result)
 
     except Exception as e:
         current_app.logger.error(f"Search error: {str(e)}", exc_info=True)
         return jsonify({"error": "Server error during search"}), 500
 
 
+def _serialize_hierarchy(json_path: str) -> bytes:
+    """Load a hierarchy file and return it serialized as a JSON list."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # Normalize to list
+    if isinstance(data, dict):
+        data = [data]
+    elif not isinstance(data, list):
+        raise ValueError("Invalid hierarchy format")
+    return current_app.json.response(data).get_data()
+
+
+# Query arguments selecting part of a hierarchy instead of the whole file.
+_PARTIAL_HIERARCHY_ARGS = ("depth", "subtree", "offset", "limit")
+
+
+def _count_arg(name: str) -> int | None:
+    """Return the non-negative integer query argument *name*, if given."""
+    value = request.args.get(name, "")
+    if value == "":
+        return None
+    number = int(value)
+    if number < 0:
+        raise ValueError(name)
+    return number
+
+
 @routes_bp.route("/api/hierarchy/<root_name>/<diagram_name>")
 def get_hierarchy_data(root_name, diagram_name):
+    """Return a container's rule hierarchy.
+
+    Without query arguments the whole hierarchy file is returned.  With
+    ``depth``, ``subtree=<RuleGUID>``, ``offset`` or ``limit`` only that
+    part is returned, read from the container's node index (see
+    :meth:`hierarchy_index.HierarchyIndex.select`).
+    """
     current_app.logger.info(
         f"DIAGRAMS_FOLDER is: {current_app.config.get('DIAGRAMS_FOLDER')}"
     )
@@ -292,21 +269,37 @@ def get_hierarchy_data(root_name, diagram_name):
             current_app.logger.warning(f"Hierarchy not found: {json_path}")
             return jsonify({"error": "Hierarchy data not found"}), 404
 
-        # Load and validate JSON
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # Normalize to list
-        if isinstance(data, dict):
-            data = [data]
-        elif not isinstance(data, list):
-            return jsonify({"error": "Invalid hierarchy format"}), 400
-
-        return jsonify(data)
+        if any(arg in request.args for arg in _PARTIAL_HIERARCHY_ARGS):
+            try:
+                depth = _count_arg("depth")
+                offset = _count_arg("offset") or 0
+                limit = _count_arg("limit")
+            except ValueError:
+                return jsonify({"error": "depth, offset and limit must be non-negative integers"}), 400
+            try:
+                result = load_hierarchy_index(json_path).select(
+                    request.args.get("subtree") or None, depth, offset, limit
+                )
+            except KeyError:
+                return jsonify({"error": "Rule not found in hierarchy"}), 404
+            response = jsonify(result)
+            response.add_etag()
+            response.headers["Cache-Control"] = REVALIDATE_CACHE
+            return response.make_conditional(request)
+
+        cached = get_hierarchy_cache().get(json_path, _serialize_hierarchy)
+        response = not_modified(cached.etag)
+        if response is None:
+            response = current_app.response_class(cached.body, mimetype="application/json")
+            response.set_etag(cached.etag)
+            response.headers["Cache-Control"] = REVALIDATE_CACHE
+        return response
 
     except json.JSONDecodeError as decode_err:
         current_app.logger.error(f"JSON decode error: {decode_err}")
         return jsonify({"error": "Malformed JSON"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid hierarchy format"}), 400
     except Exception as e:
         current_app.logger.error(f"Unexpected hierarchy error: {e}", exc_info=True)
         return jsonify({"error": "Server error loading hierarchy"}), 500
@@ -335,7 +328,7 @@ def serve_diagram(root_name, diagram_name):
                 ),
                 404,
             )
-        return send_from_directory(diagram_dir, safe_file)
+        return send_artifact(diagram_dir, safe_file)
     except Exception as e:
         current_app.logger.error(f"Error serving diagram: {str(e)}")
         abort(500, "Internal server error")
@@ -348,22 +341,56 @@ def debug_files():
         diagrams_dir = current_app.config["DIAGRAMS_FOLDER"]
         if not os.path.exists(diagrams_dir):
             return jsonify({"error": "Diagrams directory not found"}), 404
-        file_structure = {}
-        for root_name in os.listdir(diagrams_dir):
-            root_path = os.path.join(diagrams_dir, root_name)
-            if os.path.isdir(root_path):
-                file_structure[root_name] = os.listdir(root_path)
         return jsonify(
             {
                 "diagrams_folder": diagrams_dir,
-                "exists": os.path.exists(diagrams_dir),
-                "files": file_structure,
+                "exists": True,
+                "files": get_catalog_index().files(),
             }
         )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@routes_bp.route("/api/cache_stats")
+def cache_stats():
+    """Hit/miss counters of the in-process response caches"""
+    return jsonify({"hierarchy": get_hierarchy_cache().stats()})
+
+
+# Default and maximum page size of /api/diagrams.
+_DIAGRAM_PAGE_DEFAULT = 100
+_DIAGRAM_PAGE_MAX = 1000
+
+
+@routes_bp.route("/api/diagrams")
+def list_registered_diagrams():
+    """
+    Page through the diagram registry in (root, name) order.
+
+    Query arguments: ``limit``, ``cursor`` (the ``next`` value of the
+    previous page), ``root`` and ``type``.  Pages are read with keyset
+    pagination, so every page costs one indexed range query.
+    """
+    try:
+        try:
+            limit = _count_arg("limit")
+            if limit is None:
+                limit = _DIAGRAM_PAGE_DEFAULT
+            rows, next_cursor = list_diagrams(
+                min(max(1, limit), _DIAGRAM_PAGE_MAX),
+                after=request.args.get("cursor") or None,
+                root_name=request.args.get("root", ""),
+                diagram_type=request.args.get("type", ""),
+            )
+        except ValueError as exc:
+            return jsonify({"error": f"Invalid diagram query: {exc}"}), 400
+        return jsonify({"items": [row.to_dict() for row in rows], "next": next_cursor})
+    except Exception as e:
+        current_app.logger.error(f"Diagram listing error: {str(e)}", exc_info=True)
+        return jsonify({"error": "Server error listing diagrams"}), 500
+
+
 @routes_bp.route("/api/diagrams/<root_name>/<diagram_name>")
 def serve_diagram_file(root_name, diagram_name):
     """Serve raw diagram files (both .mmd and .json)"""
@@ -373,7 +400,7 @@ def serve_diagram_file(root_name, diagram_name):
         dir_path = os.path.join(current_app.config["DIAGRAMS_FOLDER"], safe_root)
         if not os.path.exists(os.path.join(dir_path, safe_file)):
             return jsonify({"error": "Diagram file not found"}), 404
-        return send_from_directory(dir_path, safe_file)
+        return send_artifact(dir_path, safe_file)
     except Exception as e:
         current_app.logger.error(f"File serve error: {str(e)}")
         abort(500, "Server error retrieving file")
@@ -419,7 +446,9 @@ def upload_file():
     ensure_directory_exists(uploads_dir)
     ensure_directory_exists(diagrams_dir)
 
-    processed_files = []
+    user = get_current_user()
+    processes = int(current_app.config.get("UPLOAD_PROCESSES", 1))
+    items = []
     errors = []
 
     for file in files:
@@ -430,71 +459,168 @@ def upload_file():
             filename = secure_filename(file.filename)
             file_path = os.path.join(uploads_dir, filename)
             file.save(file_path)
-
-            json_data = load_and_sanitize_json(file_path)
-            if not json_data:
-                raise ValueError("Invalid JSON content")
-
-            root_name = os.path.splitext(filename)[0]
-            output_dir = os.path.join(diagrams_dir, root_name)
-            ensure_directory_exists(output_dir)
-
-            generate_files(json_data, output_dir)
-            processed_files.append(filename)
-
-            log_activity(
-                action="upload",
-                rule_id=root_name,
-                user=get_current_user(),
-                details=f"Uploaded {filename}",
+            items.append(
+                {
+                    "name": filename,
+                    "path": file_path,
+                    "diagrams_dir": diagrams_dir,
+                    "user": user,
+                }
             )
-
         except Exception as e:
             errors.append(f"{file.filename}: {str(e)}")
             current_app.logger.error(f"Upload error: {file.filename} - {str(e)}")
 
-    if errors:
-        return (
-            jsonify(
-                success=not bool(errors),
-                message="Some files failed to process",
-                processed=processed_files,
-                errors=errors,
-            ),
-            207,
+    wait = request.args.get("wait", "").lower() in ("1", "true", "yes")
+    if wait or "job_queue" not in current_app.extensions:
+        # Synchronous mode for scripted clients that want the result inline,
+        # and for deployments without a database to hold the job queue.
+        processed_files = []
+        for name, _, error in run_uploads(items, processes):
+            if error is None:
+                processed_files.append(name)
+            else:
+                errors.append(f"{name}: {error}")
+
+        if errors:
+            return (
+                jsonify(
+                    success=not bool(errors),
+                    message="Some files failed to process",
+                    processed=processed_files,
+                    errors=errors,
+                ),
+                207,
+            )
+
+        return jsonify(
+            success=True,
+            message=f"Processed {len(processed_files)} files",
+            redirect_url=url_for("routes.catalog"),
         )
 
-    return jsonify(
-        success=True,
-        message=f"Processed {len(processed_files)} files",
-        redirect_url=url_for("routes.catalog"),
+    if not items:
+        return jsonify(success=False, message="No valid files", errors=errors), 400
+
+    job_id = get_job_queue().submit(
+        "upload", items, partial(run_uploads, processes=processes), user=user
+    )
+    return (
+        jsonify(
+            success=not errors,
+            message=f"Queued {len(items)} files for processing",
+            job_id=job_id,
+            status_url=url_for("routes.get_job_status", job_id=job_id),
+            errors=errors,
+            redirect_url=url_for("routes.catalog"),
+        ),
+        202,
     )
 
 
+@routes_bp.route("/api/jobs/<job_id>")
+def get_job_status(job_id):
+    """Report progress, per-file results and errors of a background job."""
+    try:
+        job = None
+        if "job_queue" in current_app.extensions:
+            job = get_job_queue().get(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job)
+    except Exception as e:
+        current_app.logger.error(f"Job status error: {str(e)}", exc_info=True)
+        return jsonify({"error": "Server error retrieving job"}), 500
+
+
 # ============
 # APP ROUTES
 # ============
 @routes_bp.route("/config/config.json")
 def serve_config():
-    """Serve application configuration"""
-    try:
-        return send_from_directory("config", "config.json")
-    except FileNotFoundError:
+    """
+    Serve application configuration.
+
+    The parsed file is cached by the config service; the response adds the
+    compiled theme ``classDefs`` under ``compiled`` and is revalidated by
+    ETag.
+    """
+    snapshot = get_config_service().snapshot()
+    if not snapshot.loaded:
         abort(404, "Configuration not available")
+    cached = not_modified(snapshot.etag)
+    if cached is not None:
+        return cached
+    response = make_response(snapshot.body)
+    response.mimetype = "application/json"
+    response.set_etag(snapshot.etag)
+    response.headers["Cache-Control"] = REVALIDATE_CACHE
+    return response
+
+
+# Default and maximum number of records returned by /api/logs?tail=N.
+_LOG_TAIL_DEFAULT = 200
+_LOG_TAIL_MAX = 5000
+# Default and maximum bytes read per /api/logs?cursor=... poll.
+_LOG_READ_DEFAULT = 256 * 1024
+_LOG_READ_MAX = 4 * 1024 * 1024
 
 
 @routes_bp.route("/api/logs")
 def get_logs():
-    """Retrieve application logs"""
+    """Retrieve application log records without loading whole files.
+
+    Query arguments:
+
+    * ``tail=N`` — the last N records (default);
+    * ``cursor=<token>`` — records written after a cursor returned by an
+      earlier call, at most ``max_bytes`` per call, for incremental polling;
+    * ``level=<name>`` — only records at that level or above;
+    * ``file=<name>`` — one raw log file (``app.log`` or a numbered backup),
+      served with HTTP ``Range`` support.
+
+    Rotated backups are read as part of the same stream.
+    """
     try:
-        log_path = current_app.config.get("LOG_FILE", "error.log")
-        if not os.path.exists(log_path):
-            return "No log file found", 404
-        with open(log_path, "r", encoding="utf-8") as log_file:
-            return log_file.read(), 200, {"Content-Type": "text/plain"}
+        log_path = current_app.config.get(
+            "LOG_FILE", os.path.join(current_app.config.get("LOG_DIR", ""), "app.log")
+        )
+        reader = LogReader(log_path)
+        files = reader.files()
+        if not files:
+            return jsonify({"error": "No log file found"}), 404
+
+        requested = request.args.get("file")
+        if requested is not None:
+            names = {os.path.basename(path): path for path in files}
+            if requested not in names:
+                return jsonify({"error": "Log file not found"}), 404
+            return send_from_directory(
+                os.path.dirname(os.path.abspath(names[requested])),
+                requested,
+                mimetype="text/plain",
+            )
+
+        try:
+            min_level = parse_level(request.args.get("level", "NOTSET"))
+            if "cursor" in request.args:
+                max_bytes = int(request.args.get("max_bytes", _LOG_READ_DEFAULT))
+                result = reader.read(
+                    request.args["cursor"],
+                    max_bytes=min(max(1, max_bytes), _LOG_READ_MAX),
+                    min_level=min_level,
+                )
+            else:
+                count = int(request.args.get("tail", _LOG_TAIL_DEFAULT))
+                result = reader.tail(min(max(0, count), _LOG_TAIL_MAX), min_level)
+        except ValueError as exc:
+            return jsonify({"error": f"Invalid log query: {exc}"}), 400
+
+        result["files"] = [os.path.basename(path) for path in files]
+        return jsonify(result)
     except Exception as e:
         current_app.logger.error(f"Log retrieval error: {str(e)}")
-        return str(e), 500
+        return jsonify({"error": str(e)}), 500
 
 
 @routes_bp.route("/full-help")
@@ -9,6 +9,7 @@ Opinionated but lightweight Flask application factory with:
 * Structured JSON error responses
 * Production-grade logging to file + console
 * Click commands for shell context & DB bootstrap
+* Lazy module-level ``app``: importing this module builds nothing
 """
 
 from __future__ import annotations
@@ -16,12 +17,15 @@ from __future__ import annotations
 import logging
 import os
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
 from flask import Flask
 
+from log_pipeline import BatchRotatingFileHandler, BatchStreamHandler, install as install_log_pipeline
+from log_reader import LOG_FORMAT
+
 try:  # allow tests to stub a minimal 'flask' module
     from flask import jsonify
 except Exception:  # pragma: no cover - stub fallback
@@ -50,7 +54,24 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "SQLALCHEMY_TRACK_MODIFICATIONS": False,
     "DATA_DIR": os.getenv("DATA_DIR", "instance/data"),
     "LOG_DIR": os.getenv("LOG_DIR", "instance/logs"),
+    # Rotation of LOG_DIR/app.log; /api/logs reads across the backups
+    "LOG_MAX_BYTES": int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    "LOG_BACKUP_COUNT": int(os.getenv("LOG_BACKUP_COUNT", "10")),
+    # Records are queued and written by a background thread, in batches;
+    # when the queue is full "drop" discards records below WARNING and
+    # "block" makes the logging thread wait.
+    "LOG_QUEUE_SIZE": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    "LOG_QUEUE_POLICY": os.getenv("LOG_QUEUE_POLICY", "drop"),
+    "LOG_BATCH_SIZE": int(os.getenv("LOG_BATCH_SIZE", "256")),
     "MAX_CONTENT_LENGTH": 30 * 1024 * 1024,  # 30 MB uploads
+    "JOB_WORKERS": int(os.getenv("JOB_WORKERS", "4")),
+    # Interval at which a process marks its jobs alive; queued or running
+    # jobs not updated for three intervals are failed as orphaned
+    "JOB_HEARTBEAT_SECONDS": float(os.getenv("JOB_HEARTBEAT_SECONDS", "30")),
+    # >1 fans batch upload generation out to a process pool
+    "UPLOAD_PROCESSES": int(os.getenv("UPLOAD_PROCESSES", "1")),
+    # Upper bound for serialized /api/hierarchy responses kept in memory
+    "HIERARCHY_CACHE_BYTES": int(os.getenv("HIERARCHY_CACHE_BYTES", str(64 * 1024 * 1024))),
     "VERSION": "1.0.0",
 }
 
@@ -90,9 +111,21 @@ def create_app(**custom: Any) -> Flask:
         os.path.abspath(os.getenv("DIAGRAMS_FOLDER", os.path.join(app.root_path, "diagrams"))),
     )
 
+    # The search index lives next to the diagrams it describes.
+    app.config.setdefault(
+        "SEARCH_INDEX_PATH",
+        os.getenv(
+            "SEARCH_INDEX_PATH",
+            app.config["DIAGRAMS_FOLDER"].rstrip(os.sep) + ".search.sqlite3",
+        ),
+    )
+
     _ensure_directories(app)
     _configure_logging(app)
     _init_extensions(app)
+    _init_config_service(app)
+    _init_registry(app)
+    _init_jobs(app)
     _register_blueprints(app)
     _register_error_handlers(app)
     _init_csrf(app)
@@ -118,16 +151,21 @@ def _ensure_directories(app: Flask) -> None:
 
 def _configure_logging(app: Flask) -> None:
     log_path = Path(app.config["LOG_DIR"]) / "app.log"
-    handler = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=5)
-    handler.setFormatter(
-        logging.Formatter("%(asctime)s  %(levelname)-8s  %(name)s  %(message)s")
+    app.config.setdefault("LOG_FILE", str(log_path))
+    handler = BatchRotatingFileHandler(
+        log_path,
+        maxBytes=app.config.get("LOG_MAX_BYTES", 10 * 1024 * 1024),
+        backupCount=app.config.get("LOG_BACKUP_COUNT", 10),
     )
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
     log_level = logging.DEBUG if getattr(app, "debug", False) else logging.INFO
-    logging.basicConfig(
+    install_log_pipeline(
+        [handler, BatchStreamHandler(sys.stdout)],
         level=log_level,
-        handlers=[handler, logging.StreamHandler(sys.stdout)],
-        force=True,
+        queue_size=app.config.get("LOG_QUEUE_SIZE", 10000),
+        policy=app.config.get("LOG_QUEUE_POLICY", "drop"),
+        batch_size=app.config.get("LOG_BATCH_SIZE", 256),
     )
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
     app.logger.info("Logging initialised → %s", log_path)
@@ -136,15 +174,95 @@ def _configure_logging(app: Flask) -> None:
 def _init_extensions(app: Flask) -> None:
     """Initialise Flask extensions in one place."""
     try:
-        from extensions import db, login_manager, migrate
+        from extensions import db, login_manager
     except Exception:  # pragma: no cover - optional extensions
         return
 
     db.init_app(app)
-    migrate.init_app(app, db)
     login_manager.init_app(app)
+    # Flask-Migrate imports Alembic, which dominates start-up time, and is
+    # only used by the ``flask db`` commands.
+    names = "SQLAlchemy, LoginManager"
+    if _in_cli():
+        from extensions import migrate
+
+        migrate.init_app(app, db)
+        names += ", Migrate"
     logger = getattr(app, "logger", logging.getLogger(__name__))
-    logger.debug("Extensions initialised: SQLAlchemy, Migrate, LoginManager")
+    logger.debug("Extensions initialised: %s", names)
+
+
+def _in_cli() -> bool:
+    """Return whether the application is being built by the ``flask`` command."""
+    try:
+        import click
+    except ImportError:  # pragma: no cover - click ships with Flask
+        return False
+    return click.get_current_context(silent=True) is not None
+
+
+def _init_config_service(app: Flask) -> None:
+    """Parse ``config.json`` once at start-up and reload it on ``SIGHUP``."""
+    try:
+        from config import get_config_service, install_reload_signal
+    except Exception as exc:  # pragma: no cover - optional subsystem
+        app.logger.error("Config service unavailable: %s", exc)
+        return
+
+    get_config_service().snapshot()
+    install_reload_signal()
+
+
+def _on_database_ready(app: Flask, setup: Callable[[Flask], None]) -> None:
+    """Run ``setup(app)`` now, or before the first request under the ``flask`` command.
+
+    ``flask db upgrade`` builds the application before it creates the
+    tables and would find them already created, so under the ``flask``
+    command (which also covers ``flask run``) table setup waits until a
+    request is actually served.
+    """
+    if not _in_cli():
+        setup(app)
+        return
+    lock = threading.Lock()
+    pending = [setup]
+
+    @app.before_request
+    def _setup_database() -> None:
+        if pending:
+            with lock:
+                if pending:
+                    pending[0](app)
+                    pending.clear()
+
+
+def _init_registry(app: Flask) -> None:
+    """Create the diagram registry table and fill it on first start."""
+    if "sqlalchemy" not in getattr(app, "extensions", {}):
+        return
+
+    def setup(app: Flask) -> None:
+        from diagram_registry import ensure_table, sync_all
+        from extensions import db
+        from models import Diagram
+
+        with app.app_context():
+            if not ensure_table():
+                return
+            if db.session.execute(db.select(Diagram.id).limit(1)).first() is None:
+                sync_all()
+
+    _on_database_ready(app, setup)
+
+
+def _init_jobs(app: Flask) -> None:
+    """Start the background job queue used by the upload handlers."""
+    if "sqlalchemy" not in getattr(app, "extensions", {}):
+        return
+    from jobs import JobQueue
+
+    queue = JobQueue(app)
+    _on_database_ready(app, lambda app: queue.prepare())
 
 
 def _register_blueprints(app: Flask) -> None:
@@ -175,22 +293,26 @@ def _register_error_handlers(app: Flask) -> None:
 
 def _init_csrf(app: Flask) -> None:
     """Add CSRF protection if available and inject token helper."""
-    try:
-        from flask_wtf import CSRFProtect  # type: ignore
-        from flask_wtf.csrf import generate_csrf  # type: ignore
-    except Exception:  # pragma: no cover - optional dependency
-        CSRFProtect = None  # type: ignore[assignment]
-
-        def generate_csrf() -> str:  # type: ignore[misc]
+    if app.config.get("WTF_CSRF_ENABLED", True):
+        try:
+            from flask_wtf import CSRFProtect  # type: ignore
+        except Exception:  # pragma: no cover - optional dependency
+            CSRFProtect = None  # type: ignore[assignment]
+        if CSRFProtect is not None:
+            CSRFProtect().init_app(app)
+
+    def _csrf_token() -> str:
+        # Imported on first render rather than at start-up.
+        try:
+            from flask_wtf.csrf import generate_csrf  # type: ignore
+        except Exception:  # pragma: no cover - optional dependency
             return ""
-
-    if CSRFProtect is not None:
-        CSRFProtect().init_app(app)
+        return generate_csrf()
 
     if hasattr(app, "context_processor"):
         @app.context_processor
         def _inject_csrf() -> dict[str, Any]:  # noqa: D401
-            return {"csrf_token": generate_csrf}
+            return {"csrf_token": _csrf_token}
 
 
 def _init_template_helpers(app: Flask) -> None:
@@ -244,14 +366,97 @@ def _register_cli(app: Flask) -> None:
         db.create_all()
         click.echo("Database tables created.")
 
+    @app.cli.group("rules")
+    def _rules() -> None:  # noqa: D401
+        """Rule export maintenance commands."""
+
+    @_rules.command("ingest")
+    @click.argument("directory", type=click.Path(exists=True, file_okay=False))
+    @click.option(
+        "--processes", "-p", type=int, default=None,
+        help="Worker processes (default: CPU count).",
+    )
+    @click.option("--restart", is_flag=True, help="Ignore progress left by an interrupted run.")
+    @click.option("--user", default="cli", show_default=True, help="User recorded in the activity log.")
+    def _ingest(directory: str, processes: int | None, restart: bool, user: str) -> None:
+        """Generate diagrams for every JSON export in DIRECTORY."""
+        import time
+        from contextlib import closing
+
+        from ingest import IngestJournal, discover_files, ingest_files, journal_path_for, record_ingest
+
+        paths = discover_files(directory)
+        journal = IngestJournal(journal_path_for(app.config["DATA_DIR"], directory))
+        if restart:
+            journal.clear()
+        pending = journal.pending(paths)
+        if len(pending) < len(paths):
+            click.echo(f"Resuming: {len(paths) - len(pending)} of {len(paths)} files already done.")
+        processes = processes or os.cpu_count() or 1
+
+        failures: list[str] = []
+        generated = 0
+        done_bytes = 0
+        start = time.perf_counter()
+        outcomes = ingest_files(pending, app.config["DIAGRAMS_FOLDER"], processes)
+        with closing(outcomes), click.progressbar(
+            length=len(pending),
+            label=f"Ingesting ({processes} processes)",
+            item_show_func=lambda throughput: throughput,
+        ) as bar:
+            for path, _, error in outcomes:
+                if error is None:
+                    generated += 1
+                    journal.record(path)
+                    done_bytes += os.path.getsize(path)
+                else:
+                    failures.append(f"{os.path.basename(path)}: {error}")
+                elapsed = max(time.perf_counter() - start, 1e-9)
+                bar.update(
+                    1,
+                    f"{(generated + len(failures)) / elapsed:.1f} files/s, "
+                    f"{done_bytes / elapsed / (1024 * 1024):.1f} MB/s",
+                )
+        seconds = time.perf_counter() - start
+
+        record_ingest(directory, generated, len(failures), seconds, user)
+        journal.clear()
+        for failure in failures:
+            click.echo(f"  failed: {failure}", err=True)
+        click.echo(f"Generated {generated} files, {len(failures)} failed, in {seconds:.1f}s.")
+        if failures:
+            raise SystemExit(1)
+
 
 # --------------------------------------------------------------------------- #
-# 3. Legacy support — keep Gunicorn & Flask CLI happy
+# 3. Lazy application — keep Gunicorn & Flask CLI happy
 # --------------------------------------------------------------------------- #
 
-app = create_app()
-app.config['TEMPLATES_AUTO_RELOAD'] = True
+_APP: Flask | None = None
+_APP_LOCK = threading.Lock()
+
+
+def get_app() -> Flask:
+    """Return the process-wide application, building it on first use."""
+    global _APP
+    if _APP is None:
+        with _APP_LOCK:
+            if _APP is None:
+                app = create_app()
+                app.config["TEMPLATES_AUTO_RELOAD"] = True
+                _APP = app
+    return _APP
+
+
+def __getattr__(name: str) -> Any:
+    # ``from app import app`` (Gunicorn, ``flask --app app``) still works,
+    # but merely importing this module no longer builds an application.
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
     debug = os.getenv("FLASK_ENV") == "development"
-    app.run(host="0.0.0.0", port=port, debug=debug)
+    get_app().run(host="0.0.0.0", port=port, debug=debug)
@@ -0,0 +1,277 @@
+"""SQLite-backed index of the generated diagram catalog.
+
+The index mirrors the layout of ``DIAGRAMS_FOLDER`` (one sub-directory per
+uploaded root, holding ``.mmd``/``.json`` pairs) so that catalog, search and
+debug endpoints can answer from a single query instead of walking the
+directory tree on every request.  Each process rebuilds it on first use,
+rather than at start-up, and the upload handlers refresh it per root.
+
+Every rebuild or refresh bumps a version number, which the catalog endpoint
+uses as its ETag, and files keep the content ETag recorded in their root's
+generation manifest so clients can request versioned, immutable URLs.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from precompress import COMPRESSED_SUFFIXES
+from utils import diagram_type_from_filename, generation_etags
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["CatalogIndex", "catalog_category", "get_catalog_index"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_roots (
+    root TEXT PRIMARY KEY,
+    catalog TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_files (
+    root TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    diagram_type TEXT,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    etag TEXT,
+    PRIMARY KEY (root, filename)
+);
+CREATE INDEX IF NOT EXISTS ix_catalog_files_ext ON catalog_files (ext, root);
+CREATE INDEX IF NOT EXISTS ix_catalog_roots_catalog ON catalog_roots (catalog);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def catalog_category(root_name: str) -> str:
+    """Return the catalog category label used by the catalog page."""
+    parts = root_name.split("_")
+    category = parts[0] if len(parts) > 1 else "General"
+    subgroup = "_".join(parts[1:]) if len(parts) > 1 else "General"
+    return f"{category}_{subgroup}"
+
+
+class CatalogIndex:
+    """Persistent index of the files below ``diagrams_dir``."""
+
+    def __init__(self, diagrams_dir: str | Path, db_path: str | Path) -> None:
+        self.diagrams_dir = str(diagrams_dir)
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(catalog_files)")}
+            if "etag" not in columns:
+                conn.execute("ALTER TABLE catalog_files ADD COLUMN etag TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def _scan_root(self, root_name: str) -> List[tuple]:
+        rows = []
+        root_path = os.path.join(self.diagrams_dir, root_name)
+        etags = generation_etags(root_path)
+        with os.scandir(root_path) as entries:
+            for entry in entries:
+                # Skip hidden bookkeeping files such as the generation manifest,
+                # and the precompressed copies of the artifacts.
+                if (
+                    not entry.is_file()
+                    or entry.name.startswith(".")
+                    or entry.name.endswith(COMPRESSED_SUFFIXES)
+                ):
+                    continue
+                stem, ext = os.path.splitext(entry.name)
+                stat = entry.stat()
+                rows.append(
+                    (
+                        root_name,
+                        entry.name,
+                        stem,
+                        ext.lower(),
+                        diagram_type_from_filename(entry.name),
+                        stat.st_size,
+                        stat.st_mtime,
+                        etags.get(entry.name),
+                    )
+                )
+        return rows
+
+    def _store_root(self, conn: sqlite3.Connection, root_name: str, rows: List[tuple]) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO catalog_roots (root, catalog) VALUES (?, ?)",
+            (root_name, root_name.split("_")[0]),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO catalog_files "
+            "(root, filename, stem, ext, diagram_type, size, mtime, etag) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection) -> None:
+        # Start from a timestamp so a recreated index never reuses versions
+        # clients may still hold.
+        conn.execute(
+            "INSERT INTO catalog_meta (key, value) VALUES ('version', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1",
+            (time.time_ns() // 1_000_000,),
+        )
+
+    def rebuild(self) -> int:
+        """Rescan ``diagrams_dir`` completely and return the number of roots."""
+        scanned: Dict[str, List[tuple]] = {}
+        if os.path.isdir(self.diagrams_dir):
+            with os.scandir(self.diagrams_dir) as entries:
+                for entry in entries:
+                    if not entry.is_dir():
+                        continue
+                    try:
+                        scanned[entry.name] = self._scan_root(entry.name)
+                    except OSError as exc:
+                        LOGGER.error("Error listing directory %s: %s", entry.path, exc)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM catalog_files")
+            conn.execute("DELETE FROM catalog_roots")
+            for root_name, rows in scanned.items():
+                self._store_root(conn, root_name, rows)
+            self._bump_version(conn)
+        LOGGER.info("Catalog index rebuilt: %d roots", len(scanned))
+        return len(scanned)
+
+    def refresh_root(self, root_name: str) -> None:
+        """Re-index a single root directory after it has been (re)generated."""
+        root_path = os.path.join(self.diagrams_dir, root_name)
+        rows = self._scan_root(root_name) if os.path.isdir(root_path) else None
+        with self._connect() as conn:
+            conn.execute("DELETE FROM catalog_files WHERE root = ?", (root_name,))
+            conn.execute("DELETE FROM catalog_roots WHERE root = ?", (root_name,))
+            if rows is not None:
+                self._store_root(conn, root_name, rows)
+            self._bump_version(conn)
+        LOGGER.debug("Catalog index refreshed for %s", root_name)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def version(self) -> int:
+        """Return a number that changes whenever the indexed files change."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def catalogs(self) -> List[Dict[str, Any]]:
+        """Return catalog groups of ``.mmd`` files that have a ``.json`` sibling.
+
+        ``version`` is the diagram's content ETag when its manifest records
+        one, and ``None`` otherwise.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT m.root, m.filename, j.filename, m.diagram_type, m.etag "
+                "FROM catalog_files m JOIN catalog_files j "
+                "ON j.root = m.root AND j.filename = m.stem || '.json' "
+                "WHERE m.ext = '.mmd' ORDER BY m.root, m.filename"
+            ).fetchall()
+        catalogs: List[Dict[str, Any]] = []
+        for root_name, diagram, hierarchy, diagram_type, etag in rows:
+            if not catalogs or catalogs[-1]["entries"][0]["root"] != root_name:
+                catalogs.append({"category": catalog_category(root_name), "entries": []})
+            catalogs[-1]["entries"].append(
+                {
+                    "root": root_name,
+                    "diagram": diagram,
+                    "hierarchy": hierarchy,
+                    "type": diagram_type,
+                    "version": etag,
+                }
+            )
+        return catalogs
+
+    def catalog_names(self) -> List[str]:
+        """Return the sorted, distinct catalog prefixes of all roots."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT catalog FROM catalog_roots ORDER BY catalog"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def files(self) -> Dict[str, List[str]]:
+        """Return a mapping of root name to the files it contains."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT r.root, f.filename FROM catalog_roots r "
+                "LEFT JOIN catalog_files f ON f.root = r.root "
+                "ORDER BY r.root, f.filename"
+            ).fetchall()
+        structure: Dict[str, List[str]] = {}
+        for root_name, filename in rows:
+            names = structure.setdefault(root_name, [])
+            if filename is not None:
+                names.append(filename)
+        return structure
+
+    def diagrams(self, catalog: str = "", diagram_type: str = "") -> List[Dict[str, Any]]:
+        """Return ``.mmd`` files, optionally filtered by catalog and type.
+
+        Files without an inferable type are kept when filtering by type, which
+        mirrors the behaviour of the original directory walk.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT f.root, f.filename, f.diagram_type, f.size, f.mtime "
+                "FROM catalog_files f JOIN catalog_roots r ON r.root = f.root "
+                "WHERE f.ext = '.mmd' "
+                "AND (? = '' OR lower(r.catalog) = lower(?)) "
+                "AND (? = '' OR f.diagram_type IS NULL OR lower(f.diagram_type) = lower(?)) "
+                "ORDER BY f.root, f.filename",
+                (catalog, catalog, diagram_type, diagram_type),
+            ).fetchall()
+        return [
+            {
+                "catalog": root_name,
+                "filename": filename,
+                "type": file_type,
+                "size": size,
+                "last_modified": mtime,
+            }
+            for root_name, filename, file_type, size, mtime in rows
+        ]
+
+
+def get_catalog_index() -> CatalogIndex:
+    """Return the :class:`CatalogIndex` bound to the current application."""
+    from flask import current_app
+
+    index = current_app.extensions.get("catalog_index")
+    if index is None:
+        index = CatalogIndex(
+            current_app.config["DIAGRAMS_FOLDER"],
+            Path(current_app.config["DATA_DIR"]) / "catalog_index.sqlite3",
+        )
+        index.rebuild()
+        current_app.extensions["catalog_index"] = index
+    return index
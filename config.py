@@ -1,10 +1,27 @@
-"""Configuration loading utilities for Rules Central."""
+"""Configuration loading utilities for Rules Central.
 
+``config/config.json`` (themes, translations, displayed attributes) rarely
+changes but is read on many page loads.  :class:`ConfigService` parses it
+once per process and re-parses it only when the file's modification time or
+size changes, or when :meth:`ConfigService.reload` is called (the
+application calls it on ``SIGHUP``).  Each parse produces an immutable
+:class:`ConfigSnapshot` holding the served JSON body, its ETag and the
+per-theme ``classDefs`` compiled once instead of by every renderer.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
 import json
 import logging
 import os
+import re
+import signal
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 
 # Allow overriding the configuration file path via the ``CONFIG_PATH``
 # environment variable for flexible deployments.
@@ -15,18 +32,196 @@ CONFIG_PATH = os.environ.get(
 
 LOGGER = logging.getLogger(__name__)
 
-__all__ = ["CONFIG_PATH", "load_configurations", "Config"]
+__all__ = [
+    "CONFIG_PATH",
+    "ConfigService",
+    "ConfigSnapshot",
+    "compile_class_defs",
+    "get_config_service",
+    "install_reload_signal",
+    "load_configurations",
+    "Config",
+]
+
+_FALLBACK: Dict[str, Any] = {"translations": {}, "styles": {}}
+_CLASS_DEF_RE = re.compile(r"^\s*classDef\s+(\w+)\s+(.*?)\s*$")
+
+# (st_mtime_ns, st_size) of the parsed file, or None when it was missing.
+_Stamp = Optional[Tuple[int, int]]
+
+
+# ---------------------------------------------------------------------------
+# Derived structures
+# ---------------------------------------------------------------------------
+
+def compile_class_defs(class_defs: str) -> Dict[str, Dict[str, str]]:
+    """Parse Mermaid ``classDef`` lines into ``{class: {property: value}}``."""
+    compiled: Dict[str, Dict[str, str]] = {}
+    for line in (class_defs or "").splitlines():
+        match = _CLASS_DEF_RE.match(line)
+        if not match:
+            continue
+        props: Dict[str, str] = {}
+        for prop in match.group(2).split(","):
+            key, _, value = prop.partition(":")
+            if key.strip() and value.strip():
+                props[key.strip()] = value.strip()
+        compiled[match.group(1)] = props
+    return compiled
+
+
+def _theme_css(classes: Dict[str, Dict[str, str]]) -> str:
+    """Return the CSS the diagram viewer hands to Mermaid as ``themeCSS``."""
+    return "\n".join(
+        f".{name} rect, .{name} polygon, .{name} path "
+        f"{{ {';'.join(f'{k}:{v}' for k, v in props.items())} }}"
+        for name, props in classes.items()
+    )
+
+
+def _compile(data: Dict[str, Any]) -> Dict[str, Any]:
+    themes = data.get("themes") if isinstance(data.get("themes"), dict) else {}
+    compiled: Dict[str, Any] = {}
+    for name, theme in themes.items():
+        if not isinstance(theme, dict):
+            continue
+        classes = compile_class_defs(theme.get("classDefs") or "")
+        compiled[name] = {"classes": classes, "themeCSS": _theme_css(classes)}
+    return {"themes": compiled}
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """One parse of the configuration file and everything derived from it."""
+
+    data: Dict[str, Any]
+    compiled: Dict[str, Any]
+    body: bytes
+    etag: str
+    loaded: bool = field(default=True)
+
+    def theme(self, name: str) -> Dict[str, Any]:
+        """Return the compiled ``classes``/``themeCSS`` of theme ``name``."""
+        return self.compiled["themes"].get(name, {"classes": {}, "themeCSS": ""})
+
+
+def _snapshot(data: Dict[str, Any], loaded: bool) -> ConfigSnapshot:
+    compiled = _compile(data)
+    # The served document is the file plus its compiled form, so clients
+    # get both with one (revalidated) request.
+    body = json.dumps({**data, "compiled": compiled}, separators=(",", ":")).encode("utf-8")
+    return ConfigSnapshot(data, compiled, body, hashlib.sha256(body).hexdigest(), loaded)
+
+
+class ConfigService:
+    """Cached, hot-reloadable view of the configuration file at ``path``."""
+
+    def __init__(self, path: str | Path = CONFIG_PATH) -> None:
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._stamp: _Stamp = None
+        self._snapshot: ConfigSnapshot | None = None
+        self._stale = True
+
+    def _stat(self) -> _Stamp:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload(self) -> None:
+        """Re-parse the file on next access even if it looks unchanged."""
+        self._stale = True
+
+    def snapshot(self) -> ConfigSnapshot:
+        """Return the current :class:`ConfigSnapshot`, re-parsing if needed.
+
+        A file that cannot be read or parsed keeps the last good snapshot;
+        without one, a snapshot of the empty defaults with ``loaded`` unset
+        is returned.
+        """
+        stamp = self._stat()
+        current = self._snapshot
+        if current is not None and not self._stale and stamp == self._stamp:
+            return current
+        with self._lock:
+            if self._snapshot is not None and not self._stale and stamp == self._stamp:
+                return self._snapshot
+            self._stale = False
+            self._stamp = stamp
+            try:
+                with open(self.path, "r", encoding="utf-8") as config_file:
+                    data = json.load(config_file)
+                if not isinstance(data, dict):
+                    raise ValueError("configuration must be a JSON object")
+            except (OSError, ValueError) as err:
+                LOGGER.error("Error loading configuration file: %s", err)
+                if self._snapshot is None:
+                    self._snapshot = _snapshot(copy.deepcopy(_FALLBACK), loaded=False)
+                return self._snapshot
+            self._snapshot = _snapshot(data, loaded=True)
+            LOGGER.info("Configuration loaded from %s", self.path)
+            return self._snapshot
+
+
+_SERVICES: Dict[str, ConfigService] = {}
+_SERVICES_LOCK = threading.Lock()
+
+
+def get_config_service(path: str | Path | None = None) -> ConfigService:
+    """Return the process-wide :class:`ConfigService` for ``path``.
+
+    ``path`` defaults to :data:`CONFIG_PATH`.
+    """
+    key = str(path or CONFIG_PATH)
+    service = _SERVICES.get(key)
+    if service is None:
+        with _SERVICES_LOCK:
+            service = _SERVICES.setdefault(key, ConfigService(key))
+    return service
+
+
+_SIGNAL_INSTALLED = False
+
+
+def install_reload_signal() -> bool:
+    """Make ``SIGHUP`` reload every :class:`ConfigService` of this process.
+
+    Only possible from the main thread and on platforms with ``SIGHUP``;
+    returns whether the handler is installed.  A handler that was already
+    installed keeps being called.
+    """
+    global _SIGNAL_INSTALLED
+    if _SIGNAL_INSTALLED:
+        return True
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    previous = signal.getsignal(signal.SIGHUP)
+
+    def _reload(signum, frame):  # type: ignore[no-untyped-def]
+        LOGGER.info("SIGHUP received; configuration will be reloaded")
+        for service in list(_SERVICES.values()):
+            service.reload()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGHUP, _reload)
+    _SIGNAL_INSTALLED = True
+    return True
 
 
 def load_configurations() -> dict:
-    """Load configuration data from :data:`CONFIG_PATH`."""
+    """Load configuration data from :data:`CONFIG_PATH`.
 
-    try:
-        with open(CONFIG_PATH, "r", encoding="utf-8") as config_file:
-            return json.load(config_file)
-    except (FileNotFoundError, json.JSONDecodeError) as err:
-        LOGGER.error("Error loading configuration file: %s", err)
-        return {"translations": {}, "styles": {}}
+    The file is parsed once and cached until it changes; the caller gets
+    its own copy.
+    """
+    return copy.deepcopy(get_config_service().snapshot().data)
 
 
 class Config:
@@ -38,23 +233,12 @@ class Config:
 
     @classmethod
     def ensure_data_dir(cls):
-        """Ensure the data directory and activity log exist."""
+        """Ensure the data directory and feedback file exist.
+
+        The activity log itself lives in :mod:`activity_store`, which creates
+        its database (and imports a legacy ``ACTIVITY_LOG`` JSON) on demand.
+        """
         os.makedirs(cls.DATA_DIR, exist_ok=True)
-        if not cls.ACTIVITY_LOG.exists():
-            initial_data = {
-                "rules": {},
-                "activity_log": [
-                    {
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "action": "system",
-                        "user": "init",
-                        "details": "Activity log initialized",
-                    }
-                ],
-            }
-            with open(cls.ACTIVITY_LOG, "w", encoding="utf-8") as f:
-                json.dump(initial_data, f, indent=2)
-            cls.ACTIVITY_LOG.chmod(0o644)
         if not cls.FEEDBACK_FILE.exists():
             with open(cls.FEEDBACK_FILE, "w", encoding="utf-8") as f:
                 json.dump([], f, indent=2)
@@ -0,0 +1,262 @@
+"""Database registry of generated diagrams.
+
+:class:`models.Diagram` holds one row per generated ``.mmd`` file with its
+size, modification time, content hash, type and rule count.  The upload
+pipeline and ``flask rules ingest`` upsert the rows of the roots they
+(re)generate with :func:`sync_root` and :func:`sync_all`.
+
+:func:`list_diagrams` pages through the rows in ``(root_name, name)`` order
+using keyset pagination on the unique index over those columns: each page
+continues after the last row of the previous one (passed back as an opaque
+cursor) instead of skipping an ``OFFSET``, so deep pages cost the same as
+the first and rows added meanwhile do not shift page boundaries.
+
+The registry needs Flask-SQLAlchemy and only holds ``.mmd`` files.  The
+catalog endpoints keep answering from :mod:`catalog_index`, which also
+works without a database, pairs each diagram with its ``.json``
+hierarchy and versions the whole catalog for its ETag.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+from hierarchy_index import load_hierarchy_index
+from utils import diagram_type_from_filename, generation_containers
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "decode_cursor",
+    "encode_cursor",
+    "ensure_table",
+    "list_diagrams",
+    "scan_root",
+    "sync_all",
+    "sync_root",
+]
+
+# Columns compared to decide whether a stored row is up to date.
+_FIELDS = ("file_path", "diagram_type", "size", "mtime", "content_hash", "rule_count")
+
+
+# ---------------------------------------------------------------------------
+# Files on disk
+# ---------------------------------------------------------------------------
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _rule_count(hierarchy_path: str) -> int | None:
+    try:
+        return len(load_hierarchy_index(hierarchy_path).nodes)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def scan_root(diagrams_dir: str, root_name: str) -> List[Dict[str, Any]]:
+    """Return the registry values of the diagrams in ``root_name``, by name.
+
+    Hashes and rule counts come from the root's generation manifest; files
+    it does not describe are hashed and counted from their hierarchy.
+    """
+    root_path = os.path.join(diagrams_dir, root_name)
+    if not os.path.isdir(root_path):
+        return []
+    recorded = {
+        entry["diagram"]: entry
+        for entry in generation_containers(root_path).values()
+        if entry.get("diagram")
+    }
+    records = []
+    with os.scandir(root_path) as entries:
+        for entry in entries:
+            filename = entry.name
+            if filename.startswith(".") or not filename.endswith(".mmd") or not entry.is_file():
+                continue
+            stat = entry.stat()
+            stem = filename[: -len(".mmd")]
+            manifest_entry = recorded.get(filename, {})
+            rule_count = manifest_entry.get("rules")
+            if rule_count is None:
+                rule_count = _rule_count(os.path.join(root_path, f"{stem}.json"))
+            records.append(
+                {
+                    "name": stem,
+                    "file_path": f"{root_name}/{filename}",
+                    "diagram_type": diagram_type_from_filename(filename),
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "content_hash": manifest_entry.get("etags", {}).get(filename)
+                    or _file_hash(entry.path),
+                    "rule_count": rule_count,
+                }
+            )
+    return sorted(records, key=lambda record: record["name"])
+
+
+# ---------------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------------
+
+def ensure_table() -> bool:
+    """Make sure the ``diagrams`` table exists and return whether it does.
+
+    The table belongs to migration ``9b7e4d2a6f13``; it is only created (or
+    an unused pre-registry one replaced) here on databases that are not
+    managed by migrations, as ``flask init-db`` would.
+    """
+    from sqlalchemy import inspect
+
+    from extensions import db
+    from models import Diagram
+
+    inspector = inspect(db.engine)
+    columns = set()
+    if inspector.has_table(Diagram.__tablename__):
+        columns = {c["name"] for c in inspector.get_columns(Diagram.__tablename__)}
+        if "content_hash" in columns:
+            return True
+    if inspector.has_table("alembic_version"):
+        LOGGER.error("Table %s is not up to date; run `flask db upgrade`", Diagram.__tablename__)
+        return False
+    if columns:
+        # Nothing ever wrote to the old table; it can go if it is empty.
+        if db.session.execute(db.select(db.func.count()).select_from(Diagram.__table__)).scalar():
+            LOGGER.error("Table %s predates the registry and is not empty", Diagram.__tablename__)
+            return False
+        db.session.commit()
+        Diagram.__table__.drop(db.engine)
+    Diagram.__table__.create(db.engine, checkfirst=True)
+    return True
+
+
+def sync_root(root_name: str, user: str | None = None) -> int:
+    """Upsert the rows of ``root_name`` from disk and return the diagram count.
+
+    Rows of diagrams that no longer exist are deleted.  ``user`` is
+    recorded as the uploader of rows that were added or changed.
+    """
+    from flask import current_app
+    from sqlalchemy.exc import IntegrityError
+
+    from extensions import db
+    from models import Diagram
+
+    records = scan_root(current_app.config["DIAGRAMS_FOLDER"], root_name)
+    # A concurrent upload of the same root may insert the same rows first;
+    # the second attempt then updates them.
+    for attempt in range(2):
+        existing = {
+            row.name: row
+            for row in db.session.execute(
+                db.select(Diagram).where(Diagram.root_name == root_name)
+            ).scalars()
+        }
+        for record in records:
+            row = existing.pop(record["name"], None)
+            if row is None:
+                row = Diagram(root_name=root_name, name=record["name"])
+                db.session.add(row)
+            elif all(getattr(row, field) == record[field] for field in _FIELDS):
+                continue
+            for field in _FIELDS:
+                setattr(row, field, record[field])
+            if user:
+                row.uploaded_by = user
+        for row in existing.values():
+            db.session.delete(row)
+        try:
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                raise
+    LOGGER.debug("Diagram registry synced for %s (%d diagrams)", root_name, len(records))
+    return len(records)
+
+
+def sync_all(user: str | None = None) -> int:
+    """Sync every root in ``DIAGRAMS_FOLDER`` and return the diagram count."""
+    from flask import current_app
+
+    from extensions import db
+    from models import Diagram
+
+    diagrams_dir = current_app.config["DIAGRAMS_FOLDER"]
+    roots = []
+    if os.path.isdir(diagrams_dir):
+        with os.scandir(diagrams_dir) as entries:
+            roots = sorted(entry.name for entry in entries if entry.is_dir())
+    db.session.execute(db.delete(Diagram).where(Diagram.root_name.not_in(roots)))
+    db.session.commit()
+    count = sum(sync_root(root_name, user) for root_name in roots)
+    LOGGER.info("Diagram registry synced: %d diagrams in %d roots", count, len(roots))
+    return count
+
+
+def encode_cursor(root_name: str, name: str) -> str:
+    """Return the opaque cursor of the row ``(root_name, name)``."""
+    raw = json.dumps([root_name, name], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Return the ``(root_name, name)`` of ``cursor``; :class:`ValueError` if invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        root_name, name = json.loads(raw)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(root_name, str) or not isinstance(name, str):
+        raise ValueError("Invalid cursor")
+    return root_name, name
+
+
+def list_diagrams(
+    limit: int,
+    after: str | None = None,
+    root_name: str = "",
+    diagram_type: str = "",
+) -> Tuple[List[Any], str | None]:
+    """Return up to ``limit`` :class:`models.Diagram` rows and the next cursor.
+
+    Rows come in ``(root_name, name)`` order, starting after the row of
+    ``after``; the cursor is ``None`` on the last page.
+    """
+    from extensions import db
+    from models import Diagram
+
+    query = db.select(Diagram)
+    if root_name:
+        query = query.where(Diagram.root_name == root_name)
+    if diagram_type:
+        query = query.where(Diagram.diagram_type == diagram_type)
+    if after:
+        last_root, last_name = decode_cursor(after)
+        query = query.where(
+            db.or_(
+                Diagram.root_name > last_root,
+                db.and_(Diagram.root_name == last_root, Diagram.name > last_name),
+            )
+        )
+    rows = list(
+        db.session.execute(
+            query.order_by(Diagram.root_name, Diagram.name).limit(limit + 1)
+        ).scalars()
+    )
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.root_name, last.name)
@@ -2,7 +2,6 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_migrate import Migrate
 
 __all__ = ["db", "login_manager", "migrate"]
 
@@ -10,7 +9,15 @@ __all__ = ["db", "login_manager", "migrate"]
 # application in the factory defined in ``app.py``.
 db = SQLAlchemy()
 login_manager = LoginManager()
-migrate = Migrate()
+
+
+def __getattr__(name: str):
+    # Flask-Migrate pulls in Alembic; create it only when it is asked for.
+    if name == "migrate":
+        from flask_migrate import Migrate
+
+        return globals().setdefault("migrate", Migrate())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @login_manager.user_loader
@@ -0,0 +1,200 @@
+"""Node index of a container's hierarchy for partial ``/api/hierarchy`` reads.
+
+A container's hierarchy JSON holds every rule with its complete nested
+subtree, so even the top two levels of a large container cost megabytes.
+:class:`HierarchyIndex` keeps one shallow record per rule (its fields minus
+``Children`` and ``Actions``) plus the integer ids of its children, which is
+enough to answer depth-limited, subtree and child-paged queries without
+touching the container file.
+
+``generate_files`` writes the index next to the container JSON as a hidden
+``.<name>.index.json`` file.  Containers generated before indexes existed
+have theirs built from the JSON file on first use.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+from rule_model import ACTION_TYPES, RULE_TYPES, rule_to_json
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["HierarchyIndex", "index_path_for", "load_hierarchy_index"]
+
+_NESTED_FIELDS = frozenset({"Children", "Actions", "ParentGUID", "ParentActionIndex"})
+# Action index recorded for entries of a rule's ``Children`` list.
+_NO_ACTION = -1
+
+
+def index_path_for(json_path: str) -> str:
+    """Return the path of the index belonging to the hierarchy ``json_path``."""
+    directory, filename = os.path.split(json_path)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, f".{stem}.index.json")
+
+
+class HierarchyIndex:
+    """Shallow rule records and child links of one container."""
+
+    def __init__(
+        self,
+        nodes: List[Dict[str, Any]],
+        children: List[List[Tuple[int, int]]],
+        roots: List[int],
+    ) -> None:
+        self.nodes = nodes
+        # Per node: (child id, action index or -1 for ``Children`` entries).
+        self.children = children
+        self.roots = roots
+        self.ids = {node["RuleGUID"]: i for i, node in enumerate(nodes)}
+
+    @classmethod
+    def from_rules(cls, rules: Iterable[Any]) -> "HierarchyIndex":
+        """Index the flattened ``rules`` of a container.
+
+        Rules without a parent in ``rules`` become roots; children that are
+        not part of ``rules`` (e.g. placed in another container) are left out.
+        """
+        rules = [r for r in rules if type(r) in RULE_TYPES and r.get("RuleGUID")]
+        ids: Dict[str, int] = {}
+        for rule in rules:
+            ids.setdefault(rule["RuleGUID"], len(ids))
+        nodes: List[Dict[str, Any]] = [{} for _ in ids]
+        children: List[List[Tuple[int, int]]] = [[] for _ in ids]
+        parented = set()
+        for rule in rules:
+            node = ids[rule["RuleGUID"]]
+            if nodes[node]:
+                continue
+            nodes[node] = {k: v for k, v in rule.items() if k not in _NESTED_FIELDS}
+            linked = set()
+            kids = [(child, _NO_ACTION) for child in rule.get("Children") or ()]
+            for action_index, action in enumerate(rule.get("Actions") or ()):
+                if type(action) in ACTION_TYPES:
+                    kids.extend((child, action_index) for child in action.get("ChildRules") or ())
+            for child, action_index in kids:
+                child_id = ids.get(child.get("RuleGUID")) if type(child) in RULE_TYPES else None
+                if child_id is None or child_id in linked or child_id == node:
+                    continue
+                linked.add(child_id)
+                parented.add(child_id)
+                children[node].append((child_id, action_index))
+        roots = [
+            ids[rule["RuleGUID"]]
+            for rule in rules
+            if not rule.get("ParentGUID") or rule.get("ParentGUID") not in ids
+        ]
+        # A rule listed twice keeps its first position only.
+        roots = list(dict.fromkeys(roots))
+        if not roots and nodes:
+            roots = [n for n in range(len(nodes)) if n not in parented] or [0]
+        return cls(nodes, children, roots)
+
+    @classmethod
+    def from_json(cls, text: str) -> "HierarchyIndex":
+        data = json.loads(text)
+        return cls(
+            data["nodes"],
+            [[tuple(link) for link in links] for links in data["children"]],
+            data["roots"],
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"nodes": self.nodes, "children": self.children, "roots": self.roots},
+            separators=(",", ":"),
+            default=rule_to_json,
+        )
+
+    def select(
+        self,
+        subtree: str | None = None,
+        depth: int | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> Dict[str, Any]:
+        """Return part of the hierarchy as flat shallow rules in pre-order.
+
+        Without ``subtree`` the walk starts at the container's roots,
+        otherwise at the rule with that GUID (:class:`KeyError` if unknown).
+        ``depth`` bounds the levels below the starting rules.  ``offset``
+        and ``limit`` page the roots, or the children of ``subtree``; every
+        deeper level is cut to its first ``limit`` children.
+
+        Each rule carries ``ParentGUID``/``ParentActionIndex`` for its place
+        in this walk, its ``Depth`` and its total ``ChildCount``, so clients
+        can request the missing children later.
+        """
+        end = None if limit is None else offset + limit
+        if subtree is None:
+            total = len(self.roots)
+            stack = [(node, -1, _NO_ACTION, 0) for node in reversed(self.roots[offset:end])]
+        else:
+            start = self.ids[subtree]
+            total = len(self.children[start])
+            stack = [(start, -1, _NO_ACTION, 0)]
+
+        rules: List[Dict[str, Any]] = []
+        seen = set()
+        while stack:
+            node, parent, action_index, level = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            kids = self.children[node]
+            rules.append(
+                {
+                    **self.nodes[node],
+                    "ParentGUID": self.nodes[parent]["RuleGUID"] if parent >= 0 else None,
+                    "ParentActionIndex": action_index if action_index >= 0 else None,
+                    "Depth": level,
+                    "ChildCount": len(kids),
+                }
+            )
+            if depth is not None and level >= depth:
+                continue
+            page = kids[offset:end] if subtree is not None and level == 0 else kids[:limit]
+            stack.extend((child, node, ai, level + 1) for child, ai in reversed(page))
+
+        return {
+            "subtree": subtree,
+            "depth": depth,
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "rules": rules,
+        }
+
+
+@lru_cache(maxsize=64)
+def _load(json_path: str, json_mtime: int, index_mtime: int | None) -> HierarchyIndex:
+    if index_mtime is not None and index_mtime >= json_mtime:
+        with open(index_path_for(json_path), "r", encoding="utf-8") as f:
+            return HierarchyIndex.from_json(f.read())
+    LOGGER.info("Building hierarchy index for %s", json_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("rules", [data])
+    if not isinstance(data, list):
+        raise ValueError("Invalid hierarchy format")
+    return HierarchyIndex.from_rules(data)
+
+
+def load_hierarchy_index(json_path: str) -> HierarchyIndex:
+    """Return the index of ``json_path``, cached until either file changes.
+
+    An index older than its hierarchy file is ignored and rebuilt from the
+    file.  Raises :class:`FileNotFoundError` if ``json_path`` is missing.
+    """
+    json_mtime = os.stat(json_path).st_mtime_ns
+    try:
+        index_mtime: int | None = os.stat(index_path_for(json_path)).st_mtime_ns
+    except OSError:
+        index_mtime = None
+    return _load(json_path, json_mtime, index_mtime)
@@ -0,0 +1,149 @@
+"""Validators and cache headers for generated diagram artifacts.
+
+Generated ``.mmd``/``.json`` files are served with a strong ETag holding the
+SHA-256 of their contents.  The digest is recorded in the generation
+manifest when the file is written, so answering a request costs a manifest
+lookup rather than a read of the file.  Files generated before manifests
+carried ETags are hashed once and remembered until they change on disk.
+
+Clients accepting ``br`` or ``gzip`` are sent the precompressed sibling
+written at generation time (see :mod:`precompress`), with an ETag specific
+to that encoding.  Conditional requests (``If-None-Match``/
+``If-Modified-Since``) are answered with ``304 Not Modified``.  A request naming the current ETag in its
+``?v=`` parameter addresses an immutable version of the file and may be
+cached for a year; unversioned URLs must be revalidated on every use.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from typing import Dict, Tuple
+
+from precompress import ENCODINGS, compressed_variant
+from utils import GENERATION_MANIFEST, generation_etags
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "IMMUTABLE_CACHE",
+    "REVALIDATE_CACHE",
+    "VERSION_ARG",
+    "file_etag",
+    "not_modified",
+    "send_artifact",
+]
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+VERSION_ARG = "v"
+
+_LOCK = threading.Lock()
+# Directory -> (manifest mtime, {filename: etag}).
+_MANIFESTS: Dict[str, Tuple[int, Dict[str, str]]] = {}
+# Path -> ((mtime, size), etag) for files missing from their manifest.
+_HASHED: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def _manifest_etags(directory: str) -> Dict[str, str]:
+    try:
+        mtime = os.stat(os.path.join(directory, GENERATION_MANIFEST)).st_mtime_ns
+    except OSError:
+        return {}
+    with _LOCK:
+        cached = _MANIFESTS.get(directory)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    etags = generation_etags(directory)
+    with _LOCK:
+        _MANIFESTS[directory] = (mtime, etags)
+    return etags
+
+
+def _hash_file(path: str) -> str | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _LOCK:
+        cached = _HASHED.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    etag = digest.hexdigest()
+    with _LOCK:
+        _HASHED[path] = (key, etag)
+    return etag
+
+
+def file_etag(directory: str, filename: str) -> str | None:
+    """Return the content ETag of ``filename`` in ``directory``.
+
+    Returns ``None`` when the file does not exist.
+    """
+    etag = _manifest_etags(directory).get(filename)
+    if etag is not None:
+        return etag
+    return _hash_file(os.path.join(directory, filename))
+
+
+def not_modified(etag: str):
+    """Return a ``304`` response if the request already holds ``etag``.
+
+    Lets endpoints skip building a body the client has cached; returns
+    ``None`` when the full response is needed.
+    """
+    from flask import make_response, request
+
+    if etag not in request.if_none_match:
+        return None
+    response = make_response("", 304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = REVALIDATE_CACHE
+    return response
+
+
+def _negotiate_encoding(path: str) -> Tuple[str | None, str | None]:
+    """Return ``(encoding, variant path)`` of the best accepted variant."""
+    from flask import request
+
+    available = [e for e in ENCODINGS if compressed_variant(path, e) is not None]
+    encoding = request.accept_encodings.best_match(available) if available else None
+    if encoding is None:
+        return None, None
+    return encoding, compressed_variant(path, encoding)
+
+
+def send_artifact(directory: str, filename: str):
+    """Send a generated file with its content ETag and cache headers.
+
+    The response is made conditional, so matching ``If-None-Match`` or
+    ``If-Modified-Since`` headers produce a ``304`` without a body.
+    """
+    from flask import request, send_from_directory
+
+    etag = file_etag(directory, filename)
+    encoding, variant = _negotiate_encoding(os.path.join(directory, filename))
+    if variant is None:
+        response = send_from_directory(directory, filename, etag=etag or True)
+    else:
+        response = send_from_directory(
+            directory,
+            os.path.basename(variant),
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            etag=f"{etag}-{encoding}" if etag else True,
+        )
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    if etag is not None and request.args.get(VERSION_ARG) == etag:
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE
+    else:
+        response.headers["Cache-Control"] = REVALIDATE_CACHE
+    return response
@@ -0,0 +1,173 @@
+"""Bulk ingestion of a directory of rule exports (``flask rules ingest``).
+
+Reprocessing every export after a change to the generation logic used to
+take one HTTP upload per file.  :func:`ingest_files` runs the parse and
+generation step of the upload pipeline (:func:`jobs.generate_upload`) for
+a whole directory across a process pool, and :func:`record_ingest` then
+refreshes the diagram indexes and registry once and writes a single
+activity entry for the run instead of one per file.
+
+Progress is kept in an :class:`IngestJournal`, an append-only file with one
+line per generated export.  A run that is interrupted leaves its journal
+behind; the next run over the same directory skips the exports recorded
+there unless they changed since.  A run that completes removes it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from jobs import Outcome, generate_upload, process_pool
+from utils import log_activity
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "IngestJournal",
+    "discover_files",
+    "ingest_files",
+    "journal_path_for",
+    "record_ingest",
+]
+
+# (st_size, st_mtime_ns) of an export when it was generated.
+_Stamp = Tuple[int, int]
+
+
+def discover_files(directory: str | Path) -> List[str]:
+    """Return the ``.json`` exports directly inside ``directory``, sorted."""
+    with os.scandir(directory) as entries:
+        return sorted(
+            entry.path
+            for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(".json")
+        )
+
+
+def _stamp(path: str) -> _Stamp:
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def journal_path_for(data_dir: str | Path, directory: str | Path) -> str:
+    """Return the journal location for ingesting ``directory``."""
+    source = os.path.abspath(directory)
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(data_dir, f"ingest-{digest}.journal")
+
+
+class IngestJournal:
+    """Append-only record of the exports generated by an unfinished run."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = str(path)
+
+    def completed(self) -> Dict[str, _Stamp]:
+        """Return ``{path: stamp}`` of the exports recorded so far."""
+        done: Dict[str, _Stamp] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        path, size, mtime = json.loads(line)
+                    except ValueError:  # torn last line of a killed run
+                        continue
+                    done[path] = (size, mtime)
+        except FileNotFoundError:
+            pass
+        return done
+
+    def pending(self, paths: Iterable[str]) -> List[str]:
+        """Return the ``paths`` not yet generated in their current version."""
+        done = self.completed()
+        pending = []
+        for path in paths:
+            try:
+                if done.get(path) == _stamp(path):
+                    continue
+            except OSError:
+                pass
+            pending.append(path)
+        return pending
+
+    def record(self, path: str) -> None:
+        """Record ``path`` as generated."""
+        size, mtime = _stamp(path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps([path, size, mtime]) + "\n")
+
+    def clear(self) -> None:
+        """Forget all progress."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def ingest_files(
+    paths: List[str],
+    diagrams_dir: str | Path,
+    processes: int = 1,
+) -> Iterator[Outcome]:
+    """Generate diagrams for ``paths``, yielding ``(path, root, error)`` as each finishes.
+
+    With ``processes > 1`` the files are spread over a process pool and
+    outcomes arrive in completion order.  Closing the generator early
+    cancels the files not started yet.
+    """
+    def outcome(path: str, generate) -> Outcome:
+        try:
+            return path, generate(), None
+        except Exception as exc:
+            LOGGER.error("Ingest error: %s - %s", path, exc)
+            return path, None, str(exc)
+
+    if processes <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield outcome(path, lambda: generate_upload(path, diagrams_dir))
+        return
+
+    pool = process_pool(min(processes, len(paths)))
+    try:
+        futures = {pool.submit(generate_upload, path, diagrams_dir): path for path in paths}
+        for future in as_completed(futures):
+            yield outcome(futures[future], future.result)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def record_ingest(
+    directory: str | Path,
+    generated: int,
+    failed: int,
+    seconds: float,
+    user: str = "cli",
+) -> None:
+    """Re-index and register all diagrams and log one activity entry for an ingest run."""
+    from flask import current_app
+
+    from catalog_index import get_catalog_index
+    from diagram_registry import ensure_table, sync_all
+    from response_cache import get_hierarchy_cache
+    from search_index import get_search_index
+
+    get_catalog_index().rebuild()
+    get_search_index().sync()
+    if ensure_table():
+        sync_all(user)
+    get_hierarchy_cache().invalidate(current_app.config["DIAGRAMS_FOLDER"])
+    log_activity(
+        action="ingest",
+        user=user,
+        details=(
+            f"Ingested {generated} files from {os.path.abspath(directory)}"
+            f" ({failed} failed) in {seconds:.1f}s"
+        ),
+    )
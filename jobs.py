@@ -0,0 +1,364 @@
+"""In-process background jobs for upload processing.
+
+Uploads are saved to ``UPLOAD_FOLDER`` inside the request and then handed to
+a :class:`JobQueue`, whose worker pool runs the parse → generate → index →
+log pipeline for each file, optionally fanning generation out to
+``UPLOAD_PROCESSES`` worker processes.  Job state lives in the
+:class:`models.Job` table so any worker process can answer
+``/api/jobs/<id>`` polls.
+
+Each queue touches the rows of the jobs it holds every
+``JOB_HEARTBEAT_SECONDS``.  Queued or running jobs left untouched for three
+intervals belong to a process that stopped; they are marked failed at
+start-up and by every heartbeat after it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from log_reader import LOG_FORMAT
+from utils import (
+    ensure_directory_exists,
+    generate_files,
+    load_rule_nodes,
+    log_activity,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "JOB_QUEUED",
+    "JOB_RUNNING",
+    "JOB_SUCCEEDED",
+    "JOB_PARTIAL",
+    "JOB_FAILED",
+    "JobQueue",
+    "get_job_queue",
+    "generate_upload",
+    "record_upload",
+    "process_pool",
+    "process_upload",
+    "run_uploads",
+]
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_PARTIAL = "partial"
+JOB_FAILED = "failed"
+
+# Error recorded for jobs whose process stopped before finishing them.
+_ORPHANED = "Interrupted: the process running this job stopped"
+
+JobItem = Dict[str, Any]
+# (item name, result or None, error message or None)
+Outcome = Tuple[str, Any, str | None]
+
+
+# ---------------------------------------------------------------------------
+# Upload pipeline
+# ---------------------------------------------------------------------------
+
+def generate_upload(file_path: str | Path, diagrams_dir: str | Path) -> str:
+    """Parse an uploaded export, write its diagrams and return its root name.
+
+    This step needs no application context, so it can run in a worker
+    process.  Raises :class:`ValueError` when the file holds no valid rules.
+    """
+    json_data = load_rule_nodes(file_path)
+    if not json_data:
+        raise ValueError("Invalid JSON content")
+
+    root_name = Path(file_path).stem
+    output_dir = os.path.join(diagrams_dir, root_name)
+    ensure_directory_exists(output_dir)
+    generate_files(json_data, output_dir)
+    return root_name
+
+
+def record_upload(root_name: str, filename: str, user: str = "anonymous") -> None:
+    """Refresh the diagram indexes and registry for ``root_name`` and log the upload."""
+    from flask import current_app
+
+    from catalog_index import get_catalog_index
+    from diagram_registry import sync_root
+    from response_cache import get_hierarchy_cache
+    from search_index import get_search_index
+
+    get_catalog_index().refresh_root(root_name)
+    get_search_index().index_root(root_name)
+    sync_root(root_name, user)
+    # Entries are also checked against the file's mtime on every hit; this
+    # just frees the replaced bodies right away.
+    get_hierarchy_cache().invalidate(
+        os.path.join(current_app.config["DIAGRAMS_FOLDER"], root_name) + os.sep
+    )
+    log_activity(
+        action="upload",
+        rule_id=root_name,
+        user=user,
+        details=f"Uploaded {filename}",
+    )
+
+
+def process_upload(file_path: str | Path, diagrams_dir: str | Path, user: str = "anonymous") -> str:
+    """Run the full upload pipeline for one file and return its root name."""
+    root_name = generate_upload(file_path, diagrams_dir)
+    record_upload(root_name, Path(file_path).name, user)
+    return root_name
+
+
+def _init_worker(level: int) -> None:
+    # The parent's queue handler needs a listener thread the worker does
+    # not have; workers log straight to stderr instead.
+    logging.basicConfig(level=level, format=LOG_FORMAT, force=True)
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Return a process pool for the generation step of the upload pipeline.
+
+    Workers are spawned rather than forked: the pool is created from job
+    threads, and a forked child would inherit locks held by other threads
+    of the parent along with its logging queue.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(logging.getLogger().getEffectiveLevel(),),
+    )
+
+
+def run_uploads(items: List[JobItem], processes: int = 1) -> Iterator[Outcome]:
+    """Process queued upload items, yielding ``(name, root, error)`` in input order.
+
+    With ``processes > 1`` the CPU-bound parse and generation steps run in a
+    process pool; indexing and activity logging stay in the calling process
+    because they need the application context.
+    """
+    def finish(item: JobItem, generate: Callable[[], str]) -> Outcome:
+        try:
+            root_name = generate()
+            record_upload(root_name, item["name"], item.get("user") or "anonymous")
+        except Exception as exc:
+            LOGGER.error("Upload error: %s - %s", item["name"], exc)
+            return item["name"], None, str(exc)
+        return item["name"], root_name, None
+
+    if processes > 1 and len(items) > 1:
+        with process_pool(min(processes, len(items))) as pool:
+            futures = [
+                pool.submit(generate_upload, item["path"], item["diagrams_dir"])
+                for item in items
+            ]
+            for item, future in zip(items, futures):
+                yield finish(item, future.result)
+        return
+
+    for item in items:
+        yield finish(item, lambda: generate_upload(item["path"], item["diagrams_dir"]))
+
+
+# ---------------------------------------------------------------------------
+# Job queue
+# ---------------------------------------------------------------------------
+
+class JobQueue:
+    """Thread-pool job runner persisting progress in :class:`models.Job`."""
+
+    def __init__(self, app=None) -> None:
+        self.app = None
+        self.executor: ThreadPoolExecutor | None = None
+        self.heartbeat = 30.0
+        # Ids of the jobs queued or running in this process.
+        self._active: set[str] = set()
+        self._active_lock = threading.Lock()
+        self._heartbeat_thread: threading.Thread | None = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(app.config.get("JOB_WORKERS", 4)),
+            thread_name_prefix="rules-job",
+        )
+        self.heartbeat = float(app.config.get("JOB_HEARTBEAT_SECONDS", 30))
+        app.extensions["job_queue"] = self
+
+    def prepare(self) -> None:
+        """Check the ``jobs`` table, fail orphaned jobs and start the heartbeat.
+
+        The table belongs to migration ``3f1d9a7c2b44``; it is only created
+        here on databases that are not managed by migrations, as
+        ``flask init-db`` would.
+        """
+        from sqlalchemy import inspect
+
+        from extensions import db
+        from models import Job
+
+        with self.app.app_context():
+            inspector = inspect(db.engine)
+            if not inspector.has_table(Job.__tablename__):
+                if inspector.has_table("alembic_version"):
+                    LOGGER.error("Table %s is missing; run `flask db upgrade`", Job.__tablename__)
+                    return
+                Job.__table__.create(db.engine, checkfirst=True)
+            self.fail_orphans()
+        if self._heartbeat_thread is None:
+            self._heartbeat_thread = threading.Thread(
+                target=self._beat, name="rules-job-heartbeat", daemon=True
+            )
+            self._heartbeat_thread.start()
+
+    def fail_orphans(self) -> int:
+        """Mark queued and running jobs whose process stopped as failed.
+
+        Needs an application context.  Returns the number of jobs failed.
+        """
+        from extensions import db
+        from models import Job
+
+        cutoff = datetime.utcnow() - timedelta(seconds=3 * self.heartbeat)
+        with self._active_lock:
+            active = list(self._active)
+        query = db.select(Job).where(
+            Job.status.in_((JOB_QUEUED, JOB_RUNNING)),
+            db.or_(Job.updated_at.is_(None), Job.updated_at < cutoff),
+        )
+        if active:
+            query = query.where(Job.id.not_in(active))
+        orphans = list(db.session.execute(query).scalars())
+        for job in orphans:
+            job.status = JOB_FAILED
+            job.errors = json.dumps(json.loads(job.errors or "[]") + [_ORPHANED])
+            job.finished_at = datetime.utcnow()
+        db.session.commit()
+        if orphans:
+            LOGGER.warning("Marked %d orphaned jobs as failed", len(orphans))
+        return len(orphans)
+
+    def _beat(self) -> None:
+        from extensions import db
+        from models import Job
+
+        while True:
+            time.sleep(self.heartbeat)
+            try:
+                with self.app.app_context():
+                    with self._active_lock:
+                        active = list(self._active)
+                    if active:
+                        db.session.execute(
+                            db.update(Job)
+                            .where(Job.id.in_(active))
+                            .values(updated_at=datetime.utcnow())
+                        )
+                        db.session.commit()
+                    self.fail_orphans()
+            except Exception as exc:  # pragma: no cover - database failures
+                LOGGER.error("Job heartbeat failed: %s", exc)
+
+    def submit(
+        self,
+        kind: str,
+        items: List[JobItem],
+        runner: Callable[[List[JobItem]], Iterator[Outcome]],
+        user: str | None = None,
+    ) -> str:
+        """Persist a new job for ``items`` and schedule it; return the job id.
+
+        ``runner`` receives the items on a worker thread and yields one
+        ``(name, result, error)`` outcome per item as it completes.
+        """
+        from extensions import db
+        from models import Job
+
+        job = Job(
+            id=str(uuid.uuid4()),
+            kind=kind,
+            status=JOB_QUEUED,
+            user=user,
+            total=len(items),
+            completed=0,
+            results="[]",
+            errors="[]",
+        )
+        db.session.add(job)
+        db.session.commit()
+        with self._active_lock:
+            self._active.add(job.id)
+        self.executor.submit(self._run, job.id, list(items), runner)
+        LOGGER.info("Job %s queued: %s (%d items)", job.id, kind, len(items))
+        return job.id
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        """Return the status snapshot of ``job_id`` or ``None`` if unknown."""
+        from extensions import db
+        from models import Job
+
+        job = db.session.get(Job, job_id)
+        return job.to_dict() if job is not None else None
+
+    def _run(
+        self,
+        job_id: str,
+        items: List[JobItem],
+        runner: Callable[[List[JobItem]], Iterator[Outcome]],
+    ) -> None:
+        from extensions import db
+        from models import Job
+
+        try:
+            with self.app.app_context():
+                job = db.session.get(Job, job_id)
+                try:
+                    job.status = JOB_RUNNING
+                    db.session.commit()
+                    results: list = []
+                    errors: list[str] = []
+                    for name, _, error in runner(items):
+                        if error is None:
+                            results.append(name)
+                        else:
+                            errors.append(f"{name}: {error}")
+                        job.completed += 1
+                        job.results = json.dumps(results)
+                        job.errors = json.dumps(errors)
+                        db.session.commit()
+                    if not errors:
+                        job.status = JOB_SUCCEEDED
+                    elif results:
+                        job.status = JOB_PARTIAL
+                    else:
+                        job.status = JOB_FAILED
+                except Exception as exc:  # pragma: no cover - database failures
+                    LOGGER.error("Job %s aborted: %s", job_id, exc, exc_info=True)
+                    db.session.rollback()
+                    job.status = JOB_FAILED
+                    job.errors = json.dumps([str(exc)])
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                LOGGER.info("Job %s finished: %s", job_id, job.status)
+        finally:
+            with self._active_lock:
+                self._active.discard(job_id)
+
+
+def get_job_queue() -> JobQueue:
+    """Return the :class:`JobQueue` bound to the current application."""
+    from flask import current_app
+
+    return current_app.extensions["job_queue"]
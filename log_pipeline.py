@@ -0,0 +1,229 @@
+"""Queue-based logging so request threads never block on log I/O.
+
+Handlers attached straight to the root logger make every request thread
+write to the log file (and check for rotation) under the handler lock.
+:func:`install` instead gives the root logger a single
+:class:`BoundedQueueHandler` and moves the real handlers behind a
+:class:`BatchingQueueListener`, whose background thread writes queued
+records in batches and flushes each handler once per batch.
+
+The queue is bounded.  When it is full, the ``"drop"`` policy discards
+records below ``WARNING`` (warnings and errors still wait for room) and the
+``"block"`` policy makes every caller wait.  Dropped records are counted
+and reported in the log once the queue drains.
+
+Heavy debug payloads can be wrapped in :class:`LazyRepr`: records holding
+one are formatted on the writer thread instead of the caller's, and the
+representation is size-bounded.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import logging
+import queue
+import reprlib
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Iterable
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "POLICY_BLOCK",
+    "POLICY_DROP",
+    "BatchFlushMixin",
+    "BatchRotatingFileHandler",
+    "BatchStreamHandler",
+    "BoundedQueueHandler",
+    "BatchingQueueListener",
+    "LazyRepr",
+    "install",
+]
+
+POLICY_DROP = "drop"
+POLICY_BLOCK = "block"
+
+_REPR = reprlib.Repr()
+_REPR.maxlevel = 4
+_REPR.maxlist = _REPR.maxdict = _REPR.maxtuple = _REPR.maxset = 20
+_REPR.maxstring = _REPR.maxother = 200
+
+
+class LazyRepr:
+    """Log argument rendered with a bounded ``repr`` only when formatted."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __str__(self) -> str:
+        return _REPR.repr(self.value)
+
+    __repr__ = __str__
+
+
+class BatchFlushMixin:
+    """Let :class:`BatchingQueueListener` flush a stream handler once per batch."""
+
+    batching = False
+
+    def flush(self) -> None:
+        if not self.batching:
+            super().flush()  # type: ignore[misc]
+
+
+class BatchRotatingFileHandler(BatchFlushMixin, RotatingFileHandler):
+    """:class:`RotatingFileHandler` with batched flushing."""
+
+
+class BatchStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    """:class:`logging.StreamHandler` with batched flushing."""
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler applying a drop or backpressure policy when full."""
+
+    def __init__(self, log_queue: queue.Queue, policy: str = POLICY_DROP) -> None:
+        if policy not in (POLICY_DROP, POLICY_BLOCK):
+            raise ValueError(f"Unknown log queue policy: {policy}")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the message is merged here; the writer thread's handlers apply
+        # their own formats.  Records carrying lazy payloads keep their args
+        # and are merged by the writer thread too.
+        record = copy.copy(record)
+        args = record.args if isinstance(record.args, tuple) else ()
+        if not any(isinstance(arg, LazyRepr) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            # Tracebacks reference live frames, so they are rendered now.
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == POLICY_BLOCK or record.levelno >= logging.WARNING:
+            self.queue.put(record)
+        else:
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                with self._dropped_lock:
+                    self.dropped += 1
+                return
+        if self.dropped:
+            self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        with self._dropped_lock:
+            count, self.dropped = self.dropped, 0
+        if not count:
+            return
+        record = logging.LogRecord(
+            LOGGER.name, logging.WARNING, __file__, 0,
+            "Log queue full: dropped %d records", (count,), None,
+        )
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Still no room; report with the next record that fits.
+            with self._dropped_lock:
+                self.dropped += count
+
+
+class BatchingQueueListener(QueueListener):
+    """Queue listener writing up to ``batch_size`` records per handler flush."""
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        *handlers: logging.Handler,
+        batch_size: int = 256,
+    ) -> None:
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = max(1, batch_size)
+
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than failing when the queue is full.
+        self.queue.put(self._sentinel)
+
+    def _monitor(self) -> None:
+        q = self.queue
+        batching = [h for h in self.handlers if isinstance(h, BatchFlushMixin)]
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            for handler in batching:
+                handler.batching = True
+            stop = False
+            try:
+                for record in batch:
+                    if record is self._sentinel:
+                        stop = True
+                    else:
+                        self.handle(record)
+            finally:
+                for handler in batching:
+                    handler.batching = False
+                    try:
+                        handler.flush()
+                    except (OSError, ValueError):
+                        # Stream already closed, as during interpreter
+                        # shutdown; logging.shutdown ignores these too.
+                        pass
+                for _ in batch:
+                    q.task_done()
+            if stop:
+                break
+
+
+_LISTENER: BatchingQueueListener | None = None
+_LISTENER_LOCK = threading.Lock()
+
+
+def _stop() -> None:
+    global _LISTENER
+    with _LISTENER_LOCK:
+        if _LISTENER is not None:
+            _LISTENER.stop()
+            for handler in _LISTENER.handlers:
+                handler.close()
+            _LISTENER = None
+
+
+atexit.register(_stop)
+
+
+def install(
+    handlers: Iterable[logging.Handler],
+    level: int,
+    queue_size: int = 10_000,
+    policy: str = POLICY_DROP,
+    batch_size: int = 256,
+) -> BoundedQueueHandler:
+    """Route the root logger through a queue to ``handlers``.
+
+    Replaces any pipeline installed earlier, flushing its queue first.
+    """
+    global _LISTENER
+    _stop()
+    log_queue: queue.Queue = queue.Queue(maxsize=max(0, queue_size))
+    queue_handler = BoundedQueueHandler(log_queue, policy)
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
+    listener = BatchingQueueListener(log_queue, *handlers, batch_size=batch_size)
+    with _LISTENER_LOCK:
+        _LISTENER = listener
+    listener.start()
+    return queue_handler
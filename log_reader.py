@@ -0,0 +1,231 @@
+"""Bounded reads of the rotating application log.
+
+``/api/logs`` used to load the whole current log file into memory and
+ignored rotated backups.  :class:`LogReader` treats ``app.log.N`` …
+``app.log.1``, ``app.log`` as one stream, oldest first, and offers:
+
+* :meth:`LogReader.tail` — the last ``N`` records, found by reading the
+  files backwards in fixed-size blocks;
+* :meth:`LogReader.read` — incremental reads from an opaque cursor, at most
+  ``max_bytes`` per call, for polling clients.
+
+Cursors are ``"<inode>:<offset>"`` pairs.  ``RotatingFileHandler`` rotates
+by renaming, so a file keeps its inode when it becomes ``app.log.1`` and a
+cursor stays valid across rotations until its file is deleted.
+
+Records are lines starting with a timestamp; the lines that follow
+(e.g. tracebacks) belong to the record before them, and level filtering
+applies to whole records.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Any, Dict, Iterator, List, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["LOG_FORMAT", "LogReader", "parse_level"]
+
+LOG_FORMAT = "%(asctime)s  %(levelname)-8s  %(name)s  %(message)s"
+
+_RECORD_RE = re.compile(
+    rb"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}\s+(DEBUG|INFO|WARNING|ERROR|CRITICAL)\b"
+)
+_BLOCK_SIZE = 64 * 1024
+
+
+def parse_level(name: str) -> int:
+    """Return the numeric level for ``name`` (e.g. ``"warning"``).
+
+    Raises :class:`ValueError` for unknown level names.
+    """
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {name}")
+    return level
+
+
+def _record_level(line: bytes) -> int | None:
+    match = _RECORD_RE.match(line)
+    return logging.getLevelName(match.group(1).decode()) if match else None
+
+
+def _reverse_lines(path: str, end: int) -> Iterator[bytes]:
+    """Yield the lines of ``path`` before byte ``end``, last line first.
+
+    ``end`` must be 0 or just past a newline.
+    """
+    with open(path, "rb") as f:
+        pos = end
+        head = b""
+        while pos > 0:
+            size = min(_BLOCK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + head).split(b"\n")
+            if pos + size == end:
+                lines.pop()  # empty piece after the final newline
+            # The first piece may continue in the previous block.
+            head = lines.pop(0)
+            yield from reversed(lines)
+        if end:
+            yield head
+
+
+def _complete_end(path: str, size: int) -> int:
+    """Return the offset just past the last newline in the first ``size`` bytes."""
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            start = max(0, pos - _BLOCK_SIZE)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            pos = start
+    return 0
+
+
+class LogReader:
+    """Read the log at ``path`` together with its numbered backups."""
+
+    def __init__(self, path: str) -> None:
+        self.path = str(path)
+
+    def files(self) -> List[str]:
+        """Return the existing log files, oldest first."""
+        directory, base = os.path.split(self.path)
+        backups = []
+        try:
+            names = os.listdir(directory or ".")
+        except OSError:
+            names = []
+        for name in names:
+            suffix = name[len(base) + 1 :]
+            if name.startswith(base + ".") and suffix.isdigit():
+                backups.append((int(suffix), os.path.join(directory, name)))
+        paths = [path for _, path in sorted(backups, reverse=True)]
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        return paths
+
+    def _stats(self) -> List[Tuple[str, os.stat_result]]:
+        stats = []
+        for path in self.files():
+            try:
+                stats.append((path, os.stat(path)))
+            except OSError:  # rotated away while listing
+                continue
+        return stats
+
+    @staticmethod
+    def _cursor(stat: os.stat_result, offset: int) -> str:
+        return f"{stat.st_ino}:{offset}"
+
+    def tail(self, count: int, min_level: int = logging.NOTSET) -> Dict[str, Any]:
+        """Return the last ``count`` records at ``min_level`` or above.
+
+        The returned cursor points just past the newest complete line, so
+        a client can continue with :meth:`read`.
+        """
+        stats = self._stats()
+        if not stats:
+            return {"entries": [], "cursor": None}
+        newest_path, newest_stat = stats[-1]
+        newest_end = _complete_end(newest_path, newest_stat.st_size)
+
+        entries: List[str] = []
+        pending: List[bytes] = []
+        for path, stat in reversed(stats):
+            if len(entries) >= count:
+                break
+            end = newest_end if path == newest_path else stat.st_size
+            for line in _reverse_lines(path, end):
+                pending.append(line)
+                level = _record_level(line)
+                if level is None:
+                    continue
+                if level >= min_level:
+                    entries.append(b"\n".join(reversed(pending)).decode("utf-8", "replace"))
+                pending = []
+                if len(entries) >= count:
+                    break
+        entries.reverse()
+        return {"entries": entries, "cursor": self._cursor(newest_stat, newest_end)}
+
+    def read(
+        self,
+        cursor: str | None = None,
+        max_bytes: int = 256 * 1024,
+        min_level: int = logging.NOTSET,
+    ) -> Dict[str, Any]:
+        """Return the records written after ``cursor``, reading at most ``max_bytes``.
+
+        Without a cursor, or when its file has been deleted, reading starts
+        at the oldest backup and ``reset`` is set in the result.  Only
+        complete lines are returned; a line still being written is left for
+        the next call.  Continuation lines at the start of a read have no
+        record to attach to and are dropped when filtering by level.
+        Raises :class:`ValueError` for a cursor that is not ``<inode>:<offset>``
+        with a non-negative integer offset.
+        """
+        position = 0
+        if cursor:
+            inode, _, text = cursor.partition(":")
+            if not (text.isascii() and text.isdigit()):
+                raise ValueError(f"invalid cursor {cursor!r}")
+            position = int(text)
+        stats = self._stats()
+        if not stats:
+            return {"entries": [], "cursor": cursor, "reset": False}
+        start, offset, reset = 0, 0, True
+        if cursor:
+            for i, (_, stat) in enumerate(stats):
+                if str(stat.st_ino) == inode:
+                    start, offset, reset = i, position, False
+                    break
+
+        lines: List[Tuple[bytes, int | None]] = []
+        budget = max_bytes
+        for i in range(start, len(stats)):
+            path, stat = stats[i]
+            newest = i == len(stats) - 1
+            if offset > stat.st_size:  # truncated or replaced in place
+                offset = 0
+            with open(path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read(min(budget, stat.st_size - offset))
+            if newest or offset + len(chunk) < stat.st_size:
+                # Stop at the last complete line, unless a single line is
+                # longer than the budget and has to be returned in pieces.
+                cut = chunk.rfind(b"\n") + 1
+                if cut or len(chunk) < budget:
+                    chunk = chunk[:cut]
+            lines.extend((line, _record_level(line)) for line in chunk.splitlines())
+            offset += len(chunk)
+            budget -= len(chunk)
+            if newest or budget <= 0 or offset < stat.st_size:
+                break
+            offset = 0
+
+        entries: List[str] = []
+        record: List[bytes] = []
+        record_level: int | None = None
+
+        def flush() -> None:
+            if record and (
+                min_level == logging.NOTSET
+                or (record_level is not None and record_level >= min_level)
+            ):
+                entries.append(b"\n".join(record).decode("utf-8", "replace"))
+
+        for line, level in lines:
+            if level is not None:
+                flush()
+                record, record_level = [], level
+            record.append(line)
+        flush()
+        return {"entries": entries, "cursor": self._cursor(stat, offset), "reset": reset}
@@ -0,0 +1,63 @@
+"""Diagram registry columns
+
+Revision ID: 9b7e4d2a6f13
+Revises: 3f1d9a7c2b44
+Create Date: 2026-10-18 10:02:41.527310
+
+Revision 6c5c2f115931 created ``diagrams`` with columns the model never had
+(``diagram_name``) and e27ba59f0786 dropped it again, so databases at head
+have no ``diagrams`` table while the model expects one.  This recreates it
+to match :class:`models.Diagram`.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9b7e4d2a6f13"
+down_revision = "3f1d9a7c2b44"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("diagrams"):
+        columns = {c["name"] for c in inspector.get_columns("diagrams")}
+        if "content_hash" in columns:
+            # Already created by the application at start-up.
+            return
+        # Databases created with ``db.create_all()`` may hold the old, never
+        # written table.
+        op.drop_table("diagrams")
+    op.create_table(
+        "diagrams",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("root_name", sa.String(length=255), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("file_path", sa.String(length=512), nullable=False),
+        sa.Column("diagram_type", sa.String(length=50), nullable=True),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("mtime", sa.Float(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+        sa.Column("rule_count", sa.Integer(), nullable=True),
+        sa.Column("uploaded_by", sa.String(length=80), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("root_name", "name", name="uq_diagrams_root_name_name"),
+    )
+    op.create_index(op.f("ix_diagrams_name"), "diagrams", ["name"], unique=False)
+    op.create_index(
+        "ix_diagrams_type_root_name",
+        "diagrams",
+        ["diagram_type", "root_name", "name"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_diagrams_type_root_name", table_name="diagrams")
+    op.drop_index(op.f("ix_diagrams_name"), table_name="diagrams")
+    op.drop_table("diagrams")
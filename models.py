@@ -1,9 +1,11 @@
 """Database models for the Rules Central application."""
 
+import json
+
 from extensions import db
 from flask_login import UserMixin
 
-__all__ = ["User", "Diagram"]
+__all__ = ["User", "Diagram", "Job"]
 
 
 class User(db.Model, UserMixin):
@@ -24,15 +26,28 @@ class User(db.Model, UserMixin):
 
 
 class Diagram(db.Model):
-    """Stored diagram metadata."""
+    """Registry row for one generated diagram, kept by :mod:`diagram_registry`."""
 
     __tablename__ = "diagrams"
+    __table_args__ = (
+        db.UniqueConstraint("root_name", "name", name="uq_diagrams_root_name_name"),
+        # Serves type-filtered listings in (root_name, name) order.
+        db.Index("ix_diagrams_type_root_name", "diagram_type", "root_name", "name"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    root_name = db.Column(db.String(100), index=True)
-    name = db.Column(db.String(100), index=True)
-    content = db.Column(db.Text)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    root_name = db.Column(db.String(255), nullable=False)
+    # Container name: the diagram file name without ``.mmd``
+    name = db.Column(db.String(255), nullable=False, index=True)
+    # Relative to ``DIAGRAMS_FOLDER``
+    file_path = db.Column(db.String(512), nullable=False)
+    diagram_type = db.Column(db.String(50))
+    size = db.Column(db.Integer, nullable=False, default=0)
+    mtime = db.Column(db.Float, nullable=False, default=0.0)
+    # SHA-256 of the diagram file, also served as its ETag
+    content_hash = db.Column(db.String(64))
+    rule_count = db.Column(db.Integer)
+    uploaded_by = db.Column(db.String(80))
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(
         db.DateTime,
@@ -40,5 +55,59 @@ class Diagram(db.Model):
         onupdate=db.func.current_timestamp(),
     )
 
-    # Relationship back to the owning :class:`User`
-    user = db.relationship("User", backref="diagrams")
+    def to_dict(self) -> dict:
+        """Return a JSON-serialisable listing entry."""
+
+        return {
+            "root": self.root_name,
+            "name": self.name,
+            "file": self.file_path,
+            "type": self.diagram_type,
+            "size": self.size,
+            "last_modified": self.mtime,
+            "version": self.content_hash,
+            "rules": self.rule_count,
+            "uploaded_by": self.uploaded_by,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class Job(db.Model):
+    """Background job queued by :mod:`jobs` and polled via ``/api/jobs``."""
+
+    __tablename__ = "jobs"
+
+    id = db.Column(db.String(36), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued", index=True)
+    user = db.Column(db.String(80))
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    # JSON-encoded lists of per-item results and error messages
+    results = db.Column(db.Text, nullable=False, default="[]")
+    errors = db.Column(db.Text, nullable=False, default="[]")
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(
+        db.DateTime,
+        default=db.func.current_timestamp(),
+        onupdate=db.func.current_timestamp(),
+    )
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serialisable status snapshot."""
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "user": self.user,
+            "total": self.total,
+            "completed": self.completed,
+            "progress": round(self.completed / self.total, 3) if self.total else 1.0,
+            "results": json.loads(self.results or "[]"),
+            "errors": json.loads(self.errors or "[]"),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
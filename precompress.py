@@ -0,0 +1,79 @@
+"""Precompressed variants of generated diagram artifacts.
+
+Mermaid and hierarchy files are highly repetitive (GUIDs, class names,
+``Function:`` labels) and compress to a fraction of their size.  They are
+compressed once, when ``generate_files`` writes them, into ``.gz`` and —
+when the optional ``brotli`` package is installed — ``.br`` siblings, so
+serving a compressed response costs no CPU per request.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+from typing import Dict, Tuple
+
+try:  # pragma: no cover - optional dependency
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "ENCODINGS",
+    "COMPRESSED_SUFFIXES",
+    "compressed_variant",
+    "write_compressed",
+]
+
+# Content-Encoding -> file suffix, in order of preference.
+_ALL_ENCODINGS: Dict[str, str] = {"br": ".br", "gzip": ".gz"}
+ENCODINGS: Dict[str, str] = {
+    encoding: suffix
+    for encoding, suffix in _ALL_ENCODINGS.items()
+    if encoding != "br" or brotli is not None
+}
+COMPRESSED_SUFFIXES: Tuple[str, ...] = tuple(_ALL_ENCODINGS.values())
+
+# Below this size compression saves less than the headers it costs.
+MIN_SIZE = 1024
+# Brotli's maximum quality (11) takes far longer on multi-megabyte
+# hierarchies for a few percent; 9 keeps generation fast.
+_BROTLI_QUALITY = 9
+
+
+def _compress(encoding: str, data: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=_BROTLI_QUALITY)
+    # A fixed mtime keeps the output, and so its ETag, reproducible.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def write_compressed(path: str, data: bytes) -> None:
+    """Write the compressed variants of ``data``, the new contents of ``path``.
+
+    Variants left over from a previous version of ``path`` are removed when
+    ``data`` is too small to be worth compressing.
+    """
+    for encoding, suffix in _ALL_ENCODINGS.items():
+        variant = path + suffix
+        if encoding in ENCODINGS and len(data) >= MIN_SIZE:
+            with open(variant, "wb") as f:
+                f.write(_compress(encoding, data))
+        elif os.path.exists(variant):
+            os.remove(variant)
+
+
+def compressed_variant(path: str, encoding: str) -> str | None:
+    """Return the ``encoding`` variant of ``path`` if it is up to date."""
+    suffix = _ALL_ENCODINGS.get(encoding)
+    if suffix is None:
+        return None
+    try:
+        variant_mtime = os.stat(path + suffix).st_mtime_ns
+        source_mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return path + suffix if variant_mtime >= source_mtime else None
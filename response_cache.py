@@ -0,0 +1,119 @@
+"""Size-bounded LRU cache of serialized responses built from files.
+
+``/api/hierarchy`` used to parse a hierarchy file and re-serialize it on
+every request, although the viewer asks for the same large containers over
+and over.  :class:`ResponseCache` keeps the finished response body per file
+path, keyed by the file's modification time and size: a file rewritten by
+``generate_files`` (in this or any other process) no longer matches its
+entry, which is then dropped and rebuilt.  Least recently used entries are
+evicted once the cached bodies exceed ``max_bytes``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = ["CachedResponse", "ResponseCache", "get_hierarchy_cache"]
+
+# (st_mtime_ns, st_size) of the file a body was built from.
+_Stamp = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """Serialized response body and its ETag."""
+
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Thread-safe LRU mapping of file paths to :class:`CachedResponse`."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[_Stamp, CachedResponse]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, path: str) -> None:
+        _, cached = self._entries.pop(path)
+        self._size -= len(cached.body)
+
+    def get(self, path: str, build: Callable[[str], bytes]) -> CachedResponse:
+        """Return the response for ``path``, calling ``build(path)`` on a miss.
+
+        Raises :class:`FileNotFoundError` when ``path`` does not exist;
+        exceptions from ``build`` propagate and nothing is cached.
+        """
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._drop(path)
+            self.misses += 1
+
+        body = build(path)
+        cached = CachedResponse(body, hashlib.sha256(body).hexdigest())
+        if len(body) > self.max_bytes:
+            return cached
+        with self._lock:
+            if path in self._entries:
+                self._drop(path)
+            self._entries[path] = (stamp, cached)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                evicted, (_, old) = self._entries.popitem(last=False)
+                self._size -= len(old.body)
+                self.evictions += 1
+                LOGGER.debug("Evicted %s from response cache", evicted)
+        return cached
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Drop entries whose path starts with ``prefix`` and return their number."""
+        with self._lock:
+            stale = [path for path in self._entries if path.startswith(prefix)]
+            for path in stale:
+                self._drop(path)
+        return len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters for tuning ``max_bytes``."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def get_hierarchy_cache() -> ResponseCache:
+    """Return the hierarchy :class:`ResponseCache` of the current application."""
+    from flask import current_app
+
+    cache = current_app.extensions.get("hierarchy_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "hierarchy_cache",
+            ResponseCache(int(current_app.config.get("HIERARCHY_CACHE_BYTES", 64 * 1024 * 1024))),
+        )
+    return cache
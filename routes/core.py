@@ -6,7 +6,7 @@ import csv
 from io import StringIO
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, Iterator, List, Union
 
 from flask import (
     Blueprint,
@@ -18,15 +18,15 @@ from flask import (
     redirect,
     url_for,
     flash,
+    stream_with_context,
 )
 from werkzeug.utils import secure_filename
 from werkzeug.wrappers import Response
 
+from jobs import get_job_queue, run_uploads
+from search_index import get_search_index, parse_sort, perform_search
 from utils import (
     allowed_file,
-    load_and_sanitize_json,
-    generate_files,
-    log_activity,
     get_current_user,
     get_rule_stats,
     get_activity_trend,
@@ -67,6 +67,9 @@ UploadResult = Dict[str, Union[bool, str, List[str]]]
 # Blueprints
 # ---------------------------------------------------------------------------
 
+# Best-ranked matches listed on the /search page.
+SEARCH_PAGE_RESULTS = 100
+
 api = Blueprint("api", __name__, url_prefix="/api")
 analytics_routes = Blueprint("analytics", __name__, url_prefix="/analytics")
 collab = Blueprint("collab", __name__, url_prefix="/collab")
@@ -139,36 +142,75 @@ def metrics() -> Response:
 # Export Search as CSV Route
 # ---------------------------------------------------------------------------
 
+# Columns of the search export, in order.
+_EXPORT_COLUMNS = ["catalog", "filename", "type", "size", "last_modified", "snippet"]
+# Buffered CSV text is sent to the client once it reaches this size.
+_EXPORT_CHUNK_SIZE = 16 * 1024
+
+
+def _export_csv(results: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Yield the CSV export of *results* in chunks as rows are produced."""
+    output = StringIO()
+    writer = csv.writer(output)
+
+    def drain() -> str:
+        data = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return data
+
+    writer.writerow(_EXPORT_COLUMNS)
+    # Send the header straight away so the download starts immediately.
+    yield drain()
+    try:
+        for r in results:
+            writer.writerow([
+                r["catalog"],
+                r["filename"],
+                r["type"] or "",
+                r["size"],
+                datetime.fromtimestamp(r["last_modified"]).isoformat(timespec="seconds"),
+                r["match_snippet"].replace("\n", " "),
+            ])
+            if output.tell() >= _EXPORT_CHUNK_SIZE:
+                yield drain()
+    except Exception as exc:
+        # Headers are already sent; abort the download rather than
+        # silently truncating it.
+        current_app.logger.error(f"Export search error: {exc}", exc_info=True)
+        raise
+    yield drain()
+
+
 @api.route("/search/export")
 def export_search() -> Response:
     """
     Export search results as a CSV file.
 
     Expected query-string parameters mirror those used by the /search page
-    (e.g., ?q=<search term>&status=active&status=draft).
+    (e.g., ?q=<search term>&catalog=<catalog>&type=<diagram type>&sort=<order>),
+    and rows come in the page's order, by relevance unless ``sort`` says
+    otherwise.  Rows are streamed as the search produces them, so large
+    exports are never held in memory.
     """
     try:
         # Query params
         query = request.args.get("q", "")
-        # Re‑use existing perform_search helper so export matches UI
-        results = perform_search(query) if query else []
-
-        # Build CSV dynamically
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["id", "title", "status", "description"])
-        for r in results:
-            writer.writerow([
-                getattr(r, "id", ""),
-                getattr(r, "title", "") or getattr(r, "name", ""),
-                getattr(r, "status", ""),
-                getattr(r, "description", "").replace("\n", " ")
-            ])
-
-        csv_data = output.getvalue().encode()
-
+        sort = request.args.get("sort", "relevance")
+        try:
+            parse_sort(sort)
+        except ValueError as exc:
+            return jsonify({"status": "error", "message": str(exc)}), 400
+        # Re‑use the search backend so the export matches the UI
+        results = (
+            perform_search(
+                query, request.args.get("catalog", ""), request.args.get("type", ""), sort
+            )
+            if query
+            else iter(())
+        )
         return Response(
-            csv_data,
+            stream_with_context(_export_csv(results)),
             mimetype="text/csv",
             headers={
                 "Content-Disposition":
@@ -288,12 +330,47 @@ def index() -> str:
     except Exception as exc:
         current_app.logger.error(f"Index page error: {exc}", exc_info=True)
         abort(500, description="Failed to load home page")
+
+
+def _search_item(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a search index result to the fields the search template shows."""
+    return {
+        "title": os.path.splitext(result["filename"])[0],
+        "name": result["filename"],
+        "url": url_for(
+            "routes.view_diagram",
+            root_name=result["catalog"],
+            diagram_name=result["filename"],
+        ),
+        "snippet": result["match_snippet"],
+        "type": result["type"],
+        "last_updated": datetime.fromtimestamp(result["last_modified"]).strftime("%Y-%m-%d"),
+    }
+
+
 @main.route("/search")
 def search() -> str:
     """Display the search page."""
+    sort = request.args.get("sort", "relevance")
+    try:
+        parse_sort(sort)
+    except ValueError:
+        abort(400, description="Unknown sort order")
     try:
         query = request.args.get("q", "")
-        results = perform_search(query) if query else []
+        results: List[Dict[str, Any]] = []
+        result_count = 0
+        if query:
+            # Same arguments as /api/search/export, so exports match the page.
+            ranked = get_search_index().search_page(
+                query,
+                request.args.get("catalog", ""),
+                request.args.get("type", ""),
+                sort=sort,
+                limit=SEARCH_PAGE_RESULTS,
+            )
+            results = [_search_item(r) for r in ranked["results"]]
+            result_count = ranked["total"]
 
         try:
             export_url = url_for("api.export_search")
@@ -302,9 +379,10 @@ def search() -> str:
 
         return render_template(
             "search.html",
+            q=query,
             query=query,
             results=results,
-            result_count=len(results),
+            result_count=result_count,
             export_url=export_url,
         )
     except Exception as exc:
@@ -463,30 +541,42 @@ def upload_file() -> Union[str, Response, JsonResponse]:
             diagrams_path = diagrams_dir / filename
             file_path.replace(diagrams_path)
             file_path = diagrams_path
-            
-        json_data = load_and_sanitize_json(file_path)
-        if not json_data:
-            raise ValueError("Invalid file content")
-            
-        root_name = file_path.stem
-        output_dir = diagrams_dir / root_name
-        output_dir.mkdir(exist_ok=True)
-        
-        generate_files(json_data, output_dir)
-        
-        log_activity(
-            action="upload",
-            user=get_current_user(),
-            details=f"Uploaded {filename}"
-        )
-        
-        result: UploadResult = {
+
+        item = {
+            "name": filename,
+            "path": str(file_path),
+            "diagrams_dir": str(diagrams_dir),
+            "user": get_current_user(),
+        }
+        if "job_queue" not in current_app.extensions:
+            # Without a database there is no job queue; process inline.
+            for _, _, error in run_uploads([item]):
+                if error is not None:
+                    raise ValueError(error)
+            result: UploadResult = {
+                "success": True,
+                "message": f"Processed {filename} successfully",
+                "redirect_url": url_for("routes.catalog"),
+            }
+            if is_json:
+                return jsonify(result)
+            flash(result["message"], "success")
+            return redirect(url_for("routes.catalog"))
+
+        job_id = get_job_queue().submit("upload", [item], run_uploads, user=item["user"])
+
+        result = {
             "success": True,
-            "message": f"Processed {filename} successfully",
-            "redirect_url": url_for("main.catalog")
+            "message": f"Queued {filename} for processing",
+            "job_id": job_id,
+            "status_url": url_for("routes.get_job_status", job_id=job_id),
+            "redirect_url": url_for("routes.catalog")
         }
         
-        return jsonify(result) if is_json else redirect(url_for("main.catalog"))
+        if is_json:
+            return jsonify(result), 202
+        flash(result["message"], "info")
+        return redirect(url_for("routes.catalog"))
         
     except (OSError, ValueError, json.JSONDecodeError) as e:
         current_app.logger.error(f"Upload error: {str(e)}", exc_info=True)
@@ -0,0 +1,267 @@
+"""Compact graph representation of rule trees used for diagram generation.
+
+Rules are assigned consecutive integer node ids in pre-order.  Node
+attributes and typed edges are kept in parallel :mod:`array` columns rather
+than in per-edge dictionaries or concatenated ``"A --> B"`` strings, so a
+graph of tens of thousands of rules costs a handful of flat buffers and is
+built in a single linear pass.
+
+Edges follow the layout of the generated diagrams:
+
+* ``EDGE_ACTION`` links a rule to the first child rule of one of its actions
+  and carries the action name as its label;
+* ``EDGE_SEQUENCE`` chains the remaining child rules of an action, which run
+  one after another;
+* ``EDGE_CHILD`` links a rule to an entry of its ``Children`` list.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence
+
+from rule_model import ACTION_TYPES, RULE_TYPES
+
+__all__ = [
+    "NODE_RECT",
+    "NODE_DECISION",
+    "NODE_CLASSES",
+    "EDGE_ACTION",
+    "EDGE_SEQUENCE",
+    "EDGE_CHILD",
+    "RuleGraph",
+    "build_rule_graph",
+    "node_label",
+    "node_style",
+]
+
+NODE_RECT = 0
+NODE_DECISION = 1
+
+# Class names match the ``classDefs`` of the configured themes.
+NODE_CLASSES = ("classRect", "classDiamond", "classSet", "classDisabled")
+_CLASS_RECT, _CLASS_DIAMOND, _CLASS_SET, _CLASS_DISABLED = range(len(NODE_CLASSES))
+
+EDGE_ACTION = 0
+EDGE_SEQUENCE = 1
+EDGE_CHILD = 2
+
+_EDGE_STYLES = (
+    "stroke:#000,stroke-width:2px;",
+    "stroke:#666,stroke-dasharray:3,stroke-width:2px;",
+    "stroke:#666,stroke-width:2px;",
+)
+_SHAPES = (('["', '"]'), ('{"', '"}'))
+_UNSAFE_ID_RE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def _escape(text: str) -> str:
+    """Escape ``text`` for use inside a quoted Mermaid label."""
+    return (
+        text.replace('"', "#quot;")
+        .replace("|", "#124;")
+        .replace("\r\n", "<br>")
+        .replace("\n", "<br>")
+    )
+
+
+def _edge_label(action_name: Any) -> str:
+    """Return the label of an action edge; blank and ``---`` names read as "Continue"."""
+    name = str(action_name or "").strip()
+    if not name.strip("-"):
+        return "Continue"
+    return _escape(name)
+
+
+def node_label(rule: Dict[str, Any]) -> str:
+    """Return the escaped Mermaid label of ``rule``."""
+    label = str(rule.get("RuleName") or rule.get("RuleGUID") or "")
+    function = rule.get("FunctionName")
+    if function:
+        label = f"{label}<br>Function: {function}"
+    return _escape(label)
+
+
+def node_style(rule: Dict[str, Any]) -> tuple[int, int]:
+    """Return the ``(shape, class index)`` used to draw ``rule``.
+
+    Rules whose actions branch into labelled child rules are decisions;
+    rules named as setters get the "set" class, and disabled rules are
+    greyed out whatever their shape.
+    """
+    decision = any(
+        action.get("ActionName") and action.get("ChildRules")
+        for action in rule.get("Actions") or ()
+        if type(action) in ACTION_TYPES
+    )
+    setter = "set" in str(rule.get("RuleName") or "").lower()
+    shape = NODE_DECISION if decision and not setter else NODE_RECT
+    if (rule.get("Attributes") or {}).get("_Disabled") in ("1", 1, True):
+        node_class = _CLASS_DISABLED
+    elif setter:
+        node_class = _CLASS_SET
+    elif decision:
+        node_class = _CLASS_DIAMOND
+    else:
+        node_class = _CLASS_RECT
+    return shape, node_class
+
+
+class RuleGraph:
+    """Integer-indexed rule graph with array-backed node and edge columns."""
+
+    def __init__(self) -> None:
+        self.guids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.labels: List[str] = []
+        self.shapes = array("B")
+        self.classes = array("B")
+        self.edge_src = array("l")
+        self.edge_dst = array("l")
+        self.edge_kind = array("B")
+        # Index into ``edge_labels`` or -1 for unlabelled edges.
+        self.edge_label = array("l")
+        self.edge_labels: List[str] = []
+        self._edge_label_ids: Dict[str, int] = {}
+
+    @property
+    def node_count(self) -> int:
+        return len(self.guids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_src)
+
+    def add_node(self, guid: str, label: str, shape: int, node_class: int) -> int:
+        """Register a node and return its id."""
+        node_id = len(self.guids)
+        self.guids.append(guid)
+        self.index[guid] = node_id
+        self.labels.append(label)
+        self.shapes.append(shape)
+        self.classes.append(node_class)
+        return node_id
+
+    def add_edge(self, src: int, dst: int, kind: int, label: str | None = None) -> int:
+        """Register a typed edge and return its id."""
+        label_id = -1
+        if label is not None:
+            label_id = self._edge_label_ids.get(label, -1)
+            if label_id < 0:
+                label_id = self._edge_label_ids[label] = len(self.edge_labels)
+                self.edge_labels.append(label)
+        self.edge_src.append(src)
+        self.edge_dst.append(dst)
+        self.edge_kind.append(kind)
+        self.edge_label.append(label_id)
+        return len(self.edge_src) - 1
+
+    def bucket_edges(self, node_group: Sequence[int], group_count: int) -> List[array]:
+        """Split edge ids by the group of their source node in one pass.
+
+        ``node_group`` maps every node id to a group index below
+        ``group_count``; nodes mapped to a negative group are ignored.
+        """
+        buckets = [array("l") for _ in range(group_count)]
+        for edge, src in enumerate(self.edge_src):
+            group = node_group[src]
+            if group >= 0:
+                buckets[group].append(edge)
+        return buckets
+
+    def node_id(self, node: int) -> str:
+        """Return the Mermaid identifier of ``node``."""
+        return _UNSAFE_ID_RE.sub("_", self.guids[node])
+
+    def edge_str(self, edge: int) -> str:
+        """Return the Mermaid statement for ``edge``."""
+        label_id = self.edge_label[edge]
+        arrow = "-->" if label_id < 0 else f"-->|{self.edge_labels[label_id]}|"
+        return f"{self.node_id(self.edge_src[edge])} {arrow} {self.node_id(self.edge_dst[edge])}"
+
+    def edge_dicts(self) -> List[Dict[str, str]]:
+        """Return edges in the legacy ``{"edge_str", "edge_type"}`` form."""
+        kinds = ("ACTION", "SEQUENCE", "PC")
+        return [
+            {"edge_str": self.edge_str(e), "edge_type": kinds[self.edge_kind[e]]}
+            for e in range(self.edge_count)
+        ]
+
+    def node_dict(self, node: int) -> Dict[str, str]:
+        """Return the legacy node mapping entry for ``node``."""
+        return {
+            "label": self.labels[node],
+            "shape": "decision" if self.shapes[node] == NODE_DECISION else "rect",
+            "class": NODE_CLASSES[self.classes[node]],
+        }
+
+    def to_mermaid(self, nodes: Iterable[int], edges: Iterable[int], layout: str = "TD") -> str:
+        """Render the given node and edge ids as a Mermaid flowchart."""
+        lines = [f"flowchart {layout}"]
+        for node in nodes:
+            start, end = _SHAPES[self.shapes[node]]
+            lines.append(
+                f"    {self.node_id(node)}{start}{self.labels[node]}{end}"
+                f":::{NODE_CLASSES[self.classes[node]]}"
+            )
+        used_labels = set()
+        for position, edge in enumerate(edges):
+            lines.append(f"    {self.edge_str(edge)}")
+            lines.append(f"    linkStyle {position} {_EDGE_STYLES[self.edge_kind[edge]]}")
+            if self.edge_label[edge] >= 0:
+                used_labels.add(self.edge_labels[self.edge_label[edge]])
+        if used_labels:
+            lines.append("")
+            lines.append(f"%% ActionNames: {', '.join(sorted(used_labels))}")
+        return "\n".join(lines)
+
+
+def build_rule_graph(rules: Iterable[Dict[str, Any]]) -> RuleGraph:
+    """Build a :class:`RuleGraph` from nested or flattened ``rules``.
+
+    Every rule reachable through ``Children`` and ``Actions[].ChildRules``
+    becomes a node, numbered in pre-order; rules sharing a ``RuleGUID`` are
+    registered once.  Rules without a GUID are skipped, so GUIDs should be
+    assigned (e.g. by ``flatten_rules``) beforehand.
+    """
+    graph = RuleGraph()
+    ordered: List[Dict[str, Any]] = []
+    stack = list(reversed(list(rules)))
+    while stack:
+        rule = stack.pop()
+        guid = rule.get("RuleGUID") if type(rule) in RULE_TYPES else None
+        if not guid or guid in graph.index:
+            continue
+        graph.add_node(guid, node_label(rule), *node_style(rule))
+        ordered.append(rule)
+        kids = list(rule.get("Children") or ())
+        for action in rule.get("Actions") or ():
+            if type(action) in ACTION_TYPES:
+                kids.extend(action.get("ChildRules") or ())
+        stack.extend(reversed(kids))
+
+    index = graph.index
+    for src, rule in enumerate(ordered):
+        for child in rule.get("Children") or ():
+            if type(child) not in RULE_TYPES:
+                continue
+            dst = index.get(child.get("RuleGUID"))
+            if dst is not None:
+                graph.add_edge(src, dst, EDGE_CHILD)
+        for action in rule.get("Actions") or ():
+            if type(action) not in ACTION_TYPES:
+                continue
+            previous = -1
+            for child in action.get("ChildRules") or ():
+                if type(child) not in RULE_TYPES:
+                    continue
+                dst = index.get(child.get("RuleGUID"))
+                if dst is None:
+                    continue
+                if previous < 0:
+                    graph.add_edge(src, dst, EDGE_ACTION, _edge_label(action.get("ActionName")))
+                else:
+                    graph.add_edge(previous, dst, EDGE_SEQUENCE)
+                previous = dst
+    return graph
@@ -0,0 +1,135 @@
+"""Compact in-memory representation of sanitized rules.
+
+Plain dicts cost a hash table per rule and per action, plus an empty list
+for every rule without children.  :class:`RuleNode` and :class:`RuleAction`
+store the sanitized fields in ``__slots__`` named after the JSON keys,
+share one empty tuple for every empty child list and intern repeated
+strings (attribute keys, function and container names).
+
+Both classes implement the small part of the mapping protocol the upload
+pipeline relies on (``get``, ``[]``, ``in``, ``items``), so the tree
+utilities and graph builder work on either representation.  The order of
+keys present in the source JSON is remembered, and :func:`rule_to_json`
+serializes nodes back to exactly the dicts the sanitizer would produce.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+__all__ = [
+    "EMPTY",
+    "RuleNode",
+    "RuleAction",
+    "RULE_TYPES",
+    "ACTION_TYPES",
+    "intern_value",
+    "rule_to_json",
+]
+
+# Shared stand-in for every empty ``Children``/``Actions``/``ChildRules`` list.
+EMPTY: Tuple[Any, ...] = ()
+
+_MISSING = object()
+_LAYOUTS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _layout(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Return the shared instance of the key-order tuple ``keys``."""
+    return _LAYOUTS.setdefault(keys, keys)
+
+
+def intern_value(value: Any) -> Any:
+    """Intern ``value`` if it is a string, otherwise return it unchanged."""
+    return sys.intern(value) if type(value) is str else value
+
+
+class _SlotRecord:
+    """Mapping-like record whose keys are its ``__slots__``."""
+
+    __slots__ = ("_keys",)
+    FIELDS: frozenset = frozenset()
+
+    def __init__(self, items: Iterator[Tuple[str, Any]] = ()) -> None:
+        keys = []
+        for key, value in items:
+            setattr(self, key, value)
+            keys.append(key)
+        self._keys = _layout(tuple(keys))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self.FIELDS:
+            return default
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        value = getattr(self, key, _MISSING) if key in self.FIELDS else _MISSING
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        if key not in self._keys:
+            self._keys = _layout(self._keys + (key,))
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._keys
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((key, getattr(self, key)) for key in self._keys)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a shallow dict in the original key order."""
+        return {key: getattr(self, key) for key in self._keys}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class RuleAction(_SlotRecord):
+    """Sanitized rule action: its name and child rules."""
+
+    __slots__ = ("ActionName", "ChildRules")
+    FIELDS = frozenset(__slots__)
+
+
+class RuleNode(_SlotRecord):
+    """Sanitized rule restricted to the fields the pipeline keeps."""
+
+    __slots__ = (
+        "RuleGUID",
+        "RuleName",
+        "Children",
+        "Actions",
+        "Attributes",
+        "ParentGUID",
+        "ParentActionIndex",
+        "Container",
+        "FunctionName",
+        "RootName",
+    )
+    FIELDS = frozenset(__slots__)
+
+
+RULE_TYPES = frozenset({dict, RuleNode})
+ACTION_TYPES = frozenset({dict, RuleAction})
+
+
+def rule_to_json(obj: Any) -> Dict[str, Any]:
+    """``json.dump`` ``default`` hook serializing rule nodes and actions."""
+    if isinstance(obj, _SlotRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
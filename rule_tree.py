@@ -0,0 +1,110 @@
+"""Iterative traversal of nested rule trees.
+
+Rules nest through ``Children`` and ``Actions[].ChildRules``.  Rather than
+each tree utility recursing on its own, :func:`walk_rules` drives a single
+explicit-stack pre-order walk and calls a sequence of visitors on every rule,
+so several transformations can share one pass and arbitrarily deep exports
+never hit Python's recursion limit.
+
+A visitor is a callable receiving a :class:`RuleFrame`.  It may:
+
+* mutate ``frame.rule`` in place;
+* replace it by assigning a new dict to ``frame.rule``; the replacement is
+  written back into the parent's list and traversal continues below it;
+* return ``False`` to skip the rule's descendants (later visitors are not
+  called for that rule either).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+
+from rule_model import ACTION_TYPES, RULE_TYPES
+
+__all__ = ["RuleFrame", "RuleVisitor", "walk_rules"]
+
+
+class RuleFrame:
+    """Position of a rule during a :func:`walk_rules` traversal.
+
+    Frames are created by the walk itself (bypassing ``__init__``, which is
+    kept for building frames by hand, e.g. in tests).
+    """
+
+    __slots__ = ("rule", "parent", "action_index", "depth", "disabled")
+
+    def __init__(
+        self,
+        rule: Dict[str, Any],
+        parent: "RuleFrame | None" = None,
+        action_index: int | None = None,
+    ) -> None:
+        self.rule = rule
+        self.parent = parent
+        # Index of the parent action holding this rule; ``None`` for
+        # top-level rules and ``Children`` entries.
+        self.action_index = action_index
+        self.depth = 0 if parent is None else parent.depth + 1
+        # Scratch slot for visitors propagating the disabled state.
+        self.disabled = False
+
+
+RuleVisitor = Callable[[RuleFrame], Any]
+
+
+def walk_rules(rules: List[Any], *visitors: RuleVisitor) -> None:
+    """Visit every rule below the list ``rules`` in pre-order.
+
+    Children are visited before action child rules, matching the order of
+    the original recursive utilities.  Entries that are neither dicts nor
+    :class:`rule_model.RuleNode` objects are left untouched.
+    """
+    new_frame = object.__new__
+    # Pending entries are (rule, parent frame, action index, siblings, position)
+    # tuples; frames are only built once a rule is actually visited.
+    stack: List[tuple] = [
+        (rules[i], None, None, rules, i)
+        for i in range(len(rules) - 1, -1, -1)
+        if type(rules[i]) in RULE_TYPES
+    ]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        rule, parent, action_index, siblings, position = pop()
+        frame = new_frame(RuleFrame)
+        frame.rule = rule
+        frame.parent = parent
+        frame.action_index = action_index
+        frame.depth = 0 if parent is None else parent.depth + 1
+        frame.disabled = False
+        descend = True
+        for visit in visitors:
+            if visit(frame) is False:
+                descend = False
+                break
+        if frame.rule is not rule:
+            rule = siblings[position] = frame.rule
+        if not descend:
+            continue
+
+        # Push in reverse so that children pop first, then each action's
+        # child rules in order.
+        actions = rule.get("Actions")
+        if type(actions) is list and actions:
+            index = len(actions)
+            for action in reversed(actions):
+                index -= 1
+                child_rules = action.get("ChildRules") if type(action) in ACTION_TYPES else None
+                if type(child_rules) is list and child_rules:
+                    i = len(child_rules)
+                    for child in reversed(child_rules):
+                        i -= 1
+                        if type(child) in RULE_TYPES:
+                            push((child, frame, index, child_rules, i))
+        children = rule.get("Children")
+        if type(children) is list and children:
+            i = len(children)
+            for child in reversed(children):
+                i -= 1
+                if type(child) in RULE_TYPES:
+                    push((child, frame, None, children, i))
@@ -0,0 +1,768 @@
+"""Inverted full-text index over generated Mermaid diagrams.
+
+Every ``.mmd`` file below ``DIAGRAMS_FOLDER`` is tokenised once, at upload
+time, into lower-case word tokens, together with the structured fields of
+its rules read from the container's hierarchy index: ``RuleName``,
+``FunctionName``, ``Container``, attribute keys and values, and the
+``_ParamList*`` attributes.  The index keeps:
+
+* a postings table mapping each token to the documents containing it, with
+  the offset of its first occurrence in the text (used to build snippets)
+  and its frequency weighted by :data:`_FIELD_BOOSTS`, and
+* a trigram table over the token vocabulary, so substring queries only have
+  to verify a handful of candidate tokens instead of scanning every file.
+
+The ``relevance`` order ranks documents by BM25 over those weighted
+frequencies; each query word counts as one term, whichever tokens it is a
+substring of.  Only the best page of documents is picked, with a heap.
+
+The text of each document is stored compressed alongside its postings, which
+lets :meth:`SearchIndex.search` build ``get_snippet`` excerpts without
+touching the diagram files.
+
+Results are ordered by one of :data:`SORT_KEYS` and always end in
+``(root, filename)``, which is unique, so every order is total.
+:meth:`SearchIndex.search_page` pages through them with keyset cursors: the
+ordering and the "after this row" condition run in SQL over the matching
+documents, reading stops once the page is full, and snippets are built only
+for the rows returned.
+"""
+
+from __future__ import annotations
+
+import base64
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from hierarchy_index import load_hierarchy_index
+from utils import diagram_type_from_filename, get_snippet
+
+LOGGER = logging.getLogger(__name__)
+
+__all__ = [
+    "SORT_KEYS",
+    "SearchIndex",
+    "get_search_index",
+    "parse_sort",
+    "perform_search",
+    "tokenize",
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+_SNIPPET_WINDOW = 200
+# Terms per ``IN (...)`` lookup, well below SQLite's host parameter limit.
+_SQL_BATCH = 500
+
+# Boost of the term frequencies in each field.  Rule, function and
+# container names say what a diagram is about; the Mermaid text repeats
+# them among node ids and labels.
+_FIELD_BOOSTS: Dict[str, float] = {
+    "RuleName": 3.0,
+    "FunctionName": 3.0,
+    "Container": 2.0,
+    "_ParamList": 1.5,
+    "Attributes": 1.0,
+    "text": 1.0,
+}
+# BM25 term frequency saturation and document length normalisation.
+_K1 = 1.2
+_B = 0.75
+
+# Sort key -> search_docs columns ordering the results.  "relevance" orders
+# by the BM25 score first, which is computed per query in Python.
+_SORT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "relevance": ("root", "filename"),
+    "name": ("root", "filename"),
+    "last_modified": ("mtime", "root", "filename"),
+    "size": ("size", "root", "filename"),
+}
+SORT_KEYS: Tuple[str, ...] = tuple(_SORT_COLUMNS)
+# Position of each column in the rows selected by SearchIndex._sorted_rows.
+_ROW_INDEX = {"root": 1, "filename": 2, "size": 4, "mtime": 5}
+# Types a cursor may hold for each sort column ("score" leads relevance keys).
+_NUMBER = (int, float)
+_CURSOR_TYPES = {"score": _NUMBER, "size": _NUMBER, "mtime": _NUMBER, "root": str, "filename": str}
+
+# Bumped when the tables, or what they record, change.  The index is derived from the diagram
+# files, so an index with another version is dropped and rebuilt by sync.
+_SCHEMA_VERSION = 3
+
+_DROP_SCHEMA = """
+DROP TABLE IF EXISTS search_postings;
+DROP TABLE IF EXISTS search_trigrams;
+DROP TABLE IF EXISTS search_terms;
+DROP TABLE IF EXISTS search_docs;
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_docs (
+    doc_id INTEGER PRIMARY KEY,
+    root TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    catalog TEXT NOT NULL,
+    diagram_type TEXT,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    length REAL NOT NULL,
+    body BLOB NOT NULL,
+    UNIQUE (root, filename)
+);
+CREATE TABLE IF NOT EXISTS search_terms (
+    term_id INTEGER PRIMARY KEY,
+    term TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS search_trigrams (
+    trigram TEXT NOT NULL,
+    term_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, term_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS search_postings (
+    term_id INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL,
+    first_offset INTEGER,
+    tf REAL NOT NULL,
+    PRIMARY KEY (term_id, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_search_postings_doc ON search_postings (doc_id);
+CREATE INDEX IF NOT EXISTS ix_search_docs_catalog ON search_docs (catalog);
+CREATE INDEX IF NOT EXISTS ix_search_docs_mtime ON search_docs (mtime, root, filename);
+CREATE INDEX IF NOT EXISTS ix_search_docs_size ON search_docs (size, root, filename);
+"""
+
+
+def tokenize(text: str) -> Dict[str, int]:
+    """Return the first offset of every distinct token in lower-cased ``text``."""
+    offsets: Dict[str, int] = {}
+    for match in _TOKEN_RE.finditer(text):
+        offsets.setdefault(match.group(), match.start())
+    return offsets
+
+
+def _trigrams(term: str) -> set[str]:
+    return {term[i : i + 3] for i in range(len(term) - 2)}
+
+
+def _rule_fields(rule: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    """Yield the ``(field, text)`` pairs of a shallow rule record."""
+    for field in ("RuleName", "FunctionName", "Container"):
+        if rule.get(field):
+            yield field, str(rule[field])
+    attributes = rule.get("Attributes")
+    if isinstance(attributes, dict):
+        for key, value in attributes.items():
+            if key.startswith("_ParamList"):
+                yield "_ParamList", str(value)
+            else:
+                yield "Attributes", f"{key} {value}"
+
+
+def _weighted_terms(fields: Iterable[Tuple[str, str]]) -> Dict[str, float]:
+    """Return the boosted frequency of every token in the ``(field, text)`` pairs."""
+    frequencies: Dict[str, float] = {}
+    for field, text in fields:
+        boost = _FIELD_BOOSTS[field]
+        for token in _TOKEN_RE.findall(text.lower()):
+            frequencies[token] = frequencies.get(token, 0.0) + boost
+    return frequencies
+
+
+def parse_sort(sort: str) -> Tuple[str, bool]:
+    """Return ``(key, descending)`` for a sort argument such as ``"-size"``.
+
+    Raises :class:`ValueError` for keys not in :data:`SORT_KEYS`.
+    """
+    key = sort[1:] if sort.startswith("-") else sort
+    if key not in _SORT_COLUMNS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    return key, sort.startswith("-")
+
+
+def _encode_cursor(sort: str, key: tuple) -> str:
+    raw = json.dumps([sort, *key], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, columns: Tuple[str, ...]) -> tuple:
+    """Return the key in ``cursor``; :class:`ValueError` if invalid or not for ``sort``.
+
+    The key must hold one value of the right type for each of ``columns``.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if (
+        not isinstance(values, list)
+        or len(values) != len(columns) + 1
+        or values[0] != sort
+        or not all(
+            isinstance(value, _CURSOR_TYPES[column]) and not isinstance(value, bool)
+            for column, value in zip(columns, values[1:])
+        )
+    ):
+        raise ValueError("Invalid cursor")
+    return tuple(values[1:])
+
+
+class SearchIndex:
+    """Token and trigram postings for the diagrams below ``diagrams_dir``."""
+
+    def __init__(self, diagrams_dir: str | Path, db_path: str | Path) -> None:
+        self.diagrams_dir = str(diagrams_dir)
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                conn.executescript(_DROP_SCHEMA)
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def _lookup_terms(self, conn: sqlite3.Connection, terms: List[str]) -> Dict[str, int]:
+        ids: Dict[str, int] = {}
+        for start in range(0, len(terms), _SQL_BATCH):
+            batch = terms[start : start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            ids.update(
+                conn.execute(
+                    f"SELECT term, term_id FROM search_terms WHERE term IN ({placeholders})",
+                    batch,
+                )
+            )
+        return ids
+
+    def _term_ids(self, conn: sqlite3.Connection, terms: List[str]) -> Dict[str, int]:
+        """Return the ids of ``terms``, adding the new ones to the vocabulary."""
+        ids = self._lookup_terms(conn, terms)
+        new = [term for term in terms if term not in ids]
+        if new:
+            # Another process may add the same terms meanwhile, hence IGNORE.
+            conn.executemany(
+                "INSERT OR IGNORE INTO search_terms (term) VALUES (?)", [(term,) for term in new]
+            )
+            added = self._lookup_terms(conn, new)
+            conn.executemany(
+                "INSERT OR IGNORE INTO search_trigrams (trigram, term_id) VALUES (?, ?)",
+                [(tri, term_id) for term, term_id in added.items() for tri in _trigrams(term)],
+            )
+            ids.update(added)
+        return ids
+
+    def _remove(self, conn: sqlite3.Connection, where: str, params: tuple) -> None:
+        conn.execute(
+            f"DELETE FROM search_postings WHERE doc_id IN "
+            f"(SELECT doc_id FROM search_docs WHERE {where})",
+            params,
+        )
+        conn.execute(f"DELETE FROM search_docs WHERE {where}", params)
+
+    def index_file(self, root_name: str, filename: str, conn: sqlite3.Connection | None = None) -> None:
+        """(Re)index a single ``.mmd`` file."""
+        if conn is None:
+            with self._connect() as conn:
+                self.index_file(root_name, filename, conn)
+            return
+        path = os.path.join(self.diagrams_dir, root_name, filename)
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        stat = os.stat(path)
+        # The filename is indexed with the content so name matches keep working.
+        body = f"{filename}\n{content}".lower()
+        # Snippets come from the content, so offsets are recorded there only;
+        # tokens found just in the filename header get none.
+        body_start = len(filename) + 1
+        offsets = {
+            token: body_start + offset for token, offset in tokenize(body[body_start:]).items()
+        }
+        frequencies = _weighted_terms([("text", body), *self._rule_fields(root_name, filename)])
+
+        self._remove(conn, "root = ? AND filename = ?", (root_name, filename))
+        doc_id = conn.execute(
+            "INSERT INTO search_docs "
+            "(root, filename, catalog, diagram_type, size, mtime, length, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                root_name,
+                filename,
+                root_name.split("_")[0],
+                diagram_type_from_filename(filename),
+                stat.st_size,
+                stat.st_mtime,
+                sum(frequencies.values()),
+                zlib.compress(body.encode("utf-8")),
+            ),
+        ).lastrowid
+        term_ids = self._term_ids(conn, list(frequencies))
+        conn.executemany(
+            "INSERT INTO search_postings (term_id, doc_id, first_offset, tf) VALUES (?, ?, ?, ?)",
+            [
+                (term_ids[term], doc_id, offsets.get(term), tf)
+                for term, tf in frequencies.items()
+            ],
+        )
+
+    def _rule_fields(self, root_name: str, filename: str) -> List[Tuple[str, str]]:
+        """Return the rule fields of a diagram from its container's hierarchy index."""
+        stem = os.path.splitext(filename)[0]
+        try:
+            nodes = load_hierarchy_index(
+                os.path.join(self.diagrams_dir, root_name, f"{stem}.json")
+            ).nodes
+        except (OSError, ValueError, KeyError):
+            return []
+        return [pair for node in nodes for pair in _rule_fields(node)]
+
+    def index_root(self, root_name: str) -> int:
+        """Re-index every diagram of ``root_name`` and return the file count."""
+        root_path = os.path.join(self.diagrams_dir, root_name)
+        filenames = []
+        if os.path.isdir(root_path):
+            filenames = sorted(f for f in os.listdir(root_path) if f.endswith(".mmd"))
+        with self._connect() as conn:
+            self._remove(conn, "root = ?", (root_name,))
+            for filename in filenames:
+                self.index_file(root_name, filename, conn)
+        LOGGER.debug("Search index refreshed for %s (%d files)", root_name, len(filenames))
+        return len(filenames)
+
+    def sync(self) -> int:
+        """Bring the index in line with ``diagrams_dir`` and return files re-indexed.
+
+        Only files whose size or modification time changed since they were
+        indexed are re-read, so restarting against an unchanged tree is cheap.
+        """
+        on_disk: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        if os.path.isdir(self.diagrams_dir):
+            with os.scandir(self.diagrams_dir) as roots:
+                for root in roots:
+                    if not root.is_dir():
+                        continue
+                    with os.scandir(root.path) as entries:
+                        for entry in entries:
+                            if entry.is_file() and entry.name.endswith(".mmd"):
+                                stat = entry.stat()
+                                on_disk[(root.name, entry.name)] = (stat.st_size, stat.st_mtime)
+
+        reindexed = 0
+        with self._connect() as conn:
+            indexed = {
+                (root, filename): (size, mtime)
+                for root, filename, size, mtime in conn.execute(
+                    "SELECT root, filename, size, mtime FROM search_docs"
+                )
+            }
+            for key in indexed.keys() - on_disk.keys():
+                self._remove(conn, "root = ? AND filename = ?", key)
+            for key, meta in on_disk.items():
+                if indexed.get(key) != meta:
+                    self.index_file(key[0], key[1], conn)
+                    reindexed += 1
+        LOGGER.info("Search index synced: %d files re-indexed", reindexed)
+        return reindexed
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _matching_terms(self, conn: sqlite3.Connection, term: str) -> List[int]:
+        trigrams = _trigrams(term)
+        if not trigrams:
+            rows = conn.execute(
+                "SELECT term_id FROM search_terms WHERE instr(term, ?) > 0", (term,)
+            )
+            return [r[0] for r in rows]
+        placeholders = ",".join("?" * len(trigrams))
+        rows = conn.execute(
+            "SELECT t.term_id, t.term FROM search_trigrams g "
+            "JOIN search_terms t ON t.term_id = g.term_id "
+            f"WHERE g.trigram IN ({placeholders}) "
+            "GROUP BY g.term_id HAVING COUNT(*) = ?",
+            (*trigrams, len(trigrams)),
+        )
+        return [term_id for term_id, text in rows if term in text]
+
+    def _matching_docs(
+        self, conn: sqlite3.Connection, term: str
+    ) -> Dict[int, Tuple[int | None, float]]:
+        """Return ``{doc_id: (text offset, weighted frequency)}`` of documents containing ``term``."""
+        term_ids = self._matching_terms(conn, term)
+        if not term_ids:
+            return {}
+        placeholders = ",".join("?" * len(term_ids))
+        rows = conn.execute(
+            "SELECT doc_id, MIN(first_offset), SUM(tf) FROM search_postings "
+            f"WHERE term_id IN ({placeholders}) GROUP BY doc_id",
+            term_ids,
+        )
+        return {doc_id: (offset, tf) for doc_id, offset, tf in rows}
+
+    def _match_terms(
+        self, conn: sqlite3.Connection, terms: List[str]
+    ) -> Tuple[Dict[int, int | None] | None, List[Dict[int, float]]]:
+        """Return the documents matching every term and each term's frequencies.
+
+        The documents map to the text offset of a match for the snippet,
+        ``None`` if the terms only occur in rule fields; the frequencies of
+        a term cover every document containing it.  The documents are
+        ``None`` when there are no terms to match.
+        """
+        offsets: Dict[int, int | None] | None = None
+        frequencies: List[Dict[int, float]] = []
+        for term in terms:
+            matches = self._matching_docs(conn, term)
+            frequencies.append({doc_id: tf for doc_id, (_, tf) in matches.items()})
+            if offsets is None:
+                offsets = {d: o for d, (o, _) in matches.items()}
+            else:
+                offsets = {
+                    d: matches[d][0] if o is None else o
+                    for d, o in offsets.items()
+                    if d in matches
+                }
+            if not offsets:
+                return {}, []
+        return offsets, frequencies
+
+    def _scores(
+        self,
+        conn: sqlite3.Connection,
+        offsets: Dict[int, int | None],
+        frequencies: List[Dict[int, float]],
+    ) -> Dict[int, float]:
+        """Return the BM25 score of every document in ``offsets``."""
+        count, average = conn.execute("SELECT COUNT(*), AVG(length) FROM search_docs").fetchone()
+        lengths = dict(
+            conn.execute(
+                "SELECT doc_id, length FROM search_docs "
+                "WHERE doc_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(offsets)),),
+            )
+        )
+        scores = dict.fromkeys(offsets, 0.0)
+        for term_frequencies in frequencies:
+            found = len(term_frequencies)
+            idf = math.log(1 + (count - found + 0.5) / (found + 0.5))
+            for doc_id in scores:
+                tf = term_frequencies[doc_id]
+                norm = _K1 * (1 - _B + _B * lengths[doc_id] / average) if average else _K1
+                scores[doc_id] += idf * tf * (_K1 + 1) / (tf + norm)
+        return scores
+
+    @staticmethod
+    def _filters(
+        offsets: Dict[int, int | None] | None, catalog: str, diagram_type: str
+    ) -> Tuple[List[str], List[Any]]:
+        where = [
+            "(? = '' OR lower(catalog) = lower(?))",
+            "(? = '' OR diagram_type IS NULL OR lower(diagram_type) = lower(?))",
+        ]
+        params: List[Any] = [catalog, catalog, diagram_type, diagram_type]
+        if offsets is not None:
+            where.append("doc_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(offsets)))
+        return where, params
+
+    def _sorted_rows(
+        self,
+        conn: sqlite3.Connection,
+        query: str,
+        offsets: Dict[int, int | None] | None,
+        catalog: str,
+        diagram_type: str,
+        columns: Tuple[str, ...] = ("root", "filename"),
+        descending: bool = False,
+        after: tuple | None = None,
+    ) -> Iterator[tuple]:
+        """Yield the matching ``search_docs`` rows ordered by ``columns``.
+
+        With ``after``, only rows whose ``columns`` come after that key are
+        read, so a page costs the same wherever it starts.
+        """
+        where, params = self._filters(offsets, catalog, diagram_type)
+        if after is not None:
+            where.append(
+                f"({', '.join(columns)}) {'<' if descending else '>'} "
+                f"({', '.join('?' * len(columns))})"
+            )
+            params.extend(after)
+        order = ", ".join(f"{column} DESC" if descending else column for column in columns)
+        rows = conn.execute(
+            "SELECT doc_id, root, filename, diagram_type, size, mtime FROM search_docs "
+            f"WHERE {' AND '.join(where)} ORDER BY {order}",
+            params,
+        )
+        for row in rows:
+            # Punctuation-only queries have no tokens; fall back to the
+            # stored text rather than the files on disk.
+            if offsets is None and query and query not in self._body(conn, row[0]):
+                continue
+            yield row
+
+    def _ordered(
+        self,
+        conn: sqlite3.Connection,
+        query: str,
+        offsets: Dict[int, int | None] | None,
+        scores: Dict[int, float] | None,
+        catalog: str,
+        diagram_type: str,
+        sort_key: str,
+        descending: bool,
+        after: tuple | None,
+        count: int,
+    ) -> List[Tuple[tuple, tuple]]:
+        """Return the first ``count`` ``(key, row)`` pairs after ``after``.
+
+        For relevance the key starts with the negated score, so the best
+        documents come first, and the first ``count`` are picked with a heap
+        rather than by sorting every match.
+        """
+        if sort_key == "relevance":
+            keyed = [
+                ((-scores[row[0]], row[1], row[2]), row)
+                for row in self._sorted_rows(conn, query, offsets, catalog, diagram_type)
+            ]
+            if after is not None:
+                keyed = [
+                    item for item in keyed
+                    if (item[0] < after if descending else item[0] > after)
+                ]
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            return pick(count, keyed, key=lambda item: item[0])
+        columns = _SORT_COLUMNS[sort_key]
+        rows = self._sorted_rows(
+            conn, query, offsets, catalog, diagram_type, columns, descending, after
+        )
+        return [
+            (tuple(row[_ROW_INDEX[column]] for column in columns), row)
+            for row in islice(rows, count)
+        ]
+
+    def _count(
+        self,
+        conn: sqlite3.Connection,
+        query: str,
+        offsets: Dict[int, int | None] | None,
+        catalog: str,
+        diagram_type: str,
+    ) -> int:
+        if offsets is None and query:
+            return sum(1 for _ in self._sorted_rows(conn, query, None, catalog, diagram_type))
+        where, params = self._filters(offsets, catalog, diagram_type)
+        return conn.execute(
+            f"SELECT COUNT(*) FROM search_docs WHERE {' AND '.join(where)}", params
+        ).fetchone()[0]
+
+    def _result(
+        self,
+        conn: sqlite3.Connection,
+        row: tuple,
+        query: str,
+        terms: List[str],
+        offsets: Dict[int, int | None] | None,
+    ) -> Dict[str, Any]:
+        doc_id, root_name, filename, file_type, size, mtime = row
+        snippet = ""
+        if query:
+            snippet = self._snippet(conn, doc_id, query, terms, offsets)
+        return {
+            "filename": filename,
+            "catalog": root_name,
+            "type": file_type,
+            "size": size,
+            "last_modified": mtime,
+            "match_snippet": snippet,
+        }
+
+    def _ranking(
+        self,
+        conn: sqlite3.Connection,
+        sort_key: str,
+        offsets: Dict[int, int | None] | None,
+        frequencies: List[Dict[int, float]],
+    ) -> Tuple[str, Dict[int, float] | None]:
+        """Return the sort key to use and, for relevance, the document scores."""
+        if sort_key != "relevance":
+            return sort_key, None
+        if offsets is None:
+            return "name", None
+        return sort_key, self._scores(conn, offsets, frequencies)
+
+    def search(
+        self,
+        query: str = "",
+        catalog: str = "",
+        diagram_type: str = "",
+        page: int = 1,
+        per_page: int = 9,
+        sort: str = "name",
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return ``(total, results)`` for one page of matching diagrams.
+
+        Every word of ``query`` must occur, as a substring of some token, in
+        the diagram text, its filename or the fields of its rules.  ``sort``
+        is one of :data:`SORT_KEYS`, prefixed with ``-`` for descending order.
+        """
+        query = query.lower().strip()
+        terms = list(tokenize(query))
+        sort_key, descending = parse_sort(sort)
+        with self._connect() as conn:
+            offsets, frequencies = self._match_terms(conn, terms)
+            if offsets is not None and not offsets:
+                return 0, []
+            sort_key, scores = self._ranking(conn, sort_key, offsets, frequencies)
+            start = (page - 1) * per_page
+            ordered = self._ordered(
+                conn, query, offsets, scores, catalog, diagram_type,
+                sort_key, descending, None, start + per_page,
+            )
+            results = [
+                self._result(conn, row, query, terms, offsets) for _, row in ordered[start:]
+            ]
+            total = self._count(conn, query, offsets, catalog, diagram_type)
+        return total, results
+
+    def search_page(
+        self,
+        query: str = "",
+        catalog: str = "",
+        diagram_type: str = "",
+        sort: str = "name",
+        limit: int = 9,
+        cursor: str | None = None,
+    ) -> Dict[str, Any]:
+        """Return the ``limit`` results following ``cursor`` in ``sort`` order.
+
+        The result holds the ``total`` match count, the ``results`` and the
+        ``next`` cursor, which is ``None`` on the last page.  Without query
+        terms there is nothing to rank and relevance falls back to name
+        order.  Raises :class:`ValueError` for an unknown sort key or a
+        cursor issued for another order.
+        """
+        query = query.lower().strip()
+        terms = list(tokenize(query))
+        sort_key, descending = parse_sort(sort)
+        with self._connect() as conn:
+            offsets, frequencies = self._match_terms(conn, terms)
+            sort_key, scores = self._ranking(conn, sort_key, offsets, frequencies)
+            tag = f"-{sort_key}" if descending else sort_key
+            columns = _SORT_COLUMNS[sort_key]
+            if sort_key == "relevance":
+                columns = ("score", *columns)
+            after = _decode_cursor(cursor, tag, columns) if cursor else None
+            if offsets is not None and not offsets:
+                return {"total": 0, "results": [], "next": None, "sort": tag}
+            ordered = self._ordered(
+                conn, query, offsets, scores, catalog, diagram_type,
+                sort_key, descending, after, limit + 1,
+            )
+            results = [
+                self._result(conn, row, query, terms, offsets) for _, row in ordered[:limit]
+            ]
+            total = self._count(conn, query, offsets, catalog, diagram_type)
+        next_cursor = None
+        if len(ordered) > limit:
+            next_cursor = _encode_cursor(tag, ordered[limit - 1][0]) if limit else None
+        return {"total": total, "results": results, "next": next_cursor, "sort": tag}
+
+    def iter_search(
+        self, query: str = "", catalog: str = "", diagram_type: str = "", sort: str = "name"
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield every result of :meth:`search` one at a time, in ``sort`` order.
+
+        Rows are read from the database cursor as they are consumed, so
+        streaming a large result set keeps memory flat; only relevance
+        order has to rank all matches first.  The connection stays open
+        until the iterator is exhausted or closed.
+        """
+        query = query.lower().strip()
+        terms = list(tokenize(query))
+        sort_key, descending = parse_sort(sort)
+        with self._connect() as conn:
+            offsets, frequencies = self._match_terms(conn, terms)
+            if offsets is not None and not offsets:
+                return
+            sort_key, scores = self._ranking(conn, sort_key, offsets, frequencies)
+            if sort_key == "relevance":
+                rows = (
+                    row for _, row in self._ordered(
+                        conn, query, offsets, scores, catalog, diagram_type,
+                        sort_key, descending, None, len(offsets),
+                    )
+                )
+            else:
+                rows = self._sorted_rows(
+                    conn, query, offsets, catalog, diagram_type,
+                    _SORT_COLUMNS[sort_key], descending,
+                )
+            for row in rows:
+                yield self._result(conn, row, query, terms, offsets)
+
+    def _body(self, conn: sqlite3.Connection, doc_id: int) -> str:
+        row = conn.execute("SELECT body FROM search_docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def _snippet(
+        self,
+        conn: sqlite3.Connection,
+        doc_id: int,
+        query: str,
+        terms: List[str],
+        offsets: Dict[int, int | None] | None,
+    ) -> str:
+        body = self._body(conn, doc_id)
+        # Skip the filename header so snippets come from the diagram text.
+        body_start = body.find("\n") + 1
+        offset = offsets.get(doc_id) if offsets else None
+        if offset is None:  # no terms, or only matched in rule fields or the filename
+            offset = body.find(query, body_start)
+            offset = body_start if offset < 0 else offset
+        start = max(body_start, offset - _SNIPPET_WINDOW)
+        window = body[start : offset + len(query) + _SNIPPET_WINDOW]
+        return get_snippet(window, query) or get_snippet(window, terms[0] if terms else query)
+
+
+def get_search_index() -> SearchIndex:
+    """Return the :class:`SearchIndex` bound to the current application."""
+    from flask import current_app
+
+    index = current_app.extensions.get("search_index")
+    if index is None:
+        index = SearchIndex(
+            current_app.config["DIAGRAMS_FOLDER"],
+            current_app.config["SEARCH_INDEX_PATH"],
+        )
+        index.sync()
+        current_app.extensions["search_index"] = index
+    return index
+
+
+def perform_search(
+    query: str, catalog: str = "", diagram_type: str = "", sort: str = "name"
+) -> Iterator[Dict[str, Any]]:
+    """Return an iterator over all diagrams of the current app matching ``query``."""
+    return get_search_index().iter_search(query, catalog, diagram_type, sort)
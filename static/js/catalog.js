@@ -538,7 +538,8 @@ class CatalogViewer {
     // Button actions
     card.querySelector(".preview-btn")?.addEventListener("click", (e) => {
       e.stopPropagation();
-      window.location.href = `/view_diagram?root_name=${encodeURIComponent(entry.root)}&diagram_name=${encodeURIComponent(entry.diagram)}`;
+      const version = entry.version ? `&v=${encodeURIComponent(entry.version)}` : "";
+      window.location.href = `/view_diagram?root_name=${encodeURIComponent(entry.root)}&diagram_name=${encodeURIComponent(entry.diagram)}${version}`;
     });
     card.querySelector(".hierarchy-btn")?.addEventListener("click", (e) => {
       e.stopPropagation();
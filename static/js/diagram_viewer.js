@@ -544,9 +544,11 @@ async function initializeMermaid() {
       ? configData.themes[themeName] || {}
       : {};
     const themeVariables = themeConfig.themeVariables || {};
+    const compiledTheme = configData.compiled?.themes?.[themeName];
 
-    let themeCSS = "";
-    if (themeConfig.classDefs) {
+    // The server ships each theme's classDefs already compiled to CSS.
+    let themeCSS = compiledTheme ? compiledTheme.themeCSS : "";
+    if (!compiledTheme && themeConfig.classDefs) {
       themeCSS = themeConfig.classDefs
         .split("\n")
         .map((line) => {
@@ -877,9 +879,13 @@ async function loadDiagramFromURL() {
     return;
   }
 
+  // A content version makes the URL immutable and cacheable by the browser.
+  const version = params.get("v");
+  const query = version ? `?v=${encodeURIComponent(version)}` : "";
+
   try {
     const response = await fetch(
-      `/diagrams/${encodeURIComponent(rootName)}/${encodeURIComponent(diagramName)}`,
+      `/diagrams/${encodeURIComponent(rootName)}/${encodeURIComponent(diagramName)}${query}`,
     );
 
     if (!response.ok) {
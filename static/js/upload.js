@@ -156,6 +156,55 @@ document.addEventListener("DOMContentLoaded", () => {
     return Array.from(fileList).reduce((total, f) => total + f.size, 0);
   }
 
+  function redirectAfterUpload(response) {
+    setTimeout(() => {
+      const redirectUrl =
+        response.redirect_url ||
+        `/view_diagram?root_name=${input.files[0].name.replace(/\.[^/.]+$/, "")}&diagramName=${input.files[0].name.replace(/\.[^/.]+$/, "")}.mmd`;
+      window.location.href = redirectUrl;
+    }, 1500);
+  }
+
+  // Poll a background job until it leaves the queued/running states
+  function pollJob(statusUrl) {
+    return new Promise((resolve, reject) => {
+      const check = () => {
+        fetch(statusUrl, { headers: { Accept: "application/json" } })
+          .then((res) => (res.ok ? res.json() : Promise.reject(new Error(`HTTP ${res.status}`))))
+          .then((job) => {
+            if (job.status === "queued" || job.status === "running") {
+              const percent = Math.round((job.progress || 0) * 100);
+              progressPercent.textContent = percent + "%";
+              progressStatus.textContent = `Processing files... (${job.completed}/${job.total})`;
+              setTimeout(check, 1000);
+            } else {
+              resolve(job);
+            }
+          })
+          .catch(reject);
+      };
+      check();
+    });
+  }
+
+  // Report per-file results and errors of a finished upload job
+  function showJobOutcome(job, response) {
+    const results = job.results || [];
+    const errors = (response.errors || []).concat(job.errors || []);
+    progressPercent.textContent = "100%";
+    progressStatus.textContent = `Processed ${results.length} of ${results.length + errors.length} files`;
+    errors.forEach((error) => window.app.showToast(error, "error"));
+    if (!errors.length) {
+      window.app.showToast("JSON files processed successfully!", "success");
+      redirectAfterUpload(response);
+    } else {
+      if (results.length) {
+        window.app.showToast(`Processed: ${results.join(", ")}`, "info");
+      }
+      submitBtn.disabled = false;
+    }
+  }
+
   // Form submission
   form.addEventListener("submit", (e) => {
     e.preventDefault();
@@ -206,19 +255,27 @@ document.addEventListener("DOMContentLoaded", () => {
           submitBtn.disabled = false;
           return;
         }
-        if (response.success) {
+        if (response.status_url) {
+          progressBar.style.width = "100%";
+          uploadedSizeDisplay.textContent = totalSize.textContent;
+          progressStatus.textContent = "Processing files...";
+          progressPercent.textContent = "0%";
+          pollJob(response.status_url)
+            .then((job) => showJobOutcome(job, response))
+            .catch(() => {
+              window.app.showToast("Lost track of the processing job", "error");
+              progressContainer.classList.add("hidden");
+              submitBtn.disabled = false;
+            });
+        } else if (response.success) {
           progressBar.style.width = "100%";
           progressPercent.textContent = "100%";
           uploadedSizeDisplay.textContent = totalSize.textContent;
           progressStatus.textContent = "Upload complete";
-          window.app.showToast("JSON files uploaded successfully!", "success");
-          setTimeout(() => {
-            const redirectUrl =
-              response.redirect_url ||
-              `/view_diagram?root_name=${input.files[0].name.replace(/\.[^/.]+$/, "")}&diagramName=${input.files[0].name.replace(/\.[^/.]+$/, "")}.mmd`;
-            window.location.href = redirectUrl;
-          }, 1500);
+          window.app.showToast(response.message || "JSON files processed successfully!", "success");
+          redirectAfterUpload(response);
         } else {
+          (response.errors || []).forEach((error) => window.app.showToast(error, "error"));
           window.app.showToast(response.message || "Upload failed", "error");
           progressContainer.classList.add("hidden");
           submitBtn.disabled = false;
@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from activity_store import ActivityStore
+
+
+def _entry(action, days_ago=0, user='u1'):
+    ts = datetime.utcnow() - timedelta(days=days_ago)
+    return {'timestamp': ts.isoformat(), 'action': action, 'user': user, 'details': action}
+
+
+def test_new_store_is_seeded(tmp_path):
+    store = ActivityStore(tmp_path / 'activity.sqlite3')
+    entries = store.entries()
+    assert len(entries) == 1
+    assert entries[0]['action'] == 'system'
+    assert store.rule_count() == 0
+
+
+def test_append_is_shared_between_instances(tmp_path):
+    db_path = tmp_path / 'activity.sqlite3'
+    first = ActivityStore(db_path)
+    second = ActivityStore(db_path)
+    first.append(_entry('upload'), rule_id='r1')
+    second.append(_entry('edit', user='u2'), rule_id='r1')
+    assert [e['action'] for e in first.entries()] == ['system', 'upload', 'edit']
+    assert first.rules()['r1']['modified_by'] == 'u2'
+    assert first.entries(limit=1)[0]['action'] == 'edit'
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / 'activity_log.json'
+    legacy.write_text(json.dumps({
+        'rules': {'r1': {'status': 'active'}, 'r2': {}},
+        'activity_log': [_entry('upload', days_ago=3), {'timestamp': '2020-01-01T00:00:00'}],
+    }))
+    db_path = tmp_path / 'activity_log.sqlite3'
+    store = ActivityStore(db_path, legacy_json=legacy)
+    ActivityStore(db_path, legacy_json=legacy)
+    assert len(store.entries()) == 2
+    assert store.rule_count() == 2
+    day = (datetime.utcnow() - timedelta(days=3)).date().isoformat()
+    assert store.daily_counts(since='2021-01-01') == {day: 1}
+
+
+def test_legacy_import_counts_only_inserted_entries(tmp_path, caplog):
+    legacy = tmp_path / 'activity_log.json'
+    legacy.write_text(json.dumps({
+        'activity_log': [_entry('upload'), 'junk', {'action': 'no timestamp'}, _entry('edit')],
+    }))
+    with caplog.at_level('INFO', logger='activity_store'):
+        store = ActivityStore(tmp_path / 'activity_log.sqlite3', legacy_json=legacy)
+    assert [e['action'] for e in store.entries()] == ['upload', 'edit']
+    assert 'Imported 2 activity entries' in caplog.text
+
+
+def test_daily_counts_track_appends(tmp_path):
+    store = ActivityStore(tmp_path / 'activity.sqlite3')
+    store.append(_entry('upload', days_ago=2))
+    store.append(_entry('upload', days_ago=2))
+    store.append({**_entry('edit'), 'timestamp': datetime.now(timezone.utc).isoformat()})
+    today = datetime.utcnow().date()
+    counts = store.daily_counts(since=(today - timedelta(days=2)).isoformat())
+    assert counts == {(today - timedelta(days=2)).isoformat(): 2, today.isoformat(): 2}
+
+
+def test_daily_counts_backfilled_for_existing_store(tmp_path):
+    db_path = tmp_path / 'activity.sqlite3'
+    store = ActivityStore(db_path)
+    store.append(_entry('upload', days_ago=5))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM activity_daily")
+        conn.execute("DELETE FROM meta WHERE key = 'daily_rollup'")
+    assert sum(ActivityStore(db_path).daily_counts().values()) == 2
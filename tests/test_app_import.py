@@ -71,5 +71,9 @@ def test_create_app_without_dotenv(monkeypatch):
     sys.modules["markdown"] = markdown_stub
 
     module = importlib.reload(importlib.import_module("app"))
+    # Importing the module builds nothing until ``app`` is accessed.
+    assert module._APP is None
     app = module.create_app()
     assert app.config["VERSION"] == "1.0.0"
+    assert module._APP is None
+    assert module.app is module.get_app() is module._APP
@@ -0,0 +1,244 @@
+"""Upload jobs and the registry against a real application, built in a fresh interpreter.
+
+The other test modules replace Flask with stubs, so these scenarios run in
+a subprocess and are skipped where Flask-SQLAlchemy is not installed.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_HAS_FLASK = (
+    subprocess.run(
+        [sys.executable, "-c", "import flask, flask_sqlalchemy, flask_login"],
+        capture_output=True,
+    ).returncode
+    == 0
+)
+pytestmark = pytest.mark.skipif(not _HAS_FLASK, reason="Flask-SQLAlchemy not installed")
+
+_PRELUDE = """
+import json, logging, os, sys, time
+tmp = sys.argv[1]
+for key, name in (("DIAGRAMS_FOLDER", "diagrams"), ("UPLOAD_FOLDER", "uploads"),
+                  ("DATA_DIR", "data"), ("LOG_DIR", "logs")):
+    os.environ[key] = os.path.join(tmp, name)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "rules.db")
+import click
+from app import create_app
+
+RULES = json.dumps([{"RuleGUID": "g1", "RuleName": "Check claim", "FunctionName": "F",
+                     "Container": "Claims", "Children": [], "Actions": []}]).encode()
+
+def wait_for(client, job_id):
+    for _ in range(200):
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(job)
+
+def report(**values):
+    print("RESULT " + json.dumps(values))
+"""
+
+
+def _run(script, tmp_path):
+    proc = subprocess.run(
+        [sys.executable, "-c", _PRELUDE + textwrap.dedent(script), str(tmp_path)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise AssertionError(proc.stdout[-2000:] + proc.stderr[-2000:])
+
+
+def test_upload_when_built_by_the_flask_command(tmp_path):
+    result = _run(
+        """
+        import io
+        with click.Context(click.Command("run")):
+            app = create_app(WTF_CSRF_ENABLED=False)
+        client = app.test_client()
+        response = client.post(
+            "/upload",
+            data={"files": [(io.BytesIO(RULES), "Claims_Export.json")]},
+            content_type="multipart/form-data",
+        )
+        job = wait_for(client, response.get_json()["job_id"])
+        report(status=response.status_code, job=job["status"], results=job["results"])
+        """,
+        tmp_path,
+    )
+    assert result == {"status": 202, "job": "succeeded", "results": ["Claims_Export.json"]}
+
+
+def test_upload_reports_rejected_files_and_runs_inline_without_a_queue(tmp_path):
+    result = _run(
+        """
+        import io
+
+        app = create_app(WTF_CSRF_ENABLED=False)
+        client = app.test_client()
+
+        def post():
+            return client.post(
+                "/upload",
+                data={"files": [(io.BytesIO(RULES), "Claims_Export.json"),
+                                (io.BytesIO(b"x"), "notes.txt")]},
+                content_type="multipart/form-data",
+            )
+
+        queued = post()
+        job = wait_for(client, queued.get_json()["job_id"])
+        del app.extensions["job_queue"]
+        inline = post()
+        report(
+            queued=[queued.status_code, queued.get_json()["success"], queued.get_json()["errors"]],
+            job=job["status"],
+            inline=[inline.status_code, inline.get_json()["processed"], inline.get_json()["errors"]],
+            missing=client.get("/api/jobs/" + queued.get_json()["job_id"]).status_code,
+        )
+        """,
+        tmp_path,
+    )
+    assert result["queued"] == [202, False, ["notes.txt: Invalid file type"]]
+    assert result["job"] == "succeeded"
+    assert result["inline"] == [207, ["Claims_Export.json"], ["notes.txt: Invalid file type"]]
+    assert result["missing"] == 404
+
+
+def test_job_status_transitions_and_endpoint(tmp_path):
+    result = _run(
+        """
+        import threading
+        from jobs import get_job_queue
+
+        app = create_app(WTF_CSRF_ENABLED=False, JOB_WORKERS=1)
+        client = app.test_client()
+        release = threading.Event()
+
+        def blocking(items):
+            release.wait(10)
+            for item in items:
+                yield item["name"], item["name"], None
+
+        def outcomes(errors):
+            def runner(items):
+                for item, error in zip(items, errors):
+                    yield item["name"], None if error else item["name"], error
+            return runner
+
+        def crash(items):
+            raise RuntimeError("boom")
+            yield
+
+        items = [{"name": "a.json"}, {"name": "b.json"}]
+        with app.app_context():
+            queue = get_job_queue()
+            first = queue.submit("upload", items, blocking, user="tester")
+            second = queue.submit("upload", items, outcomes([None, None]))
+            time.sleep(0.3)
+            while_blocked = [client.get(f"/api/jobs/{i}").get_json()["status"] for i in (first, second)]
+            release.set()
+            partial = queue.submit("upload", items, outcomes([None, "bad"]))
+            failed = queue.submit("upload", items, outcomes(["bad", "bad"]))
+            crashed = queue.submit("upload", items, crash)
+        jobs = {i: wait_for(client, i) for i in (first, second, partial, failed, crashed)}
+        report(
+            while_blocked=while_blocked,
+            statuses=[jobs[i]["status"] for i in (first, second, partial, failed, crashed)],
+            first=jobs[first],
+            partial=jobs[partial],
+            crashed=jobs[crashed]["errors"],
+            missing=client.get("/api/jobs/unknown").status_code,
+        )
+        """,
+        tmp_path,
+    )
+    assert result["while_blocked"] == ["running", "queued"]
+    assert result["statuses"] == ["succeeded", "succeeded", "partial", "failed", "failed"]
+    first = result["first"]
+    assert first["user"] == "tester" and first["completed"] == first["total"] == 2
+    assert first["progress"] == 1.0 and first["finished_at"]
+    assert result["partial"]["results"] == ["a.json"]
+    assert result["partial"]["errors"] == ["b.json: bad"]
+    assert result["crashed"] == ["boom"]
+    assert result["missing"] == 404
+
+
+def test_orphaned_jobs_are_failed_on_start(tmp_path):
+    result = _run(
+        """
+        from datetime import datetime, timedelta
+        from extensions import db
+        from models import Job
+
+        app = create_app(WTF_CSRF_ENABLED=False)
+        stale = datetime.utcnow() - timedelta(hours=1)
+        with app.app_context():
+            for job_id, status, updated in (
+                ("stale-running", "running", stale),
+                ("stale-queued", "queued", stale),
+                ("live", "running", datetime.utcnow()),
+                ("done", "succeeded", stale),
+            ):
+                db.session.add(Job(id=job_id, kind="upload", status=status, total=1,
+                                   completed=0, results="[]", errors="[]", updated_at=updated))
+            db.session.commit()
+
+        restarted = create_app(WTF_CSRF_ENABLED=False)
+        client = restarted.test_client()
+        jobs = {i: client.get(f"/api/jobs/{i}").get_json() for i in
+                ("stale-running", "stale-queued", "live", "done")}
+        report(statuses={i: job["status"] for i, job in jobs.items()},
+               errors=jobs["stale-running"]["errors"])
+        """,
+        tmp_path,
+    )
+    assert result["statuses"] == {
+        "stale-running": "failed",
+        "stale-queued": "failed",
+        "live": "running",
+        "done": "succeeded",
+    }
+    assert result["errors"] == ["Interrupted: the process running this job stopped"]
+
+
+def test_registry_table_is_left_to_migrations(tmp_path):
+    result = _run(
+        """
+        import flask_migrate
+        from diagram_registry import ensure_table
+        from extensions import db
+        from models import Diagram
+
+        with click.Context(click.Command("db")):
+            app = create_app()
+        with app.app_context():
+            flask_migrate.upgrade()
+            db.session.add(Diagram(root_name="r", name="n", file_path="r/n.mmd", size=1,
+                                   mtime=1.0, uploaded_by="bob"))
+            db.session.commit()
+            # Re-running the registry migration keeps a current table.
+            flask_migrate.stamp(revision="3f1d9a7c2b44")
+            flask_migrate.upgrade()
+            kept = [row.uploaded_by for row in db.session.execute(db.select(Diagram)).scalars()]
+            flask_migrate.downgrade(revision="3f1d9a7c2b44")
+            created = ensure_table()
+            report(kept=kept, created=created,
+                   exists=db.inspect(db.engine).has_table("diagrams"))
+        """,
+        tmp_path,
+    )
+    assert result == {"kept": ["bob"], "created": False, "exists": False}
@@ -0,0 +1,96 @@
+import os
+import sys
+import types
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Stub modules required by utils
+flask_stub = types.ModuleType("flask")
+flask_stub.current_app = types.SimpleNamespace()
+sys.modules.setdefault("flask", flask_stub)
+flask_login_stub = types.ModuleType("flask_login")
+flask_login_stub.current_user = types.SimpleNamespace(is_authenticated=False, username="user")
+sys.modules.setdefault("flask_login", flask_login_stub)
+werkzeug_utils = types.ModuleType("werkzeug.utils")
+werkzeug_utils.secure_filename = lambda name: name
+sys.modules.setdefault("werkzeug", types.ModuleType("werkzeug"))
+sys.modules.setdefault("werkzeug.utils", werkzeug_utils)
+
+import utils  # noqa: E402
+from catalog_index import CatalogIndex  # noqa: E402
+
+
+def _make_tree(root):
+    first = root / "Function_first"
+    first.mkdir()
+    (first / "first.mmd").write_text("flowchart TD")
+    (first / "first.json").write_text("[]")
+    (first / "orphan_flowchart.mmd").write_text("flowchart TD")
+    (root / "Lookup").mkdir()
+    (root / "loose.json").write_text("[]")
+
+
+def test_catalogs_pair_mmd_and_json(tmp_path):
+    diagrams = tmp_path / "diagrams"
+    diagrams.mkdir()
+    _make_tree(diagrams)
+    index = CatalogIndex(diagrams, tmp_path / "index.sqlite3")
+    assert index.rebuild() == 2
+
+    catalogs = index.catalogs()
+    assert catalogs == [
+        {
+            "category": "Function_first",
+            "entries": [
+                {
+                    "root": "Function_first",
+                    "diagram": "first.mmd",
+                    "hierarchy": "first.json",
+                    "type": None,
+                    "version": None,
+                }
+            ],
+        }
+    ]
+    assert index.catalog_names() == ["Function", "Lookup"]
+    assert index.files() == {
+        "Function_first": ["first.json", "first.mmd", "orphan_flowchart.mmd"],
+        "Lookup": [],
+    }
+
+
+def test_diagrams_filters_and_refresh(tmp_path):
+    diagrams = tmp_path / "diagrams"
+    diagrams.mkdir()
+    _make_tree(diagrams)
+    index = CatalogIndex(diagrams, tmp_path / "index.sqlite3")
+    index.rebuild()
+
+    names = [d["filename"] for d in index.diagrams(catalog="function")]
+    assert names == ["first.mmd", "orphan_flowchart.mmd"]
+    assert [d["filename"] for d in index.diagrams(diagram_type="sequence")] == ["first.mmd"]
+    assert index.diagrams(catalog="lookup") == []
+
+    new_root = diagrams / "Lookup"
+    (new_root / "Lookup.mmd").write_text("flowchart TD")
+    (new_root / "Lookup.json").write_text("[]")
+    index.refresh_root("Lookup")
+    assert [c["category"] for c in index.catalogs()] == ["Function_first", "General_General"]
+    entry = index.diagrams(catalog="Lookup")[0]
+    assert entry["size"] == len("flowchart TD")
+
+
+def test_version_bumps_and_manifest_etags(tmp_path):
+    diagrams = tmp_path / "diagrams"
+    diagrams.mkdir()
+    index = CatalogIndex(diagrams, tmp_path / "index.sqlite3")
+    index.rebuild()
+    before = index.version()
+
+    utils.generate_files([{"RuleGUID": "r1", "RuleName": "R1", "Container": "c"}], str(diagrams / "Root"))
+    index.refresh_root("Root")
+    assert index.version() == before + 1
+    entry = index.catalogs()[0]["entries"][0]
+    assert entry["version"] == utils.generation_etags(str(diagrams / "Root"))["c.mmd"]
+    assert index.files() == {"Root": ["c.json", "c.mmd"]}
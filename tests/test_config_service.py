@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import ConfigService, compile_class_defs  # noqa: E402
+
+CLASS_DEFS = "classDef classRect fill:#153A60,stroke:#222\nnot a classDef\nclassDef classSet fill:#2C5E3E"
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_compile_class_defs():
+    assert compile_class_defs(CLASS_DEFS) == {
+        "classRect": {"fill": "#153A60", "stroke": "#222"},
+        "classSet": {"fill": "#2C5E3E"},
+    }
+    assert compile_class_defs("") == {}
+
+
+def test_snapshot_is_cached_until_the_file_changes(tmp_path):
+    path = tmp_path / "config.json"
+    _write(path, {"themes": {"light": {"classDefs": CLASS_DEFS}}})
+    service = ConfigService(path)
+
+    first = service.snapshot()
+    assert service.snapshot() is first
+    assert first.loaded
+    assert first.theme("light")["classes"]["classSet"] == {"fill": "#2C5E3E"}
+    assert ".classRect rect" in first.theme("light")["themeCSS"]
+    assert json.loads(first.body)["compiled"] == first.compiled
+
+    _write(path, {"themes": {}, "translations": {"SL": "Selection List"}})
+    os.utime(path, ns=(1, 1))
+    second = service.snapshot()
+    assert second is not first
+    assert second.etag != first.etag
+    assert second.data["translations"] == {"SL": "Selection List"}
+
+
+def test_reload_forces_a_parse(tmp_path):
+    path = tmp_path / "config.json"
+    _write(path, {"styles": {}})
+    service = ConfigService(path)
+    first = service.snapshot()
+    service.reload()
+    second = service.snapshot()
+    assert second is not first
+    assert second.etag == first.etag
+
+
+def test_invalid_file_keeps_last_good_snapshot(tmp_path):
+    path = tmp_path / "config.json"
+    service = ConfigService(path)
+    missing = service.snapshot()
+    assert not missing.loaded
+    assert missing.data == {"translations": {}, "styles": {}}
+
+    _write(path, {"styles": {"a": 1}})
+    good = service.snapshot()
+    assert good.loaded
+
+    path.write_text("{broken", encoding="utf-8")
+    assert service.snapshot() is good
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import types
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Stub modules required by utils
+flask_stub = types.ModuleType("flask")
+flask_stub.current_app = types.SimpleNamespace()
+sys.modules.setdefault("flask", flask_stub)
+flask_login_stub = types.ModuleType("flask_login")
+flask_login_stub.current_user = types.SimpleNamespace(is_authenticated=False, username="user")
+sys.modules.setdefault("flask_login", flask_login_stub)
+werkzeug_utils = types.ModuleType("werkzeug.utils")
+werkzeug_utils.secure_filename = lambda name: name
+sys.modules.setdefault("werkzeug", types.ModuleType("werkzeug"))
+sys.modules.setdefault("werkzeug.utils", werkzeug_utils)
+
+from diagram_registry import decode_cursor, encode_cursor, scan_root  # noqa: E402
+from utils import generate_files  # noqa: E402
+
+
+def _rules(container, count):
+    return [
+        {"RuleGUID": f"{container}-{i}", "RuleName": f"Rule {i}", "Container": container}
+        for i in range(count)
+    ]
+
+
+def test_scan_root_reads_manifest(tmp_path):
+    root = tmp_path / "Function_root"
+    generate_files(_rules("b_flowchart", 3) + _rules("a", 2), str(root))
+    (root / "stray.txt").write_text("ignored")
+
+    records = scan_root(str(tmp_path), "Function_root")
+    assert [r["name"] for r in records] == ["a", "b_flowchart"]
+    first, second = records
+    assert first["file_path"] == "Function_root/a.mmd"
+    assert first["rule_count"] == 2 and second["rule_count"] == 3
+    assert second["diagram_type"] == "flowchart"
+    assert first["size"] == os.path.getsize(root / "a.mmd")
+    manifest = json.loads((root / ".generation.json").read_text())
+    assert first["content_hash"] == manifest["containers"]["a"]["etags"]["a.mmd"]
+
+
+def test_scan_root_without_manifest(tmp_path):
+    root = tmp_path / "legacy"
+    generate_files(_rules("c", 4), str(root))
+    os.remove(root / ".generation.json")
+
+    (record,) = scan_root(str(tmp_path), "legacy")
+    assert record["rule_count"] == 4
+    assert len(record["content_hash"]) == 64
+    assert scan_root(str(tmp_path), "missing") == []
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("Root ü", "name/with=chars")
+    assert decode_cursor(cursor) == ("Root ü", "name/with=chars")
+    for bad in ("garbage", encode_cursor("a", "b")[:-3], "WzFd"):
+        try:
+            decode_cursor(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {bad!r}")
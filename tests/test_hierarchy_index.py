@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import types
+
+import pytest
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Stub modules required by utils
+flask_stub = types.ModuleType("flask")
+flask_stub.current_app = types.SimpleNamespace()
+sys.modules.setdefault("flask", flask_stub)
+flask_login_stub = types.ModuleType("flask_login")
+flask_login_stub.current_user = types.SimpleNamespace(is_authenticated=False, username="user")
+sys.modules.setdefault("flask_login", flask_login_stub)
+werkzeug_utils = types.ModuleType("werkzeug.utils")
+werkzeug_utils.secure_filename = lambda name: name
+sys.modules.setdefault("werkzeug", types.ModuleType("werkzeug"))
+sys.modules.setdefault("werkzeug.utils", werkzeug_utils)
+
+import utils  # noqa: E402
+from hierarchy_index import HierarchyIndex, index_path_for, load_hierarchy_index  # noqa: E402
+
+
+def _rule(guid, children=(), actions=()):
+    return {
+        "RuleGUID": guid,
+        "RuleName": guid.upper(),
+        "Container": "c",
+        "Children": list(children),
+        "Actions": [{"ActionName": name, "ChildRules": list(rules)} for name, rules in actions],
+    }
+
+
+def _tree():
+    leaves = [_rule(f"leaf{i}") for i in range(3)]
+    branch = _rule("branch", actions=[("Yes", leaves)])
+    return [_rule("top", children=[branch, _rule("other")]), _rule("second")]
+
+
+def test_generate_files_writes_index(tmp_path):
+    utils.generate_files(_tree(), str(tmp_path))
+    json_path = str(tmp_path / "c.json")
+    assert os.path.isfile(index_path_for(json_path))
+    index = load_hierarchy_index(json_path)
+    assert [index.nodes[n]["RuleGUID"] for n in index.roots] == ["top", "second"]
+    assert "Children" not in index.nodes[0]
+
+    rules = json.loads((tmp_path / "c.json").read_text())["rules"]
+    rebuilt = HierarchyIndex.from_rules(rules)
+    assert (rebuilt.nodes, rebuilt.children, rebuilt.roots) == (index.nodes, index.children, index.roots)
+
+
+def test_select_depth_subtree_and_paging():
+    index = HierarchyIndex.from_rules(utils.propagate_and_flatten_rules(_tree()))
+
+    top = index.select(depth=0)
+    assert [r["RuleGUID"] for r in top["rules"]] == ["top", "second"]
+    assert top["rules"][0]["ChildCount"] == 2 and top["total"] == 2
+
+    page = index.select(depth=1, offset=0, limit=1)
+    assert [(r["RuleGUID"], r["ParentGUID"], r["Depth"]) for r in page["rules"]] == [
+        ("top", None, 0),
+        ("branch", "top", 1),
+    ]
+
+    sub = index.select(subtree="branch", depth=1, offset=1, limit=1)
+    assert [r["RuleGUID"] for r in sub["rules"]] == ["branch", "leaf1"]
+    assert sub["rules"][1]["ParentActionIndex"] == 0
+    assert sub["total"] == 3
+
+    assert len(index.select()["rules"]) == 7
+    with pytest.raises(KeyError):
+        index.select(subtree="missing")
+
+
+def test_stale_index_is_rebuilt_from_file(tmp_path):
+    json_path = tmp_path / "legacy.json"
+    json_path.write_text(json.dumps({"rules": utils.propagate_and_flatten_rules(_tree())}))
+    index = load_hierarchy_index(str(json_path))
+    assert len(index.nodes) == 7
+    assert not os.path.exists(index_path_for(str(json_path)))
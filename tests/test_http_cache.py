@@ -0,0 +1,42 @@
+import hashlib
+import os
+import sys
+import types
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Stub modules required by utils
+flask_stub = types.ModuleType("flask")
+flask_stub.current_app = types.SimpleNamespace()
+sys.modules.setdefault("flask", flask_stub)
+flask_login_stub = types.ModuleType("flask_login")
+flask_login_stub.current_user = types.SimpleNamespace(is_authenticated=False, username="user")
+sys.modules.setdefault("flask_login", flask_login_stub)
+werkzeug_utils = types.ModuleType("werkzeug.utils")
+werkzeug_utils.secure_filename = lambda name: name
+sys.modules.setdefault("werkzeug", types.ModuleType("werkzeug"))
+sys.modules.setdefault("werkzeug.utils", werkzeug_utils)
+
+import utils  # noqa: E402
+from http_cache import file_etag  # noqa: E402
+
+
+def test_file_etag_uses_manifest(tmp_path):
+    utils.generate_files([{"RuleGUID": "r1", "RuleName": "R1", "Container": "c"}], str(tmp_path))
+    expected = hashlib.sha256((tmp_path / "c.mmd").read_bytes()).hexdigest()
+    assert file_etag(str(tmp_path), "c.mmd") == expected
+
+    utils.generate_files([{"RuleGUID": "r1", "RuleName": "R2", "Container": "c"}], str(tmp_path))
+    assert file_etag(str(tmp_path), "c.mmd") != expected
+    assert file_etag(str(tmp_path), "c.mmd") == hashlib.sha256((tmp_path / "c.mmd").read_bytes()).hexdigest()
+
+
+def test_file_etag_hashes_unrecorded_files(tmp_path):
+    path = tmp_path / "legacy.mmd"
+    path.write_text("flowchart TD")
+    assert file_etag(str(tmp_path), "legacy.mmd") == hashlib.sha256(b"flowchart TD").hexdigest()
+    path.write_text("flowchart LR")
+    os.utime(path, ns=(0, 10**9))
+    assert file_etag(str(tmp_path), "legacy.mmd") == hashlib.sha256(b"flowchart LR").hexdigest()
+    assert file_etag(str(tmp_path), "missing.mmd") is None
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+import types
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Stub modules required by utils
+flask_stub = types.ModuleType("flask")
+flask_stub.current_app = types.SimpleNamespace()
+sys.modules.setdefault("flask", flask_stub)
+flask_login_stub = types.ModuleType("flask_login")
+flask_login_stub.current_user = types.SimpleNamespace(is_authenticated=False, username="user")
+sys.modules.setdefault("flask_login", flask_login_stub)
+werkzeug_utils = types.ModuleType("werkzeug.utils")
+werkzeug_utils.secure_filename = lambda name: name
+sys.modules.setdefault("werkzeug", types.ModuleType("werkzeug"))
+sys.modules.setdefault("werkzeug.utils", werkzeug_utils)
+
+from ingest import IngestJournal, discover_files, ingest_files, journal_path_for  # noqa: E402
+
+# Pool workers are spawned and import the real Flask, not the stubs above.
+_WORKERS_IMPORT = (
+    subprocess.run(
+        [sys.executable, "-c", "import flask, flask_login, werkzeug"], capture_output=True
+    ).returncode
+    == 0
+)
+
+
+def _exports(tmp_path):
+    source = tmp_path / "exports"
+    source.mkdir()
+    for name in ("b_rules.json", "bad.json", "a_rules.json"):
+        path = source / name
+        if name == "bad.json":
+            path.write_text("<html></html>")
+        else:
+            path.write_text(json.dumps([{"RuleGUID": name, "RuleName": name, "Container": "c"}]))
+    (source / "notes.txt").write_text("skip me")
+    (source / "nested").mkdir()
+    return source
+
+
+def test_discover_files_lists_json_exports(tmp_path):
+    source = _exports(tmp_path)
+    names = [os.path.basename(p) for p in discover_files(source)]
+    assert names == ["a_rules.json", "b_rules.json", "bad.json"]
+
+
+def test_ingest_files_reports_every_file(tmp_path):
+    source = _exports(tmp_path)
+    for processes in (1, 2) if _WORKERS_IMPORT else (1,):
+        diagrams = tmp_path / f"diagrams{processes}"
+        outcomes = {
+            os.path.basename(path): (root, error)
+            for path, root, error in ingest_files(discover_files(source), diagrams, processes)
+        }
+        assert outcomes["a_rules.json"] == ("a_rules", None)
+        assert outcomes["b_rules.json"] == ("b_rules", None)
+        assert outcomes["bad.json"][0] is None
+        assert "Invalid JSON content" in outcomes["bad.json"][1]
+        assert (diagrams / "a_rules" / "c.mmd").is_file()
+
+
+def test_journal_skips_recorded_files_until_they_change(tmp_path):
+    source = _exports(tmp_path)
+    paths = discover_files(source)
+    journal = IngestJournal(journal_path_for(tmp_path / "data", source))
+    assert journal.pending(paths) == paths
+
+    journal.record(paths[0])
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('["torn')  # interrupted mid-write
+    assert journal.pending(paths) == paths[1:]
+
+    os.utime(paths[0], ns=(1, 1))
+    assert journal.pending(paths) == paths
+
+    journal.clear()
+    assert not os.path.exists(journal.path)
+    assert journal.completed() == {}
@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import types
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Stub modules required by utils
+flask_stub = types.ModuleType("flask")
+flask_stub.current_app = types.SimpleNamespace()
+sys.modules.setdefault("flask", flask_stub)
+flask_login_stub = types.ModuleType("flask_login")
+flask_login_stub.current_user = types.SimpleNamespace(is_authenticated=False, username="user")
+sys.modules.setdefault("flask_login", flask_login_stub)
+werkzeug_utils = types.ModuleType("werkzeug.utils")
+werkzeug_utils.secure_filename = lambda name: name
+sys.modules.setdefault("werkzeug", types.ModuleType("werkzeug"))
+sys.modules.setdefault("werkzeug.utils", werkzeug_utils)
+
+import jobs  # noqa: E402
+
+# Pool workers are spawned and import the real Flask, not the stubs above.
+_WORKERS_IMPORT = (
+    subprocess.run(
+        [sys.executable, "-c", "import flask, flask_login, werkzeug"], capture_output=True
+    ).returncode
+    == 0
+)
+
+
+def _items(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir(parents=True)
+    items = []
+    for name in ("b_rules.json", "bad.json", "a_rules.json"):
+        path = uploads / name
+        if name == "bad.json":
+            path.write_text("<html></html>")
+        else:
+            path.write_text(json.dumps([{"RuleGUID": name, "RuleName": name, "Container": "c"}]))
+        items.append({"name": name, "path": str(path), "diagrams_dir": str(tmp_path / "diagrams")})
+    return items
+
+
+def test_run_uploads_keeps_input_order(tmp_path, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(jobs, "record_upload", lambda root, name, user: recorded.append(root))
+
+    for processes in (1, 2) if _WORKERS_IMPORT else (1,):
+        recorded.clear()
+        outcomes = list(jobs.run_uploads(_items(tmp_path / str(processes)), processes))
+        assert [o[0] for o in outcomes] == ["b_rules.json", "bad.json", "a_rules.json"]
+        assert outcomes[0][1:] == ("b_rules", None)
+        assert outcomes[1][1] is None and "Invalid JSON content" in outcomes[1][2]
+        assert recorded == ["b_rules", "a_rules"]
+        assert (tmp_path / str(processes) / "diagrams" / "a_rules" / "c.mmd").is_file()
+
+
+def test_process_pool_spawns_workers_with_plain_logging():
+    with jobs.process_pool(1) as pool:
+        assert pool._mp_context.get_start_method() == "spawn"
+        if _WORKERS_IMPORT:
+            level = pool.submit(logging.getLogger().getEffectiveLevel).result()
+            assert level == logging.getLogger().getEffectiveLevel()
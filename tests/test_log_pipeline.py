@@ -0,0 +1,102 @@
+import logging
+import os
+import queue
+import sys
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from log_pipeline import (  # noqa: E402
+    POLICY_BLOCK,
+    BatchingQueueListener,
+    BatchStreamHandler,
+    BoundedQueueHandler,
+    LazyRepr,
+)
+
+
+class _Flushes(BatchStreamHandler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.flushes = 0
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+
+    def flush(self):
+        if not self.batching:
+            self.flushes += 1
+
+
+def _record(level, msg, *args):
+    return logging.LogRecord("tlp", level, __file__, 1, msg, args, None)
+
+
+def test_drop_policy_counts_and_reports_dropped_records():
+    q = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(q)
+    for i in range(5):
+        handler.handle(_record(logging.INFO, "info %d", i))
+    assert q.qsize() == 2
+    assert handler.dropped == 3
+
+    q.get_nowait()
+    q.get_nowait()
+    handler.handle(_record(logging.INFO, "after"))
+    messages = [q.get_nowait().getMessage() for _ in range(q.qsize())]
+    assert messages == ["after", "Log queue full: dropped 3 records"]
+    assert handler.dropped == 0
+
+
+def test_warnings_are_never_dropped():
+    q = queue.Queue(maxsize=1)
+    handler = BoundedQueueHandler(q)
+    handler.handle(_record(logging.INFO, "fills"))
+    handler.handle(_record(logging.INFO, "dropped"))
+    assert handler.dropped == 1
+    q.get_nowait()
+    handler.handle(_record(logging.WARNING, "kept"))
+    assert q.get_nowait().getMessage() == "kept"
+    # The pending report did not fit and waits for the next record.
+    assert handler.dropped == 1
+
+
+def test_unknown_policy_is_rejected():
+    try:
+        BoundedQueueHandler(queue.Queue(), "spill")
+    except ValueError:
+        pass
+    else:  # pragma: no cover
+        raise AssertionError("expected ValueError")
+    assert BoundedQueueHandler(queue.Queue(), POLICY_BLOCK).policy == POLICY_BLOCK
+
+
+def test_lazy_repr_is_formatted_on_the_listener_and_bounded():
+    calls = []
+
+    class Payload:
+        def __repr__(self):
+            calls.append(1)
+            return "x" * 10_000
+
+    q = queue.Queue()
+    handler = BoundedQueueHandler(q)
+    handler.handle(_record(logging.DEBUG, "payload %s", LazyRepr(Payload())))
+    assert calls == []
+    record = q.get_nowait()
+    assert len(record.getMessage()) < 300
+    assert calls == [1]
+    assert len(str(LazyRepr(list(range(1000))))) < 200
+
+
+def test_listener_writes_every_record_and_flushes_per_batch():
+    q = queue.Queue()
+    target = _Flushes()
+    for i in range(10):
+        q.put(_record(logging.INFO, "message %d", i))
+    listener = BatchingQueueListener(q, target, batch_size=4)
+    listener.start()
+    listener.stop()
+    assert target.records == [f"message {i}" for i in range(10)]
+    assert target.flushes <= 4
@@ -0,0 +1,83 @@
+import logging
+import os
+import sys
+from logging.handlers import RotatingFileHandler
+
+import pytest
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from log_reader import LOG_FORMAT, LogReader, parse_level  # noqa: E402
+
+
+def _logger(path, max_bytes=400):
+    logger = logging.getLogger(f"tlr.{id(path)}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=20)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def test_tail_spans_rotated_files_and_filters_levels(tmp_path):
+    path = tmp_path / "app.log"
+    logger, handler = _logger(path)
+    for i in range(30):
+        logger.info("message %d", i)
+    logger.error("failed\nTraceback line")
+    logger.info("last")
+    handler.close()
+
+    reader = LogReader(str(path))
+    assert len(reader.files()) > 2
+    assert reader.files()[-1] == str(path)
+
+    entries = reader.tail(3)["entries"]
+    assert [e.split("  ")[-1] for e in entries] == ["message 29", "failed\nTraceback line", "last"]
+    assert len(reader.tail(31)["entries"]) == 31
+
+    errors = reader.tail(10, parse_level("error"))["entries"]
+    assert len(errors) == 1 and errors[0].endswith("Traceback line")
+
+
+def test_read_from_cursor_across_rotation(tmp_path):
+    path = tmp_path / "app.log"
+    logger, handler = _logger(path)
+    logger.info("before")
+    cursor = LogReader(str(path)).tail(1)["cursor"]
+    for i in range(20):
+        logger.warning("after %d", i)
+    handler.close()
+
+    reader = LogReader(str(path))
+    seen = []
+    while True:
+        result = reader.read(cursor, max_bytes=150)
+        assert not result["reset"]
+        if not result["entries"]:
+            break
+        seen.extend(e.split("  ")[-1] for e in result["entries"])
+        cursor = result["cursor"]
+    assert seen == [f"after {i}" for i in range(20)]
+
+
+def test_read_keeps_partial_lines_for_the_next_call(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"2024-01-01 00:00:00,000  INFO      x  done\n2024-01-01 00:00:01,000  INF")
+    reader = LogReader(str(path))
+    result = reader.read(None)
+    assert result["reset"] and len(result["entries"]) == 1
+    assert reader.tail(5)["cursor"] == result["cursor"]
+
+
+def test_read_rejects_malformed_cursor_offsets(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"2024-01-01 00:00:00,000  INFO      x  done\n")
+    reader = LogReader(str(path))
+    inode = os.stat(path).st_ino
+    for cursor in (f"{inode}:-5", f"{inode}:abc", f"{inode}:", "123:1.5", f"{inode}: 4"):
+        with pytest.raises(ValueError):
+            reader.read(cursor)
+    assert reader.read(f"{inode}:0")["entries"]
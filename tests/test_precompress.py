@@ -0,0 +1,34 @@
+import gzip
+import os
+import sys
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from precompress import MIN_SIZE, compressed_variant, write_compressed  # noqa: E402
+
+
+def test_write_and_find_gzip_variant(tmp_path):
+    path = tmp_path / "big.mmd"
+    data = b"A --> B\n" * MIN_SIZE
+    path.write_bytes(data)
+    write_compressed(str(path), data)
+
+    variant = compressed_variant(str(path), "gzip")
+    assert variant == str(path) + ".gz"
+    assert gzip.decompress((tmp_path / "big.mmd.gz").read_bytes()) == data
+    assert compressed_variant(str(path), "deflate") is None
+
+
+def test_stale_variants_are_ignored_and_removed(tmp_path):
+    path = tmp_path / "small.mmd"
+    data = b"x" * MIN_SIZE
+    path.write_bytes(data)
+    write_compressed(str(path), data)
+
+    os.utime(path, ns=(0, os.stat(str(path) + ".gz").st_mtime_ns + 10**9))
+    assert compressed_variant(str(path), "gzip") is None
+
+    path.write_bytes(b"tiny")
+    write_compressed(str(path), b"tiny")
+    assert not os.path.exists(str(path) + ".gz")
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from response_cache import ResponseCache  # noqa: E402
+
+
+def _counting_builder(calls):
+    def build(path):
+        calls.append(path)
+        with open(path, "rb") as f:
+            return f.read().upper()
+    return build
+
+
+def test_hits_and_invalidation_on_rewrite(tmp_path):
+    path = tmp_path / "a.json"
+    path.write_text("first")
+    calls = []
+    cache = ResponseCache(max_bytes=1024)
+    build = _counting_builder(calls)
+
+    assert cache.get(str(path), build).body == b"FIRST"
+    assert cache.get(str(path), build).body == b"FIRST"
+    assert len(calls) == 1
+
+    path.write_text("second!")
+    assert cache.get(str(path), build).body == b"SECOND!"
+    assert len(calls) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 2, 1, 7)
+
+
+def test_lru_eviction_by_size(tmp_path):
+    paths = []
+    for name in "abc":
+        path = tmp_path / f"{name}.json"
+        path.write_text(name * 4)
+        paths.append(str(path))
+    cache = ResponseCache(max_bytes=8)
+    build = _counting_builder([])
+
+    cache.get(paths[0], build)
+    cache.get(paths[1], build)
+    cache.get(paths[0], build)  # a is now most recently used
+    cache.get(paths[2], build)
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] == 8
+    assert cache.invalidate(paths[1]) == 0
+    assert cache.invalidate(str(tmp_path)) == 2
+
+
+def test_errors_are_not_cached(tmp_path):
+    cache = ResponseCache(max_bytes=1024)
+    with pytest.raises(FileNotFoundError):
+        cache.get(str(tmp_path / "missing.json"), _counting_builder([]))
+    path = tmp_path / "bad.json"
+    path.write_text("x")
+
+    def fail(_path):
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        cache.get(str(path), fail)
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,114 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rule_graph import (
+    EDGE_ACTION,
+    EDGE_CHILD,
+    EDGE_SEQUENCE,
+    NODE_DECISION,
+    build_rule_graph,
+)
+
+
+def _rule(guid, name, actions=(), children=(), **extra):
+    return {'RuleGUID': guid, 'RuleName': name, 'Actions': list(actions), 'Children': list(children), **extra}
+
+
+def _sample():
+    leaf1 = _rule('c1', 'Copy value', FunctionName='Copy')
+    leaf2 = _rule('c2', 'Set flag')
+    leaf3 = _rule('c3', 'Log "it"', Attributes={'_Disabled': '1'})
+    sub = _rule('k1', 'Child')
+    root = _rule(
+        'r1',
+        'Is empty?',
+        actions=[
+            {'ActionName': 'Yes', 'ChildRules': [leaf1, leaf2]},
+            {'ActionName': '---', 'ChildRules': [leaf3]},
+        ],
+        children=[sub],
+        FunctionName='IsEmpty',
+    )
+    return root
+
+
+def test_nodes_are_numbered_in_preorder():
+    graph = build_rule_graph([_sample()])
+    assert graph.guids == ['r1', 'k1', 'c1', 'c2', 'c3']
+    assert graph.shapes[0] == NODE_DECISION
+    assert graph.node_dict(0) == {
+        'label': 'Is empty?<br>Function: IsEmpty', 'shape': 'decision', 'class': 'classDiamond'
+    }
+    assert graph.node_dict(3)['class'] == 'classSet'
+    assert graph.node_dict(4) == {'label': 'Log #quot;it#quot;', 'shape': 'rect', 'class': 'classDisabled'}
+
+
+def test_typed_edges():
+    graph = build_rule_graph([_sample()])
+    edges = [
+        (graph.guids[s], graph.guids[d], k)
+        for s, d, k in zip(graph.edge_src, graph.edge_dst, graph.edge_kind)
+    ]
+    assert edges == [
+        ('r1', 'k1', EDGE_CHILD),
+        ('r1', 'c1', EDGE_ACTION),
+        ('c1', 'c2', EDGE_SEQUENCE),
+        ('r1', 'c3', EDGE_ACTION),
+    ]
+    assert [graph.edge_str(e) for e in range(graph.edge_count)] == [
+        'r1 --> k1',
+        'r1 -->|Yes| c1',
+        'c1 --> c2',
+        'r1 -->|Continue| c3',
+    ]
+
+
+def test_flat_input_registers_each_rule_once():
+    root = _sample()
+    flat = [root, root['Children'][0]] + [
+        child for action in root['Actions'] for child in action['ChildRules']
+    ]
+    graph = build_rule_graph(flat)
+    assert graph.node_count == 5
+    assert graph.edge_count == 4
+
+
+def test_non_rule_entries_are_ignored():
+    root = _rule(
+        'r1',
+        'Root',
+        actions=[{'ActionName': 'Yes', 'ChildRules': ['junk', _rule('c1', 'Leaf'), None]}],
+        children=['junk', 7],
+    )
+    graph = build_rule_graph([root])
+    assert graph.guids == ['r1', 'c1']
+    assert [graph.edge_str(e) for e in range(graph.edge_count)] == ['r1 -->|Yes| c1']
+
+
+def test_to_mermaid():
+    graph = build_rule_graph([_sample()])
+    lines = graph.to_mermaid([0, 2], [1, 2]).splitlines()
+    assert lines == [
+        'flowchart TD',
+        '    r1{"Is empty?<br>Function: IsEmpty"}:::classDiamond',
+        '    c1["Copy value<br>Function: Copy"]:::classRect',
+        '    r1 -->|Yes| c1',
+        '    linkStyle 0 stroke:#000,stroke-width:2px;',
+        '    c1 --> c2',
+        '    linkStyle 1 stroke:#666,stroke-dasharray:3,stroke-width:2px;',
+        '',
+        '%% ActionNames: Yes',
+    ]
+
+
+def test_deep_trees_do_not_recurse():
+    root = current = _rule('n0', 'n0')
+    for i in range(1, 5000):
+        child = _rule(f'n{i}', f'n{i}')
+        current['Actions'] = [{'ActionName': 'Next', 'ChildRules': [child]}]
+        current = child
+    graph = build_rule_graph([root])
+    assert graph.node_count == 5000
+    assert graph.edge_count == 4999
@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rule_model import RuleAction, RuleNode, rule_to_json
+
+
+def test_mapping_protocol_and_key_order():
+    node = RuleNode([('RuleName', 'r'), ('RuleGUID', 'g')])
+    assert node.get('RuleName') == 'r'
+    assert node.get('ParentGUID') is None and node.get('Unknown', 1) == 1
+    assert 'RuleGUID' in node and 'ParentGUID' not in node
+    with pytest.raises(KeyError):
+        node['ParentGUID']
+    node['ParentGUID'] = None
+    assert list(node.keys()) == ['RuleName', 'RuleGUID', 'ParentGUID']
+    with pytest.raises(KeyError):
+        node['Unexpected'] = 1
+
+
+def test_layouts_are_shared():
+    a = RuleNode([('RuleGUID', 'a'), ('RuleName', 'x')])
+    b = RuleNode([('RuleGUID', 'b'), ('RuleName', 'y')])
+    assert a.keys() is b.keys()
+    assert not hasattr(a, '__dict__')
+
+
+def test_json_round_trip():
+    child = RuleNode([('RuleGUID', 'c')])
+    node = RuleNode([
+        ('RuleGUID', 'p'),
+        ('Actions', [RuleAction([('ActionName', 'Yes'), ('ChildRules', [child])])]),
+        ('Children', ()),
+    ])
+    assert json.loads(json.dumps(node, default=rule_to_json)) == {
+        'RuleGUID': 'p',
+        'Actions': [{'ActionName': 'Yes', 'ChildRules': [{'RuleGUID': 'c'}]}],
+        'Children': [],
+    }
+    with pytest.raises(TypeError):
+        rule_to_json(object())
@@ -0,0 +1,80 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rule_tree import walk_rules
+
+
+def _tree():
+    return [
+        {
+            'RuleGUID': 'a',
+            'Children': [{'RuleGUID': 'a1'}],
+            'Actions': [
+                {'ChildRules': [{'RuleGUID': 'a2'}, {'RuleGUID': 'a3'}]},
+                {'ChildRules': [{'RuleGUID': 'a4', 'Children': [{'RuleGUID': 'a5'}]}]},
+            ],
+        },
+        {'RuleGUID': 'b'},
+    ]
+
+
+def test_preorder_with_parent_links():
+    seen = []
+    walk_rules(_tree(), lambda f: seen.append(
+        (f.rule['RuleGUID'], f.parent.rule['RuleGUID'] if f.parent else None, f.action_index, f.depth)
+    ))
+    assert seen == [
+        ('a', None, None, 0),
+        ('a1', 'a', None, 1),
+        ('a2', 'a', 0, 1),
+        ('a3', 'a', 0, 1),
+        ('a4', 'a', 1, 1),
+        ('a5', 'a4', None, 2),
+        ('b', None, None, 0),
+    ]
+
+
+def test_skip_and_replace():
+    rules = _tree()
+    seen = []
+
+    def replace_a4(frame):
+        if frame.rule['RuleGUID'] == 'a4':
+            frame.rule = {'RuleGUID': 'x', 'Children': [{'RuleGUID': 'y'}]}
+
+    def skip_a(frame):
+        seen.append(frame.rule['RuleGUID'])
+        return frame.rule['RuleGUID'] != 'a1'
+
+    walk_rules(rules, replace_a4, skip_a)
+    assert rules[0]['Actions'][1]['ChildRules'][0]['RuleGUID'] == 'x'
+    assert seen == ['a', 'a1', 'a2', 'a3', 'x', 'y', 'b']
+
+
+def test_visitors_share_one_pass_and_state():
+    rules = _tree()
+    rules[0]['Actions'][1]['ChildRules'][0]['Off'] = True
+    disabled = []
+
+    def mark(frame):
+        frame.disabled = (frame.parent.disabled if frame.parent else False) or frame.rule.get('Off', False)
+
+    def collect(frame):
+        if frame.disabled:
+            disabled.append(frame.rule['RuleGUID'])
+
+    walk_rules(rules, mark, collect)
+    assert disabled == ['a4', 'a5']
+
+
+def test_deep_nesting():
+    root = node = {'RuleGUID': 'n0'}
+    for i in range(1, 20000):
+        child = {'RuleGUID': f'n{i}'}
+        node['Children'] = [child]
+        node = child
+    count = []
+    walk_rules([root], lambda f: count.append(f.depth))
+    assert len(count) == 20000 and count[-1] == 19999
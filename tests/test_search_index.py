@@ -0,0 +1,203 @@
+import base64
+import json
+import os
+import sqlite3
+import sys
+import types
+
+# Ensure project root is on the import path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Stub modules required by utils
+flask_stub = types.ModuleType("flask")
+flask_stub.current_app = types.SimpleNamespace()
+sys.modules.setdefault("flask", flask_stub)
+flask_login_stub = types.ModuleType("flask_login")
+flask_login_stub.current_user = types.SimpleNamespace(is_authenticated=False, username="user")
+sys.modules.setdefault("flask_login", flask_login_stub)
+werkzeug_utils = types.ModuleType("werkzeug.utils")
+werkzeug_utils.secure_filename = lambda name: name
+sys.modules.setdefault("werkzeug", types.ModuleType("werkzeug"))
+sys.modules.setdefault("werkzeug.utils", werkzeug_utils)
+
+from search_index import SearchIndex, tokenize  # noqa: E402
+
+
+def _build(tmp_path):
+    diagrams = tmp_path / "diagrams"
+    (diagrams / "Function_KFI").mkdir(parents=True)
+    (diagrams / "Function_KFI" / "KFI.mmd").write_text(
+        'flowchart TD\n    a1["Has the field been keyed?<br>Function: _IKFI"]'
+    )
+    (diagrams / "Lookup_Dental").mkdir()
+    (diagrams / "Lookup_Dental" / "Dental_flowchart.mmd").write_text(
+        'flowchart TD\n    b2["Clear temp fields<br>Function: DeleteLines"]'
+    )
+    index = SearchIndex(diagrams, tmp_path / "diagrams.search.sqlite3")
+    index.sync()
+    return diagrams, index
+
+
+def test_tokenize_records_first_offsets():
+    assert tokenize("ab cd ab") == {"ab": 0, "cd": 3}
+
+
+def test_search_substring_filters_and_snippets(tmp_path):
+    _, index = _build(tmp_path)
+
+    total, results = index.search("keyed")
+    assert total == 1
+    assert results[0]["catalog"] == "Function_KFI"
+    assert "keyed" in results[0]["match_snippet"]
+
+    total, results = index.search("lete")  # substring inside a token
+    assert total == 1 and results[0]["filename"] == "Dental_flowchart.mmd"
+
+    assert index.search("function field")[0] == 2
+    assert index.search("field", catalog="lookup")[0] == 1
+    assert index.search("", diagram_type="sequence")[0] == 1
+    assert index.search("", page=2, per_page=1)[1][0]["catalog"] == "Lookup_Dental"
+    assert index.search("nomatch") == (0, [])
+
+
+def test_sync_and_reindex_root(tmp_path):
+    diagrams, index = _build(tmp_path)
+    assert index.sync() == 0
+
+    (diagrams / "Function_KFI" / "KFI.mmd").write_text("flowchart TD\n    c3[Renamed]")
+    assert index.index_root("Function_KFI") == 1
+    assert index.search("keyed")[0] == 0
+    assert index.search("renamed")[0] == 1
+
+    (diagrams / "Lookup_Dental" / "Dental_flowchart.mmd").unlink()
+    index.sync()
+    assert index.search("clear")[0] == 0
+
+
+def test_iter_search_streams_all_results(tmp_path):
+    _, index = _build(tmp_path)
+
+    results = index.iter_search("function")
+    first = next(results)
+    assert first["catalog"] == "Function_KFI" and "function" in first["match_snippet"]
+    assert [r["catalog"] for r in results] == ["Lookup_Dental"]
+    assert [r["filename"] for r in index.iter_search("")] == ["KFI.mmd", "Dental_flowchart.mmd"]
+    assert list(index.iter_search("nomatch")) == []
+
+
+def test_search_page_sorts_and_continues_from_cursor(tmp_path):
+    diagrams, index = _build(tmp_path)
+    (diagrams / "Function_KFI" / "Big.mmd").write_text("flowchart TD\n" + "    x[Function: big]\n" * 50)
+    os.utime(diagrams / "Function_KFI" / "KFI.mmd", (1, 1))
+    index.sync()
+
+    first = index.search_page("function", sort="-size", limit=2)
+    assert first["total"] == 3 and first["sort"] == "-size"
+    assert [r["filename"] for r in first["results"]][0] == "Big.mmd"
+    rest = index.search_page("function", sort="-size", limit=2, cursor=first["next"])
+    assert rest["next"] is None and len(rest["results"]) == 1
+    sizes = [r["size"] for r in first["results"] + rest["results"]]
+    assert sizes == sorted(sizes, reverse=True)
+
+    oldest = index.search_page("", sort="last_modified", limit=1)
+    assert oldest["results"][0]["filename"] == "KFI.mmd"
+
+    # A filename hit ranks before matches in the diagram text.
+    ranked = index.search_page("flowchart", sort="relevance")["results"]
+    assert ranked[0]["filename"] == "Dental_flowchart.mmd"
+    assert index.search_page("", sort="relevance")["sort"] == "name"
+
+    try:
+        index.search_page("function", sort="size", cursor=first["next"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("cursor of another sort accepted")
+
+
+def test_relevance_ranks_rule_fields_with_bm25(tmp_path):
+    diagrams, index = _build(tmp_path)
+    hierarchy = {
+        "rules": [
+            {
+                "RuleGUID": "g1",
+                "RuleName": "Clear temp fields",
+                "FunctionName": "DeleteLines",
+                "Container": "Dental_flowchart",
+                "Attributes": {"LinesFrom": "Claim", "_ParamList0": "{18,28}"},
+            }
+        ]
+    }
+    (diagrams / "Lookup_Dental" / "Dental_flowchart.json").write_text(json.dumps(hierarchy))
+    (diagrams / "Function_KFI" / "Other.mmd").write_text("flowchart TD\n    z[deletelines notes]")
+    index.index_root("Lookup_Dental")
+    index.sync()
+
+    # Attribute keys, values and parameter lists become searchable.
+    assert index.search("linesfrom claim")[0] == 1
+    assert index.search("28")[1][0]["filename"] == "Dental_flowchart.mmd"
+
+    # The FunctionName match outranks the plain text match.
+    ranked = index.search_page("deletelines", sort="relevance")
+    assert [r["filename"] for r in ranked["results"]] == ["Dental_flowchart.mmd", "Other.mmd"]
+    first = index.search_page("deletelines", sort="relevance", limit=1)
+    rest = index.search_page("deletelines", sort="relevance", limit=1, cursor=first["next"])
+    assert rest["results"][0]["filename"] == "Other.mmd" and rest["next"] is None
+    worst = index.search_page("deletelines", sort="-relevance", limit=1)
+    assert worst["results"][0]["filename"] == "Other.mmd"
+
+
+def test_schema_upgrade_rebuilds_index(tmp_path):
+    diagrams, index = _build(tmp_path)
+    with sqlite3.connect(index.db_path) as conn:
+        conn.execute("PRAGMA user_version = 1")
+    reopened = SearchIndex(diagrams, index.db_path)
+    assert reopened.search("keyed")[0] == 0
+    assert reopened.sync() == 2
+    assert reopened.search("keyed")[0] == 1
+
+
+def test_iter_search_follows_sort(tmp_path):
+    _, index = _build(tmp_path)
+
+    ranked = [r["filename"] for r in index.iter_search("flowchart", sort="relevance")]
+    page = index.search_page("flowchart", sort="relevance")["results"]
+    assert ranked == [r["filename"] for r in page] == ["Dental_flowchart.mmd", "KFI.mmd"]
+    by_size = [r["size"] for r in index.iter_search("", sort="-size")]
+    assert by_size == sorted(by_size, reverse=True)
+
+
+def test_search_page_rejects_cursor_fields_of_the_wrong_type(tmp_path):
+    _, index = _build(tmp_path)
+
+    def cursor(*values):
+        raw = json.dumps(list(values)).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    assert index.search_page("function", "", "", "relevance", 1, cursor("relevance", -1.0, "a", "b"))
+    for sort, bad in (
+        ("relevance", cursor("relevance", "x", "a", "b")),
+        ("size", cursor("size", "big", "a", "b")),
+        ("-last_modified", cursor("-last_modified", True, "a", "b")),
+        ("name", cursor("name", "a", 3)),
+    ):
+        try:
+            index.search_page("function", sort=sort, cursor=bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{sort} accepted {bad}")
+
+
+def test_snippet_skips_filename_match_and_terms_are_shared(tmp_path):
+    diagrams, index = _build(tmp_path)
+    (diagrams / "Function_KFI" / "Detail_Lines.mmd").write_text(
+        "flowchart TD\n" + "    n[padding]\n" * 40 + '    d["Copy detail lines"]'
+    )
+    index.sync()
+
+    total, results = index.search("detail")
+    assert total == 1 and "copy detail lines" in results[0]["match_snippet"]
+
+    with sqlite3.connect(index.db_path) as conn:
+        terms = [row[0] for row in conn.execute("SELECT term FROM search_terms")]
+    assert len(terms) == len(set(terms)) and "function" in terms
@@ -75,3 +75,83 @@ def test_get_dynamic_groups(tmp_path):
     assert entry["root"] == "A_first_rule"
     assert entry["diagram"] == "diagram.mmd"
     assert entry["hierarchy"] == "hierarchy.json"
+
+
+def test_load_and_sanitize_json_streams_rules(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "_JSON_SNIFF_BYTES", 8)
+    monkeypatch.setattr(utils, "_JSON_CHUNK_SIZE", 16)
+    rules = [
+        {
+            "RuleName": f"Rule {i}",
+            "Unexpected": "dropped",
+            "Attributes": {"Value": '"quoted"'},
+            "Actions": [{"ActionName": "go", "ChildRules": [{"RuleName": "child"}]}],
+        }
+        for i in range(5)
+    ]
+    f = tmp_path / "rules.json"
+    f.write_text(json.dumps({"meta": {"v": [1, 2]}, "rules": rules}, indent=2))
+    loaded = utils.load_and_sanitize_json(f)
+    assert [r["RuleName"] for r in loaded] == [f"Rule {i}" for i in range(5)]
+    assert "Unexpected" not in loaded[0]
+    assert loaded[0]["Attributes"] == {"Value": "quoted"}
+    assert loaded[0]["Actions"][0]["ChildRules"][0]["RuleGUID"]
+
+
+def test_load_and_sanitize_json_rejects_bad_input(tmp_path):
+    cases = [
+        "  <html></html>",
+        '{"rules": 5}',
+        "[{}, ",
+        '{"other": []}',
+        "[{}] []",
+        '[{}] x',
+        '{"rules": [{}]} {}',
+        '{"rules": [{}], "other": 1,}',
+        '{"rules": [{}] "other": 1}',
+        '{"other": 1 "rules": [{}]}',
+        '{1: 2, "rules": [{}]}',
+        '{"rules": [{}], 1: 2}',
+        "[{} {}]",
+    ]
+    for i, text in enumerate(cases):
+        f = tmp_path / f"bad{i}.json"
+        f.write_text(text)
+        assert utils.load_and_sanitize_json(f) is None
+        assert utils.load_rule_nodes(f) is None
+
+
+def test_load_and_sanitize_json_accepts_rules_wrapper(tmp_path):
+    f = tmp_path / "wrapped.json"
+    f.write_text('{"version": 2, "rules": [{"RuleGUID": "g1"}], "meta": {"a": [1]}}\n')
+    assert [r["RuleGUID"] for r in utils.load_and_sanitize_json(f)] == ["g1"]
+
+
+def test_load_rule_nodes_matches_dict_loader(tmp_path):
+    from rule_model import EMPTY, RuleNode, rule_to_json
+
+    rules = [
+        {
+            "Container": "C",
+            "RuleGUID": f"g{i}",
+            "RuleName": f"Rule {i}",
+            "RuleID": None,
+            "Children": [],
+            "Actions": [
+                {"ActionName": "go", "ActionValue": "1", "ChildRules": [{"RuleGUID": f"c{i}", "RuleName": "child"}]},
+                {"ActionName": "stop", "ChildRules": []},
+            ],
+            "Attributes": {"Value": '"quoted"'},
+        }
+        for i in range(3)
+    ]
+    f = tmp_path / "rules.json"
+    f.write_text(json.dumps(rules))
+    nodes = utils.load_rule_nodes(f)
+    assert all(isinstance(n, RuleNode) for n in nodes)
+    assert nodes[0]["Children"] is EMPTY and nodes[1]["Actions"][1]["ChildRules"] is EMPTY
+    expected = utils.load_and_sanitize_json(f)
+    assert json.dumps(nodes, default=rule_to_json) == json.dumps(expected)
+    assert json.dumps(utils.propagate_and_flatten_rules(nodes), default=rule_to_json) == json.dumps(
+        utils.propagate_and_flatten_rules(expected)
+    )
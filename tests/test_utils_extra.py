@@ -16,6 +16,7 @@ sys.modules.setdefault('werkzeug.utils', werkzeug_utils_stub)
 
 import utils
 from utils import generate_mermaid_code
+from activity_store import get_activity_store
 from config import Config
 
 
@@ -46,9 +47,9 @@ def test_log_activity(tmp_path, monkeypatch):
     monkeypatch.setattr(Config, 'ACTIVITY_LOG', tmp_path / 'activity_log.json')
     monkeypatch.setattr(Config, 'FEEDBACK_FILE', tmp_path / 'feedback.json')
     utils.log_activity('test', rule_id='r1', user='u1', details='demo')
-    data = json.loads((Config.ACTIVITY_LOG).read_text())
-    assert data['activity_log'][-1]['action'] == 'test'
-    assert data['rules']['r1']['modified_by'] == 'u1'
+    store = get_activity_store()
+    assert store.entries()[-1]['action'] == 'test'
+    assert store.rules()['r1']['modified_by'] == 'u1'
 
 
 def test_generate_mermaid_code():
@@ -2,6 +2,7 @@ import os
 import sys
 import types
 import json
+import hashlib
 from pathlib import Path
 
 # Ensure project root is on the import path
@@ -66,5 +67,77 @@ def test_generate_files(tmp_path):
     infos = utils.generate_files(data, str(tmp_path))
     assert infos and infos[0].filename == "group.mmd"
     mmd_content = (tmp_path / "group.mmd").read_text().strip()
-    assert mmd_content == "graph TD"
+    assert mmd_content.splitlines() == ["flowchart TD", '    r1["R1"]:::classRect']
     assert (tmp_path / "group.json").is_file()
+    etags = utils.generation_etags(str(tmp_path))
+    assert etags["group.mmd"] == hashlib.sha256((tmp_path / "group.mmd").read_bytes()).hexdigest()
+    assert etags["group.json"] == hashlib.sha256((tmp_path / "group.json").read_bytes()).hexdigest()
+
+
+def test_generate_files_skips_unchanged_containers(tmp_path):
+    data = [
+        {"RuleGUID": "r1", "RuleName": "R1", "Container": "a"},
+        {"RuleGUID": "r2", "RuleName": "R2", "Container": "b"},
+    ]
+    first = utils.generate_files(json.loads(json.dumps(data)), str(tmp_path))
+    assert (tmp_path / utils.GENERATION_MANIFEST).is_file()
+    (tmp_path / "a.mmd").write_text("sentinel")
+    (tmp_path / "b.mmd").write_text("sentinel")
+
+    again = utils.generate_files(json.loads(json.dumps(data)), str(tmp_path))
+    assert [(i.filename, i.created) for i in again] == [(i.filename, i.created) for i in first]
+    assert (tmp_path / "a.mmd").read_text() == "sentinel"
+
+    data[1]["RuleName"] = "R2 renamed"
+    utils.generate_files(json.loads(json.dumps(data)), str(tmp_path))
+    assert (tmp_path / "a.mmd").read_text() == "sentinel"
+    assert (tmp_path / "b.mmd").read_text() != "sentinel"
+    assert json.loads((tmp_path / "b.json").read_text())["rules"][0]["RuleName"] == "R2 renamed"
+
+
+def test_generate_files_cache_hits_for_exports_without_guids(tmp_path):
+    export = tmp_path / "export.json"
+    export.write_text(json.dumps([
+        {"RuleName": "R1", "Container": "a", "Actions": [
+            {"ActionName": "go", "ChildRules": [
+                {"RuleName": "child"},
+                {"RuleName": "child", "RuleGUID": ""},
+            ]},
+        ]},
+        {"RuleName": "R2", "Container": "b", "RuleGUID": None},
+    ]))
+    out = tmp_path / "out"
+    first = utils.generate_files(utils.load_rule_nodes(export), str(out))
+    diagrams = [(out / name).read_text() for name in ("a.mmd", "b.mmd")]
+    utils.generate_files(utils.load_and_sanitize_json(export), str(tmp_path / "other"))
+    assert [(tmp_path / "other" / name).read_text() for name in ("a.mmd", "b.mmd")] == diagrams
+    (out / "a.mmd").write_text("sentinel")
+
+    again = utils.generate_files(utils.load_rule_nodes(export), str(out))
+    assert [(i.filename, i.created) for i in again] == [(i.filename, i.created) for i in first]
+    assert (out / "a.mmd").read_text() == "sentinel"
+    flat = utils.propagate_and_flatten_rules(utils.load_and_sanitize_json(export))
+    guids = [r["RuleGUID"] for r in flat]
+    assert len(set(guids)) == 4
+
+
+def test_flatten_rules_derives_missing_guids():
+    def export():
+        children = [{"RuleName": "a"}, {"RuleName": "b", "RuleGUID": None}]
+        return [{"RuleName": "R", "Children": children}]
+
+    flat = utils.flatten_rules(export())
+    assert [r["RuleName"] for r in flat] == ["R", "a", "b"]
+    assert [r["RuleGUID"] for r in flat] == [r["RuleGUID"] for r in utils.flatten_rules(export())]
+    assert flat[1]["ParentGUID"] == flat[0]["RuleGUID"]
+
+
+def test_generate_files_skips_non_rule_children(tmp_path):
+    export = tmp_path / "export.json"
+    export.write_text(json.dumps([
+        {"RuleGUID": "r1", "RuleName": "R1", "Container": "a", "Children": ["junk"],
+         "Actions": [{"ActionName": "go", "ChildRules": [1, {"RuleGUID": "c1"}]}]},
+    ]))
+    for i, loader in enumerate((utils.load_rule_nodes, utils.load_and_sanitize_json)):
+        utils.generate_files(loader(export), str(tmp_path / str(i)))
+        assert "r1 -->|go| c1" in (tmp_path / str(i) / "a.mmd").read_text()
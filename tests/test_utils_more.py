@@ -57,3 +57,18 @@ def test_validate_and_build_hierarchy():
     child = root["children"][0]
     assert child["RuleGUID"] == "c1"
     assert child["RuleName"] == "Child"
+
+
+def test_tree_utilities_handle_deep_nesting():
+    root = node = {"RuleName": "n0", "Attributes": {"_Disabled": "1"}}
+    for i in range(1, 5000):
+        child = {"RuleName": f"n{i}", "Unexpected": True}
+        node["Actions"] = [{"ActionName": "Next", "ChildRules": [child]}]
+        node = child
+    cleaned = utils.sanitize_rule(root)
+    utils.add_missing_guids_if_needed([cleaned])
+    flat = utils.propagate_and_flatten_rules([cleaned])
+    assert len(flat) == 5000
+    assert all(r["Attributes"]["_Disabled"] == "1" for r in flat)
+    assert "Unexpected" not in flat[-1] and "Unexpected" in node
+    assert flat[-1]["ParentGUID"] == flat[-2]["RuleGUID"]
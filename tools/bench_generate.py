@@ -0,0 +1,79 @@
+"""Benchmark ``utils.generate_files`` on synthetic multi-container exports.
+
+Each export holds ``rules`` rules spread over one container per
+``--rules-per-container`` rules, shaped like real exports: decision rules
+whose "Yes"/"No" actions run short chains of child rules.  A linear
+generator keeps the per-rule time roughly constant as the export grows.
+
+Usage::
+
+    python tools/bench_generate.py [--sizes 2000,8000,32000] [--rules-per-container 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import generate_files  # noqa: E402
+
+
+def synthetic_export(rule_count: int, rules_per_container: int) -> list[dict]:
+    """Return a nested export with roughly ``rule_count`` rules."""
+    rules = []
+    made = 0
+    while made < rule_count:
+        container = f"Container_{made // rules_per_container}"
+        children = [
+            {
+                "RuleGUID": f"rule-{made}-{i}",
+                "RuleName": f"Step {i}",
+                "FunctionName": "Formatf",
+                "Container": container,
+                "Attributes": {"AttrName": f"Attr{i}"},
+            }
+            for i in range(8)
+        ]
+        rules.append(
+            {
+                "RuleGUID": f"rule-{made}",
+                "RuleName": f"Check {made}",
+                "FunctionName": "HasRegExpr",
+                "Container": container,
+                "Attributes": {"RegularExpression": "^[0-9]+$"},
+                "Actions": [
+                    {"ActionName": "Yes", "ChildRules": children[:4]},
+                    {"ActionName": "No", "ChildRules": children[4:]},
+                ],
+            }
+        )
+        made += 1 + len(children)
+    return rules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="2000,8000,32000")
+    parser.add_argument("--rules-per-container", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rules':>8} {'containers':>10} {'best s':>8} {'us/rule':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        best = float("inf")
+        for _ in range(args.repeat):
+            export = synthetic_export(size, args.rules_per_container)
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                infos = generate_files(export, os.path.join(tmp, "bench"))
+                best = min(best, time.perf_counter() - start)
+        print(f"{size:>8} {len(infos):>10} {best:>8.3f} {best / size * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
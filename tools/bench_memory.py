@@ -0,0 +1,63 @@
+"""Measure memory held by loaded rule trees: dicts versus ``RuleNode``.
+
+Loads every export in the upload corpus with the dict-based loader and with
+the compact loader used by the upload pipeline, flattens the result, and
+reports the memory still allocated (tracemalloc) while the trees are alive.
+
+Usage::
+
+    python tools/bench_memory.py [--uploads uploads]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import (  # noqa: E402
+    load_and_sanitize_json,
+    load_rule_nodes,
+    propagate_and_flatten_rules,
+)
+
+
+def measure(loader, paths: list[str]) -> tuple[float, int]:
+    gc.collect()
+    tracemalloc.start()
+    held = []
+    count = 0
+    for path in paths:
+        rules = loader(path)
+        if rules:
+            count += len(propagate_and_flatten_rules(rules))
+            held.append(rules)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return current / (1024 * 1024), count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", default=os.path.join(os.path.dirname(__file__), "..", "uploads"))
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.uploads, name)
+        for name in os.listdir(args.uploads)
+        if name.endswith(".json")
+    )
+    size = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+    print(f"{len(paths)} files, {size:.1f} MB on disk")
+    for label, loader in (("dict", load_and_sanitize_json), ("RuleNode", load_rule_nodes)):
+        held, count = measure(loader, paths)
+        print(f"{label:>9}: {held:7.1f} MB held for {count} rules ({held * 1024 * 1024 / count:.0f} B/rule)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Measure cold start-up time of the application in fresh interpreters.
+
+Each run starts a new Python process against empty temporary data, log,
+upload and diagram directories and reports, in milliseconds:
+
+* ``import``   — ``import app`` alone (should build nothing);
+* ``create``   — ``app.create_app()`` after the import;
+* ``total``    — interpreter start to a ready application;
+* ``indexes``  — first use of the catalog and search indexes, which each
+  process builds lazily (not part of ``total``).
+
+Usage::
+
+    python tools/bench_startup.py [--runs 5] [--importtime] [--diagrams DIR]
+
+``--diagrams`` points the application at an existing diagrams folder so
+``indexes`` includes scanning it; index files are still written to a
+temporary directory.
+
+``--importtime`` additionally prints the slowest imports of one run,
+from ``python -X importtime``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+from catalog_index import get_catalog_index
+from search_index import get_search_index
+with application.app_context():
+    get_catalog_index()
+    get_search_index()
+indexed = time.perf_counter()
+timings = {"import": imported - start, "create": created - imported, "indexes": indexed - created}
+print("BENCH", json.dumps(timings), file=sys.stderr)
+"""
+
+
+def _env(workdir: str, diagrams: str | None = None) -> dict[str, str]:
+    env = dict(os.environ)
+    diagrams = os.path.abspath(diagrams) if diagrams else os.path.join(workdir, "diagrams")
+    env.update(
+        PYTHONPATH=ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        DATA_DIR=os.path.join(workdir, "data"),
+        LOG_DIR=os.path.join(workdir, "logs"),
+        UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+        DIAGRAMS_FOLDER=diagrams,
+        SEARCH_INDEX_PATH=os.path.join(workdir, "search.sqlite3"),
+        DATABASE_URL="sqlite:///" + os.path.join(workdir, "rules.db"),
+    )
+    return env
+
+
+def run_once(
+    extra_args: list[str] | None = None, diagrams: str | None = None
+) -> tuple[dict[str, float], str]:
+    """Return the timings of one cold start and its stderr."""
+    with tempfile.TemporaryDirectory() as workdir:
+        args = [sys.executable, *(extra_args or []), "-c", _PROBE]
+        start = time.perf_counter()
+        proc = subprocess.run(
+            args,
+            cwd=workdir,
+            env=_env(workdir, diagrams),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        elapsed = time.perf_counter() - start
+    # The application logs to stdout; the probe reports on stderr.
+    line = next(l for l in proc.stderr.splitlines() if l.startswith("BENCH "))
+    timings = json.loads(line[len("BENCH "):])
+    timings["total"] = elapsed - timings["indexes"]
+    return {k: v * 1000 for k, v in timings.items()}, proc.stderr
+
+
+def slowest_imports(stderr: str, count: int = 15) -> list[tuple[int, str]]:
+    """Return the ``count`` largest cumulative import times (µs) in ``stderr``."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--diagrams", help="existing diagrams folder to index")
+    args = parser.parse_args()
+
+    samples = [run_once(diagrams=args.diagrams)[0] for _ in range(args.runs)]
+    for key in ("import", "create", "total", "indexes"):
+        values = [s[key] for s in samples]
+        print(
+            f"{key:>7}: median {statistics.median(values):7.1f} ms"
+            f"  min {min(values):7.1f} ms  max {max(values):7.1f} ms"
+        )
+
+    if args.importtime:
+        _, stderr = run_once(["-X", "importtime"], args.diagrams)
+        print("\nslowest imports (cumulative):")
+        for micros, name in slowest_imports(stderr):
+            print(f"  {micros / 1000:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
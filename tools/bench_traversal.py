@@ -0,0 +1,79 @@
+"""Benchmark rule-tree preparation on the largest uploaded exports.
+
+Compares running sanitize, GUID assignment, disabled propagation and
+flattening as four separate walks with the fused walks used by the upload
+pipeline (sanitize + GUIDs while loading, propagate + flatten while
+generating).
+
+Usage::
+
+    python tools/bench_traversal.py [--uploads uploads] [--top 5] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rule_tree import walk_rules  # noqa: E402
+from utils import (  # noqa: E402
+    _guid_visitor,
+    _sanitize_visitor,
+    add_missing_guids_if_needed,
+    flatten_rules,
+    propagate_and_flatten_rules,
+    propagate_disabled_rules,
+    sanitize_rule,
+)
+
+
+def separate(raw: list) -> int:
+    rules = [sanitize_rule(rule) for rule in raw]
+    add_missing_guids_if_needed(rules)
+    propagate_disabled_rules(rules)
+    return len(flatten_rules(rules))
+
+
+def fused(raw: list) -> int:
+    rules = list(raw)
+    walk_rules(rules, _sanitize_visitor, _guid_visitor())
+    return len(propagate_and_flatten_rules(rules))
+
+
+def best_of(func, path: str, repeat: int) -> tuple[float, int]:
+    best, count = float("inf"), 0
+    for _ in range(repeat):
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        start = time.perf_counter()
+        count = func(raw)
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", default=os.path.join(os.path.dirname(__file__), "..", "uploads"))
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(
+        (os.path.join(args.uploads, name) for name in os.listdir(args.uploads) if name.endswith(".json")),
+        key=os.path.getsize,
+        reverse=True,
+    )[: args.top]
+    print(f"{'file':<48} {'rules':>7} {'separate ms':>12} {'fused ms':>9}")
+    for path in paths:
+        sep, count = best_of(separate, path, args.repeat)
+        fus, _ = best_of(fused, path, args.repeat)
+        print(f"{os.path.basename(path)[:48]:<48} {count:>7} {sep * 1000:>12.1f} {fus * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,12 @@ from __future__ import annotations
 
 import os
 import re
+import sys
 import json
+import hashlib
 import uuid
 import logging
+from array import array
 from pathlib import Path
 from dataclasses import dataclass, asdict
 import dataclasses
@@ -18,7 +21,13 @@ from werkzeug.utils import secure_filename
 from flask import current_app
 from flask_login import current_user
 
+from activity_store import get_activity_store
 from config import Config
+from hierarchy_index import HierarchyIndex, index_path_for
+from precompress import write_compressed
+from rule_graph import RuleGraph, build_rule_graph
+from rule_model import EMPTY, RuleAction, RuleNode, intern_value, rule_to_json
+from rule_tree import RuleFrame, RuleVisitor, walk_rules
 
 LOGGER = logging.getLogger(__name__)
 
@@ -102,67 +111,304 @@ def remove_all_quotes(obj: Any) -> Any:
     return obj
 
 
+# Namespace of the GUIDs derived for rules exported without one.
+_RULE_GUID_NAMESPACE = uuid.UUID("3f0c6a52-8d7e-4b1a-9c2f-5e6d7a8b9c0d")
+
+
+def _guid_visitor() -> RuleVisitor:
+    """Return a visitor giving rules with a missing or empty ``RuleGUID`` a derived one.
+
+    The GUID is a ``uuid5`` of the rule's path: its parent's GUID, the
+    parent action and its position among the GUID-less rules there.  The
+    same export therefore always gets the same GUIDs, keeping generation
+    cache keys stable.  Use one visitor per export so positions are counted
+    across all of its top-level rules.
+    """
+    positions: Dict[tuple, int] = {}
+
+    def visit(frame: RuleFrame) -> None:
+        rule = frame.rule
+        if rule.get("RuleGUID"):
+            return
+        parent = frame.parent
+        slot = (parent.rule["RuleGUID"] if parent else None, frame.action_index)
+        position = positions.get(slot, 0)
+        positions[slot] = position + 1
+        path = f"{slot[0]}/{slot[1]}/{position}"
+        rule["RuleGUID"] = str(uuid.uuid5(_RULE_GUID_NAMESPACE, path))
+
+    return visit
+
+
 def add_missing_guids_if_needed(rules: Iterable[Dict[str, Any]]) -> None:
-    """Recursively add GUIDs to rules if they are missing."""
-    def recurse(rule):
-        if "RuleGUID" not in rule:
-            rule["RuleGUID"] = str(uuid.uuid4())
-        for child in rule.get("Children", []):
-            recurse(child)
-        for action in rule.get("Actions", []):
-            for child in action.get("ChildRules", []):
-                recurse(child)
+    """Add GUIDs to rules (and their descendants) that are missing one."""
+    walk_rules(list(rules), _guid_visitor())
+
+
+ALLOWED_RULE_FIELDS = frozenset(
+    {
+        "RuleGUID",
+        "RuleName",
+        "Children",
+        "Actions",
+        "Attributes",
+        "ParentGUID",
+        "ParentActionIndex",
+        "Container",
+        "FunctionName",
+        "RootName",
+    }
+)
 
-    for r in rules:
-        recurse(r)
 
+def _sanitize_visitor(frame: RuleFrame) -> None:
+    """Visitor replacing a rule by a copy restricted to :data:`ALLOWED_RULE_FIELDS`.
 
-def load_and_sanitize_json(filepath: str | Path) -> list[Dict[str, Any]] | None:
-    """Load JSON from ``filepath`` and sanitize unexpected fields."""
+    Child lists are copied too, so the descendants written back by the walk
+    never touch the input tree.
+    """
+    cleaned = {k: v for k, v in frame.rule.items() if k in ALLOWED_RULE_FIELDS}
+    if "Attributes" in cleaned and isinstance(cleaned["Attributes"], dict):
+        cleaned["Attributes"] = remove_all_quotes(cleaned["Attributes"])
+    if "Children" in cleaned and isinstance(cleaned["Children"], list):
+        cleaned["Children"] = list(cleaned["Children"])
+    if "Actions" in cleaned and isinstance(cleaned["Actions"], list):
+        actions = []
+        for action in cleaned["Actions"]:
+            if not isinstance(action, dict):
+                continue
+            a = {"ActionName": action.get("ActionName")}
+            if "ChildRules" in action and isinstance(action["ChildRules"], list):
+                a["ChildRules"] = list(action["ChildRules"])
+            actions.append(a)
+        cleaned["Actions"] = actions
+    frame.rule = cleaned
+
+
+def _rule_node_visitor(frame: RuleFrame) -> None:
+    """Visitor replacing a raw rule by its sanitized :class:`RuleNode`.
+
+    Equivalent to :func:`_sanitize_visitor` but with slot storage, interned
+    strings and the shared :data:`rule_model.EMPTY` for empty child lists.
+    """
+    items = []
+    for key, value in frame.rule.items():
+        if key not in ALLOWED_RULE_FIELDS:
+            continue
+        if key == "Attributes" and isinstance(value, dict):
+            value = {sys.intern(k): v for k, v in remove_all_quotes(value).items()}
+        elif key == "Children" and isinstance(value, list):
+            value = list(value) if value else EMPTY
+        elif key == "Actions" and isinstance(value, list):
+            actions = []
+            for action in value:
+                if not isinstance(action, dict):
+                    continue
+                fields = [("ActionName", intern_value(action.get("ActionName")))]
+                if "ChildRules" in action and isinstance(action["ChildRules"], list):
+                    fields.append(("ChildRules", list(action["ChildRules"]) or EMPTY))
+                actions.append(RuleAction(fields))
+            value = actions or EMPTY
+        elif key in ("Container", "FunctionName", "RootName"):
+            value = intern_value(value)
+        items.append((key, value))
+    frame.rule = RuleNode(items)
+
+
+def sanitize_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of ``rule`` restricted to :data:`ALLOWED_RULE_FIELDS`."""
+    box = [rule]
+    walk_rules(box, _sanitize_visitor)
+    return box[0]
+
+
+_JSON_SNIFF_BYTES = 512
+_JSON_CHUNK_SIZE = 64 * 1024
+_JSON_DECODER = json.JSONDecoder()
+
+
+class _JsonStream:
+    """Minimal pull parser that decodes one JSON value at a time from a file.
+
+    Only the text of the value currently being decoded is buffered; the
+    buffer doubles while a single value is incomplete so that a large element
+    is decoded in linear time.
+    """
+
+    def __init__(self, file) -> None:
+        self.file = file
+        self.buf = file.read(_JSON_SNIFF_BYTES)
+        self.pos = 0
+        self.eof = not self.buf
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        # Read in small pieces: a single large ``read`` makes the text wrapper
+        # keep a copy of the whole chunk alive for ``tell()`` support.
+        wanted = max(_JSON_CHUNK_SIZE, len(self.buf) - self.pos)
+        pieces = [self.buf[self.pos:]]
+        while wanted > 0:
+            chunk = self.file.read(_JSON_CHUNK_SIZE)
+            if not chunk:
+                self.eof = True
+                break
+            pieces.append(chunk)
+            wanted -= len(chunk)
+        if len(pieces) == 1:
+            return False
+        self.buf = "".join(pieces)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode and return the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may still be truncated.
+            if end == len(self.buf) and self._fill():
+                continue
+            # Drop the decoded text so it is not kept alive alongside ``value``.
+            self.buf = self.buf[end:]
+            self.pos = 0
+            return value
+
+    def array_items(self) -> Iterable[Any]:
+        """Yield the elements of the JSON array starting at the cursor."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def expect_end(self) -> None:
+        """Raise :class:`json.JSONDecodeError` unless only whitespace is left."""
+        if self.peek():
+            raise json.JSONDecodeError("Extra data", self.buf, self.pos)
+
+
+def iter_rules_from_json(file) -> Iterable[Dict[str, Any]]:
+    """Yield top-level rules from an open JSON export one at a time.
+
+    Accepts either a list of rules or an object with a ``rules`` list.
+    """
+    stream = _JsonStream(file)
+    first = stream.peek()
+    if first == "<":
+        raise ValueError("Uploaded file appears to be HTML, not JSON.")
+    if first == "[":
+        yield from stream.array_items()
+        stream.expect_end()
+        return
+    if first == "{":
+        stream.pos += 1
+        found = False
+        if stream.peek() != "}":
+            while True:
+                if stream.peek() != '"':
+                    raise json.JSONDecodeError(
+                        "Expecting property name enclosed in double quotes", stream.buf, stream.pos
+                    )
+                key = stream.value()
+                stream.expect(":")
+                if key == "rules" and not found and stream.peek() == "[":
+                    yield from stream.array_items()
+                    found = True
+                else:
+                    stream.value()
+                if stream.peek() != ",":
+                    break
+                stream.pos += 1
+        stream.expect("}")
+        stream.expect_end()
+        if found:
+            return
+    elif first:
+        stream.value()
+        stream.expect_end()
+    else:
+        raise json.JSONDecodeError("Expecting value", stream.buf, 0)
+    raise ValueError("JSON data must be a list of rules.")
+
+
+def iter_sanitized_rules(filepath: str | Path) -> Iterable[Dict[str, Any]]:
+    """Stream sanitized top-level rules, with GUIDs assigned, from ``filepath``."""
+    assign_guid = _guid_visitor()
+    with open(filepath, "r", encoding="utf-8") as file:
+        for rule in iter_rules_from_json(file):
+            if not isinstance(rule, dict):
+                raise ValueError("Each rule must be a JSON object.")
+            # Sanitize and assign GUIDs in a single walk over the rule.
+            box = [rule]
+            walk_rules(box, _sanitize_visitor, assign_guid)
+            yield box[0]
+
+
+def iter_rule_nodes(filepath: str | Path) -> Iterable[RuleNode]:
+    """Stream sanitized top-level rules from ``filepath`` as :class:`RuleNode` trees."""
+    assign_guid = _guid_visitor()
+    with open(filepath, "r", encoding="utf-8") as file:
+        for rule in iter_rules_from_json(file):
+            if not isinstance(rule, dict):
+                raise ValueError("Each rule must be a JSON object.")
+            box = [rule]
+            walk_rules(box, _rule_node_visitor, assign_guid)
+            yield box[0]
+
+
+def load_rule_nodes(filepath: str | Path) -> list[RuleNode] | None:
+    """Compact counterpart of :func:`load_and_sanitize_json` used by uploads.
+
+    Serializing the result with :func:`rule_model.rule_to_json` yields the
+    same JSON as the dict-based loader.
+    """
     try:
-        with open(filepath, "r", encoding="utf-8") as file:
-            content = file.read()
-            if content.lstrip().startswith("<"):
-                raise ValueError("Uploaded file appears to be HTML, not JSON.")
-            file.seek(0)
-            data = json.load(file)
-
-        if isinstance(data, dict) and "rules" in data:
-            data = data["rules"]
-        if not isinstance(data, list):
-            raise ValueError("JSON data must be a list of rules.")
-
-        allowed_fields = {
-            "RuleGUID",
-            "RuleName",
-            "Children",
-            "Actions",
-            "Attributes",
-            "ParentGUID",
-            "ParentActionIndex",
-            "Container",
-            "FunctionName",
-            "RootName",
-        }
+        nodes = list(iter_rule_nodes(filepath))
+        LOGGER.info("JSON file %s successfully loaded", filepath)
+        return nodes
+    except (json.JSONDecodeError, FileNotFoundError, ValueError) as exc:
+        LOGGER.error("Error loading JSON file %s: %s", filepath, exc)
+        return None
+
+
+def load_and_sanitize_json(filepath: str | Path) -> list[Dict[str, Any]] | None:
+    """Load JSON from ``filepath`` and sanitize unexpected fields.
 
-        def sanitize_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
-            cleaned = {k: v for k, v in rule.items() if k in allowed_fields}
-            if "Attributes" in cleaned and isinstance(cleaned["Attributes"], dict):
-                cleaned["Attributes"] = remove_all_quotes(cleaned["Attributes"])
-            if "Children" in cleaned and isinstance(cleaned["Children"], list):
-                cleaned["Children"] = [sanitize_rule(c) for c in cleaned["Children"]]
-            if "Actions" in cleaned and isinstance(cleaned["Actions"], list):
-                actions = []
-                for action in cleaned["Actions"]:
-                    a = {"ActionName": action.get("ActionName")}
-                    if "ChildRules" in action and isinstance(action["ChildRules"], list):
-                        a["ChildRules"] = [sanitize_rule(cr) for cr in action["ChildRules"]]
-                    actions.append(a)
-                cleaned["Actions"] = actions
-            return cleaned
-
-        sanitized = [sanitize_rule(r) for r in data]
-        add_missing_guids_if_needed(sanitized)
+    Rules are parsed and sanitized one top-level element at a time, so the
+    raw document is never held in full, but the sanitized list is.  Use
+    :func:`iter_sanitized_rules` (or :func:`iter_rules_from_json`) when
+    memory must stay bounded by the largest rule.
+    """
+    try:
+        sanitized = list(iter_sanitized_rules(filepath))
         LOGGER.info("JSON file %s successfully loaded", filepath)
         return sanitized
     except (json.JSONDecodeError, FileNotFoundError, ValueError) as exc:
@@ -238,49 +484,69 @@ def get_dynamic_groups(diagrams_folder: str | Path) -> List[Dict[str, Any]]:
     return sorted(groups, key=lambda g: g["category"])
 
 
-def flatten_rules(rules: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Flatten a nested structure of rules into a list."""
-    flat_list: List[Dict[str, Any]] = []
+def _flatten_visitor(flat_list: List[Dict[str, Any]]) -> RuleVisitor:
+    """Return a visitor appending each distinct rule to ``flat_list``.
+
+    Parent links are recorded on every rule; rules whose GUID was already
+    seen are not descended into again.  Rules must have a GUID by the time
+    they are visited, e.g. from a preceding :func:`_guid_visitor`.
+    """
     seen = set()
 
-    def dfs(rule, parent_guid=None, parent_action_index=None):
+    def visit(frame: RuleFrame) -> bool:
+        rule = frame.rule
         guid = rule.get("RuleGUID")
-        if not guid:
-            guid = f"udf_{uuid.uuid4()}"
-            rule["RuleGUID"] = guid
-        rule["ParentGUID"] = parent_guid
-        rule["ParentActionIndex"] = parent_action_index
+        rule["ParentGUID"] = frame.parent.rule["RuleGUID"] if frame.parent else None
+        rule["ParentActionIndex"] = frame.action_index
         if guid in seen:
-            return
+            return False
         seen.add(guid)
         flat_list.append(rule)
-        for child in rule.get("Children", []):
-            dfs(child, guid, None)
-        for i, action in enumerate(rule.get("Actions", [])):
-            for child_rule in action.get("ChildRules", []):
-                dfs(child_rule, guid, i)
-
-    for r in rules:
-        dfs(r, parent_guid=None)
-    return flat_list
+        return True
 
+    return visit
 
-def propagate_disabled_rules(rules: Iterable[Dict[str, Any]], inherited_disabled: bool = False) -> None:
-    """Propagate the disabled state through the rules in-place."""
-    for rule in rules:
-        current_disabled = inherited_disabled or (
-            rule.get("Attributes", {}).get("_Disabled") in ["1", 1, True]
+
+def _disabled_visitor(inherited_disabled: bool = False) -> RuleVisitor:
+    """Return a visitor marking rules below a disabled rule as disabled."""
+
+    def visit(frame: RuleFrame) -> None:
+        rule = frame.rule
+        parent_disabled = frame.parent.disabled if frame.parent else inherited_disabled
+        frame.disabled = parent_disabled or (
+            (rule.get("Attributes") or {}).get("_Disabled") in ["1", 1, True]
         )
         if "Attributes" not in rule:
             rule["Attributes"] = {}
-        if current_disabled:
+        if frame.disabled:
             rule["Attributes"]["_Disabled"] = "1"
-        if "Children" in rule:
-            propagate_disabled_rules(rule["Children"], current_disabled)
-        if "Actions" in rule:
-            for action in rule.get("Actions", []):
-                if "ChildRules" in action:
-                    propagate_disabled_rules(action["ChildRules"], current_disabled)
+
+    return visit
+
+
+def flatten_rules(rules: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Flatten a nested structure of rules into a list.
+
+    Rules without a ``RuleGUID`` are given a derived one first.
+    """
+    flat_list: List[Dict[str, Any]] = []
+    walk_rules(list(rules), _guid_visitor(), _flatten_visitor(flat_list))
+    return flat_list
+
+
+def propagate_disabled_rules(rules: Iterable[Dict[str, Any]], inherited_disabled: bool = False) -> None:
+    """Propagate the disabled state through the rules in-place."""
+    walk_rules(list(rules), _disabled_visitor(inherited_disabled))
+
+
+def propagate_and_flatten_rules(rules: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Propagate disabled states and flatten ``rules`` in a single walk.
+
+    Rules without a ``RuleGUID`` are given a derived one first.
+    """
+    flat_list: List[Dict[str, Any]] = []
+    walk_rules(list(rules), _disabled_visitor(), _guid_visitor(), _flatten_visitor(flat_list))
+    return flat_list
 
 
 def build_edge_map(edges: Iterable[Dict[str, Any]]) -> Dict[str, list[str]]:
@@ -295,14 +561,25 @@ def build_edge_map(edges: Iterable[Dict[str, Any]]) -> Dict[str, list[str]]:
     return edge_map
 
 
-def build_all_edges(rules):
-    """Return empty edges list placeholders for tests."""
-    return [], []
+def build_all_edges(rules: Iterable[Dict[str, Any]]) -> tuple[list[Dict[str, str]], RuleGraph]:
+    """Return the edges of ``rules`` as legacy dicts along with the rule graph."""
+    graph = build_rule_graph(rules)
+    return graph.edge_dicts(), graph
+
 
+def build_nodes(rules: Iterable[Dict[str, Any]], group_ids: Iterable[str] | None = None, **_: Any) -> Dict[str, Dict[str, str]]:
+    """Return ``{guid: {"label", "shape", "class"}}`` for ``rules``.
 
-def build_nodes(*args, **kwargs):
-    """Return an empty node mapping placeholder for tests."""
-    return {}
+    When ``group_ids`` is given only rules with those GUIDs are included.
+    Extra keyword arguments are accepted for backwards compatibility.
+    """
+    graph = build_rule_graph(rules)
+    wanted = set(group_ids) if group_ids is not None else None
+    return {
+        guid: graph.node_dict(node)
+        for node, guid in enumerate(graph.guids)
+        if wanted is None or guid in wanted
+    }
 
 
 def validate_hierarchy_data(data):
@@ -400,57 +677,189 @@ def get_diagram_categories() -> list[dict[str, Any]]:
     return categories
 
 
+GENERATION_MANIFEST = ".generation.json"
+# Bump whenever the generated output changes so stale manifests are ignored.
+_GENERATION_VERSION = 4
+
+
+def _content_hash(data: Any) -> str:
+    """Return a stable SHA-256 digest of JSON-serialisable ``data``."""
+    payload = json.dumps(
+        data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=rule_to_json
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_generation_manifest(output_dir: str) -> dict:
+    """Return the generation manifest of ``output_dir`` or an empty one."""
+    try:
+        with open(os.path.join(output_dir, GENERATION_MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != _GENERATION_VERSION:
+        return {}
+    return manifest
+
+
+def _save_generation_manifest(output_dir: str, manifest: dict) -> None:
+    path = os.path.join(output_dir, GENERATION_MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def generation_containers(output_dir: str) -> Dict[str, dict]:
+    """Return the container entries recorded by :func:`generate_files`.
+
+    Each entry names the container's ``diagram``, ``hierarchy`` and
+    ``index`` files and holds their ``etags`` and the container's ``rules``
+    count (missing from manifests written before it was recorded).
+    """
+    return _load_generation_manifest(output_dir).get("containers", {})
+
+
+def generation_etags(output_dir: str) -> Dict[str, str]:
+    """Return ``{filename: etag}`` for the artifacts recorded in ``output_dir``.
+
+    ETags are the SHA-256 digests of the file contents, computed when the
+    files were written by :func:`generate_files`.
+    """
+    etags: Dict[str, str] = {}
+    for entry in generation_containers(output_dir).values():
+        etags.update(entry.get("etags", {}))
+    return etags
+
+
+def _write_artifact(path: str, text: str, compress: bool = False) -> str:
+    """Write ``text`` to ``path`` and return the digest of the written bytes.
+
+    With ``compress`` the precompressed variants served to clients are
+    written as well.
+    """
+    data = text.encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
+    if compress:
+        write_compressed(path, data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def _outputs_exist(output_dir: str, entry: dict) -> bool:
+    return all(
+        os.path.exists(os.path.join(output_dir, entry[key]))
+        for key in ("diagram", "hierarchy", "index")
+    )
+
+
 def generate_files(json_data: list, output_dir: str) -> list[DiagramInfo]:
-    """Process ``json_data`` and generate diagram and JSON files."""
-    LOGGER.info("Processing %d rules...", len(json_data))
+    """Process ``json_data`` and generate diagram and JSON files.
+
+    ``json_data`` may hold rule dicts or :class:`rule_model.RuleNode` trees.
+
+    A manifest in ``output_dir`` records a content hash of the input and of
+    the rules of every container, plus the ETag of every written file.
+    Each container also gets a :class:`hierarchy_index.HierarchyIndex` for
+    partial hierarchy reads.
+    Re-processing identical input is skipped entirely, and otherwise only
+    containers whose rules changed are regenerated and rewritten.
+    """
     os.makedirs(output_dir, exist_ok=True)
-    propagate_disabled_rules(json_data)
-    flat_rules = flatten_rules(json_data)
-    edges, _ = build_all_edges(json_data)
-    edge_map = build_edge_map(edges)
+    manifest = _load_generation_manifest(output_dir)
+    cached: Dict[str, dict] = manifest.get("containers", {})
+    input_hash = _content_hash(json_data)
+    if manifest.get("input") == input_hash and all(
+        _outputs_exist(output_dir, entry) for entry in cached.values()
+    ):
+        LOGGER.info("Generation cache hit for %s; %d containers unchanged", output_dir, len(cached))
+        return [DiagramInfo(entry["diagram"], entry["created"]) for entry in cached.values()]
+
+    LOGGER.info("Processing %d rules...", len(json_data))
+    flat_rules = propagate_and_flatten_rules(json_data)
+    graph = build_rule_graph(flat_rules)
     LOGGER.info(
         "Processed %d flat rules and %d edges.",
         len(flat_rules),
-        len(edges),
+        graph.edge_count,
     )
     container_groups: Dict[str, list] = {}
+    group_nodes: Dict[str, array] = {}
+    node_group = array("l", [-1]) * graph.node_count
     for rule in flat_rules:
         container = rule.get("Container") or os.path.basename(output_dir)
-        container_groups.setdefault(container, []).append(rule)
-    root_name = os.path.basename(output_dir)
+        if container not in container_groups:
+            container_groups[container] = []
+            group_nodes[container] = array("l")
+        container_groups[container].append(rule)
+        node = graph.index[rule["RuleGUID"]]
+        group_nodes[container].append(node)
+        node_group[node] = len(container_groups) - 1
+    edge_buckets = graph.bucket_edges(node_group, len(container_groups))
     infos: list[DiagramInfo] = []
-    for container, rules in container_groups.items():
-        group_ids = {r["RuleGUID"] for r in rules}
-        group_nodes = build_nodes(
-            rules,
-            group_ids=group_ids,
-            root_name=root_name,
-            edge_map=edge_map,
-            rule_to_page=None,
-            current_page=1,
-        )
-        group_edges = [
-            e for e in edges if e["edge_str"].split("-->")[0].strip() in group_ids
-        ]
-        mermaid_code = generate_mermaid_code(group_nodes, group_edges, layout="TD")
+    containers: Dict[str, dict] = {}
+    for position, (container, rules) in enumerate(container_groups.items()):
         sanitized_container = secure_filename(container)
         diagram_filename = f"{sanitized_container}.mmd"
-        diagram_path = os.path.join(output_dir, diagram_filename)
-        with open(diagram_path, "w", encoding="utf-8") as f:
-            f.write(mermaid_code)
+        rules_hash = _content_hash(rules)
+        previous = cached.get(container)
+        if previous and previous.get("hash") == rules_hash and _outputs_exist(output_dir, previous):
+            containers[container] = previous
+            infos.append(DiagramInfo(previous["diagram"], previous["created"]))
+            LOGGER.debug("Container %s unchanged; skipping", container)
+            continue
+        mermaid_code = graph.to_mermaid(
+            group_nodes[container], edge_buckets[position], layout="TD"
+        )
+        diagram_etag = _write_artifact(
+            os.path.join(output_dir, diagram_filename), mermaid_code, compress=True
+        )
         info = DiagramInfo(diagram_filename, datetime.now(timezone.utc).isoformat())
         infos.append(info)
         LOGGER.info("Created diagram %s", info.filename)
-        with open(os.path.join(output_dir, f"{sanitized_container}.json"), "w", encoding="utf-8") as f:
-            json.dump({"rules": rules}, f, indent=4)
+        hierarchy_filename = f"{sanitized_container}.json"
+        hierarchy_path = os.path.join(output_dir, hierarchy_filename)
+        hierarchy_etag = _write_artifact(
+            hierarchy_path,
+            json.dumps({"rules": rules}, indent=4, default=rule_to_json),
+            compress=True,
+        )
+        # Written after the hierarchy so its mtime marks it as current.
+        index_path = index_path_for(hierarchy_path)
+        _write_artifact(index_path, HierarchyIndex.from_rules(rules).to_json())
+        containers[container] = {
+            "hash": rules_hash,
+            "diagram": diagram_filename,
+            "hierarchy": hierarchy_filename,
+            "index": os.path.basename(index_path),
+            "created": info.created,
+            "rules": len(rules),
+            "etags": {diagram_filename: diagram_etag, hierarchy_filename: hierarchy_etag},
+        }
+    _save_generation_manifest(
+        output_dir,
+        {"version": _GENERATION_VERSION, "input": input_hash, "containers": containers},
+    )
     return infos
 
 
 def generate_mermaid_code(nodes: Dict[str, Dict[str, str]], edges: Iterable[Dict[str, str]], layout: str = "TD") -> str:
-    """Convert nodes and edges into a simple mermaid diagram string."""
+    """Convert nodes and edges into a simple mermaid diagram string.
+
+    Nodes produced by :func:`build_nodes` carry a ``shape`` and ``class``
+    which are rendered as a decision/rectangle and a ``:::class`` suffix.
+    """
     lines = [f"graph {layout}"]
     for node_id, node in nodes.items():
-        lines.append(f"{node_id}[{node['label']}]")
+        if node.get("shape") == "decision":
+            line = f'{node_id}{{"{node["label"]}"}}'
+        elif "shape" in node:
+            line = f'{node_id}["{node["label"]}"]'
+        else:
+            line = f"{node_id}[{node['label']}]"
+        if node.get("class"):
+            line += f":::{node['class']}"
+        lines.append(line)
     for edge in edges:
         lines.append(edge["edge_str"])
     return "\n".join(lines)
@@ -468,7 +877,7 @@ class ActivityLogEntry:
 
 
 def log_activity(action: str, rule_id: str | None = None, user: str | None = None, details: str | None = None) -> None:
-    """Log an activity entry to ``Config.ACTIVITY_LOG``."""
+    """Append an activity entry to the activity store."""
     Config.ensure_data_dir()
     entry = ActivityLogEntry(
         action=action,
@@ -476,49 +885,26 @@ def log_activity(action: str, rule_id: str | None = None, user: str | None = Non
         details=details or f"{action} operation",
     )
     try:
-        data: dict = {}
-        if os.path.exists(Config.ACTIVITY_LOG):
-            with open(Config.ACTIVITY_LOG, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        else:
-            data = {"rules": {}, "activity_log": []}
-        data.setdefault("activity_log", []).append(asdict(entry))
-        if rule_id:
-            data.setdefault("rules", {})[rule_id] = {
-                "status": "active",
-                "last_modified": entry.timestamp,
-                "modified_by": entry.user,
-            }
-        with open(Config.ACTIVITY_LOG, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        get_activity_store().append(asdict(entry), rule_id=rule_id)
     except Exception as exc:  # pragma: no cover - log failures shouldn't crash
         LOGGER.error("Failed to log activity: %s", exc)
 
 
 def get_rule_stats() -> dict:
-    """Return rule counts and recent activity totals."""
+    """Return rule counts and activity totals for the last 7, 30 and 90 days.
+
+    Windows are whole UTC days ending today, answered from the store's
+    per-day counters.
+    """
     Config.ensure_data_dir()
     try:
-        with open(Config.ACTIVITY_LOG, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        now = datetime.utcnow()
-        totals = {
-            "total_rules": len(data.get("rules", {})),
-            "last_7_days": 0,
-            "last_30_days": 0,
-            "last_90_days": 0,
-        }
-        for entry in data.get("activity_log", []):
-            try:
-                ts = datetime.fromisoformat(entry["timestamp"])
-            except Exception:
-                continue
-            if ts >= now - timedelta(days=7):
-                totals["last_7_days"] += 1
-            if ts >= now - timedelta(days=30):
-                totals["last_30_days"] += 1
-            if ts >= now - timedelta(days=90):
-                totals["last_90_days"] += 1
+        store = get_activity_store()
+        today = datetime.utcnow().date()
+        counts = store.daily_counts(since=(today - timedelta(days=89)).isoformat())
+        totals = {"total_rules": store.rule_count()}
+        for days in (7, 30, 90):
+            start = (today - timedelta(days=days - 1)).isoformat()
+            totals[f"last_{days}_days"] = sum(n for d, n in counts.items() if d >= start)
         return totals
     except Exception as exc:  # pragma: no cover - unexpected errors
         LOGGER.error("Failed to compute stats: %s", exc)
@@ -529,21 +915,10 @@ def get_activity_trend(days: int = 30) -> list[dict]:
     """Return daily activity counts for the past ``days`` days."""
     Config.ensure_data_dir()
     try:
-        with open(Config.ACTIVITY_LOG, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        now = datetime.utcnow()
-        start_date = now.date() - timedelta(days=days - 1)
-        counts = { (start_date + timedelta(days=i)).isoformat(): 0 for i in range(days) }
-        for entry in data.get("activity_log", []):
-            try:
-                ts = datetime.fromisoformat(entry["timestamp"]).date()
-            except Exception:
-                continue
-            if ts.isoformat() in counts:
-                counts[ts.isoformat()] += 1
-        return [
-            {"label": d, "count": counts[d]} for d in sorted(counts.keys())
-        ]
+        start_date = datetime.utcnow().date() - timedelta(days=days - 1)
+        counts = get_activity_store().daily_counts(since=start_date.isoformat())
+        labels = [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
+        return [{"label": d, "count": counts.get(d, 0)} for d in labels]
     except Exception as exc:  # pragma: no cover - unexpected errors
         LOGGER.error("Trend calculation failed: %s", exc)
         return []
@@ -625,7 +1000,15 @@ __all__ = [
     "allowed_file",
     "ensure_directory_exists",
     "load_and_sanitize_json",
+    "iter_sanitized_rules",
+    "iter_rule_nodes",
+    "load_rule_nodes",
+    "iter_rules_from_json",
+    "sanitize_rule",
+    "ALLOWED_RULE_FIELDS",
     "generate_files",
+    "generation_containers",
+    "generation_etags",
     "log_activity",
     "diagram_type_from_filename",
     "get_snippet",
@@ -635,6 +1018,7 @@ __all__ = [
     "get_dynamic_groups",
     "flatten_rules",
     "propagate_disabled_rules",
+    "propagate_and_flatten_rules",
     "build_edge_map",
     "validate_hierarchy_data",
     "build_hierarchy",
@@ -2,7 +2,9 @@
 
 import os
 
-from app import app as application
+from app import get_app
+
+application = get_app()
 
 __all__ = ["application"]
 